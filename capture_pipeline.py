@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import datetime
+import queue
+import threading
+import time
+from collections.abc import Callable, Sequence
+from typing import NamedTuple
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from clipboard_media import KIND_MIME, THUMBNAIL_SIZE, image_identity, png_bytes, thumbnail_png
+from content_detection import entity_rows, is_code
+from encryption import content_fingerprint, data_fingerprint, encrypt_bytes, encrypt_payload, encrypt_text
+from metrics import registry
+from profiling import profiler
+from tracing import tracer
+
+
+def apply_plugins(plugins: Sequence, text: str) -> str:
+    # each plugin's on_clipboard_change in turn, ignoring failures
+    for plugin in plugins:
+        if plugin.instance and hasattr(plugin.instance, 'on_clipboard_change'):
+            try:
+                result = plugin.instance.on_clipboard_change(text)
+                if isinstance(result, str) and result:
+                    text = result
+            except Exception:
+                pass
+    return text
+
+
+class CaptureRequest(NamedTuple):
+    text: str  # plain text, or the label/path list for images and files
+    plugins: Sequence  # enabled plugins, snapshotted on the GUI thread
+    match: Callable[[str], object] | None  # notification rule matcher
+    queued_at: float
+    kind: str = "text"  # text, html, image or files
+    data: object = None  # html source or QImage
+
+
+class CaptureResult(NamedTuple):
+    entry_id: int
+    created: bool
+    text: str  # as copied
+    stored_text: str  # after plugin transforms
+    rule: object  # matched notification rule, or None
+    timings: dict  # stage -> ms
+    kind: str = "text"
+
+
+class CapturePipeline(QObject):
+    # clipboard captures processed off the GUI thread.
+    #
+    # clipboard changes arrive through changed(), which collapses bursts:
+    # each change restarts a coalesce_ms timer and only the state left when
+    # it fires is snapshotted and submitted. A burst that keeps going is
+    # still captured every MAX_COALESCE_WINDOWS windows.
+    #
+    # one worker thread takes requests from a bounded queue and runs the
+    # stages in order, so captures are stored in the order they were
+    # copied. Results come back through captured, which Qt queues onto the
+    # GUI thread. Plugins' on_clipboard_change hooks run on the worker.
+    #
+    # images and html keep their payload in the content-addressed blobs
+    # table: the blob hash is the keyed fingerprint of the content, so
+    # copying the same image again stores nothing new. Image thumbnails
+    # are made here too, never while painting.
+
+    MAX_PENDING = 32
+    MAX_COALESCE_WINDOWS = 4
+    STAGES = ("queue", "fingerprint", "transform", "classify", "encrypt", "persist", "thumbnail", "notify")
+
+    captured = Signal(object)  # CaptureResult
+    failed = Signal(str)
+
+    def __init__(self, db_manager, fernet, fingerprint_key, snapshot=None, coalesce_ms=100,
+                 transform=None, parent=None):
+        # snapshot() returns (text, plugins, match, kind, data) for the
+        # current clipboard, or None when there is nothing to capture.
+        # transform(plugins, text) runs the plugin hooks on the worker
+        super().__init__(parent)
+        self.transform = transform or apply_plugins
+        self.db_manager = db_manager
+        self.fernet = fernet
+        self.fingerprint_key = fingerprint_key
+        self._queue: queue.Queue = queue.Queue(maxsize=self.MAX_PENDING)
+        self._lock = threading.Lock()
+        self._last_fingerprint = None  # last text captured or copied by the app
+        self._stage_stats = {stage: [0, 0.0, 0.0, 0.0] for stage in self.STAGES}  # count, total, max, last (ms)
+        self._counts = {"events": 0, "merged": 0, "processed": 0, "duplicates": 0, "dropped": 0, "failed": 0}
+        self._thread = None
+        self.snapshot = snapshot
+        self.coalesce_ms = max(0, int(coalesce_ms))
+        self._burst_started = None
+        self._burst_events = 0
+        self._coalesce_timer = QTimer(self)
+        self._coalesce_timer.setSingleShot(True)
+        self._coalesce_timer.timeout.connect(self._flush_burst)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="clipboard-capture", daemon=True)
+            self._thread.start()
+
+    def close(self, timeout: float = 2.0):
+        # finishes queued captures first; called before the database closes
+        self._coalesce_timer.stop()
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    # GUI thread ----------------------------------------------------------
+
+    def set_coalesce_window(self, milliseconds: int) -> None:
+        self.coalesce_ms = max(0, int(milliseconds))
+
+    def changed(self) -> None:
+        # QClipboard.dataChanged; apps may fire it once per mime format
+        self._burst_events += 1
+        if self.coalesce_ms == 0:
+            self._flush_burst()
+            return
+        now = time.perf_counter()
+        if self._burst_started is None:
+            self._burst_started = now
+        elif (now - self._burst_started) * 1000 >= self.coalesce_ms * self.MAX_COALESCE_WINDOWS:
+            self._flush_burst()
+            return
+        self._coalesce_timer.start(self.coalesce_ms)
+
+    def _flush_burst(self) -> None:
+        self._coalesce_timer.stop()
+        events, self._burst_events, self._burst_started = self._burst_events, 0, None
+        if events == 0:
+            return
+        self._count("events", events)
+        self._count("merged", events - 1)
+        captured = self.snapshot() if self.snapshot is not None else None
+        if captured is not None:
+            self.submit(*captured)
+
+    def submit(self, text: str, plugins: Sequence = (), match=None, kind: str = "text", data=None) -> None:
+        request = CaptureRequest(text, tuple(plugins), match, time.perf_counter(), kind, data)
+        while True:
+            try:
+                self._queue.put_nowait(request)
+                return
+            except queue.Full:
+                # backpressure: the newest copy matters most, so the oldest
+                # waiting capture gives way instead of the GUI thread blocking
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    continue
+                self._count("dropped")
+
+    def expect(self, text: str) -> None:
+        # the app is about to put text on the clipboard; do not capture it back
+        self.expect_fingerprint(content_fingerprint(text, self.fingerprint_key))
+
+    def expect_fingerprint(self, fingerprint: str) -> None:
+        # as expect(), for a stored entry of any kind (its content hash)
+        with self._lock:
+            self._last_fingerprint = fingerprint
+
+    def fingerprint(self, kind: str, text: str, data=None) -> str:
+        if kind == "text":
+            return content_fingerprint(text, self.fingerprint_key)
+        if kind == "image":
+            identity = image_identity(data)
+        elif kind == "html":
+            identity = b"html:" + data.encode("utf-8")
+        else:
+            identity = f"{kind}:{text}".encode("utf-8")
+        return data_fingerprint(identity, self.fingerprint_key)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[name] += amount
+        registry.inc(f"capture.{name}", amount)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": count,
+                    "mean_ms": total / count if count else 0.0,
+                    "max_ms": worst,
+                    "last_ms": last,
+                }
+                for stage, (count, total, worst, last) in self._stage_stats.items()
+            }
+            return {**self._counts, "pending": self.pending(), "stages": stages}
+
+    # Worker --------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            try:
+                result = self.process(request)
+            except Exception as exc:
+                self._count("failed")
+                self.failed.emit(f"{type(exc).__name__}: {exc}")
+                continue
+            if result is not None:
+                self.captured.emit(result)
+
+    @profiler.profiled("capture")
+    def process(self, request: CaptureRequest) -> CaptureResult | None:
+        # runs every stage for one capture; None when it was a duplicate
+        timings = {}
+        mark = time.perf_counter()
+        timings["queue"] = (mark - request.queued_at) * 1000
+        tracer.record("queue", request.queued_at, mark - request.queued_at, cat="capture")
+
+        def lap(stage):
+            nonlocal mark
+            now = time.perf_counter()
+            timings[stage] = (now - mark) * 1000
+            tracer.record(stage, mark, now - mark, cat="capture")
+            mark = now
+
+        text, kind, data = request.text, request.kind, request.data
+        incoming_fingerprint = self.fingerprint(kind, text, data)
+        with self._lock:
+            duplicate = incoming_fingerprint == self._last_fingerprint
+            self._last_fingerprint = incoming_fingerprint
+        lap("fingerprint")
+        if duplicate:
+            self._count("duplicates")
+            tracer.record("capture", request.queued_at, mark - request.queued_at, cat="capture",
+                          kind=kind, duplicate=True)
+            return None
+
+        textual = kind in ("text", "html")
+        transformed_text = self.transform(request.plugins, text) if textual and request.plugins else text
+        if transformed_text != text:
+            # the markup no longer matches what a plugin rewrote
+            kind, data = "text", None
+        lap("transform")
+
+        code_flag = is_code(transformed_text) if textual else False
+        lap("classify")
+
+        encrypted_text, chunks = encrypt_payload(transformed_text, self.fernet)
+        if kind == "text":
+            final_fingerprint = content_fingerprint(transformed_text, self.fingerprint_key)
+        else:
+            final_fingerprint = incoming_fingerprint
+        entities = list(entity_rows(
+            transformed_text,
+            lambda value: encrypt_text(value, self.fernet),
+            lambda value: content_fingerprint(value, self.fingerprint_key),
+        )) if textual else []
+        blob = None
+        if kind in KIND_MIME:
+            if self.db_manager.has_blob(final_fingerprint):
+                registry.inc("capture.blobs.hits")
+                blob = (final_fingerprint, KIND_MIME[kind], None)
+            else:
+                registry.inc("capture.blobs.misses")
+                payload = png_bytes(data) if kind == "image" else data.encode("utf-8")
+                blob = (final_fingerprint, KIND_MIME[kind], encrypt_bytes(payload, self.fernet))
+        lap("encrypt")
+
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        entry_id, created = self.db_manager.store_entry(
+            encrypted_text, timestamp, code_flag, final_fingerprint, entities, kind, blob, chunks
+        )
+        with self._lock:
+            self._last_fingerprint = final_fingerprint
+        if not created:
+            # copied before: the existing row moved to the top
+            registry.inc("capture.reused")
+        lap("persist")
+
+        if kind == "image" and self.db_manager.get_thumbnail(final_fingerprint, THUMBNAIL_SIZE) is None:
+            self.db_manager.put_thumbnail(
+                final_fingerprint, THUMBNAIL_SIZE, encrypt_bytes(thumbnail_png(data), self.fernet)
+            )
+        lap("thumbnail")
+
+        rule = request.match(transformed_text) if request.match is not None else None
+        lap("notify")
+
+        self._count("processed")
+        tracer.record("capture", request.queued_at, mark - request.queued_at, cat="capture",
+                      kind=kind, chars=len(transformed_text), created=created)
+        for stage, elapsed in timings.items():
+            registry.observe(f"capture.{stage}_ms", elapsed)
+        registry.observe("capture.total_ms", sum(timings.values()))
+        registry.observe("capture.payload_chars", len(transformed_text))
+        with self._lock:
+            for stage, elapsed in timings.items():
+                stats = self._stage_stats[stage]
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] = max(stats[2], elapsed)
+                stats[3] = elapsed
+        return CaptureResult(entry_id, created, text, transformed_text, rule, timings, kind)
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from PySide6.QtCore import QBuffer, QByteArray, QIODevice, Qt
+from PySide6.QtGui import QImage
+
+# qimage work only, so everything here is safe on worker threads
+
+THUMBNAIL_SIZE = 128  # longest side, px
+KIND_MIME = {"image": "image/png", "html": "text/html"}
+
+
+def image_identity(image: QImage) -> bytes:
+    # canonical bytes for deduplication: the same pixels give the same
+    # bytes whatever format or encoding the copying app used
+    canonical = image.convertToFormat(QImage.Format_ARGB32)
+    header = f"image:{canonical.width()}x{canonical.height()}:".encode()
+    return header + bytes(canonical.constBits())
+
+
+def png_bytes(image: QImage) -> bytes:
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    buffer.close()
+    return data.data()
+
+
+def image_from_bytes(data: bytes) -> QImage:
+    return QImage.fromData(data)
+
+
+def thumbnail_png(image: QImage, size: int = THUMBNAIL_SIZE) -> bytes:
+    if image.width() > size or image.height() > size:
+        image = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return png_bytes(image)
+
+
+def image_label(image: QImage) -> str:
+    # stored (encrypted) as the row text so images are listed and searchable
+    return f"Image {image.width()}×{image.height()}"
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import ipaddress
 import json
 import re
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable
+from typing import NamedTuple
+
+from metrics import registry
 
 # flags for multiline regex matching
 _FLAGS = re.MULTILINE
@@ -148,6 +152,7 @@ def detect_language(text: str) -> str:
     return language
 
 
+@registry.timed("detect.is_code_ms")
 def is_code(text: str) -> int:
     # 1 for code, 0 for normal text
     if not text or not text.strip():
@@ -195,3 +200,101 @@ def detect_content_type(text: str) -> str:
        re.fullmatch(r"[a-zA-Z0-9-]+\.[a-zA-Z]{2,}(?:/[^\s]*)?", stripped, re.IGNORECASE):
         return "link"
     return "code" if is_code(text) else "text"
+
+
+class Entity(NamedTuple):
+    kind: str
+    start: int
+    end: int
+    value: str
+
+
+ENTITY_KINDS = ("url", "email", "uuid", "hash", "ip", "path")
+MAX_ENTITY_SCAN = 100_000
+MAX_ENTITIES = 200
+
+# earlier kinds win when spans overlap (a url swallows its own path, etc.)
+_ENTITY_PATTERNS = (
+    ("url", re.compile(r"\b(?:https?://|ftp://|www\.)[^\s<>\"'`]+", re.IGNORECASE)),
+    ("email", re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}\b")),
+    ("uuid", re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b")),
+    ("hash", re.compile(r"\b[0-9a-fA-F]{32,128}\b")),
+    ("ip", re.compile(
+        r"\b(?:(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)\.){3}(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)\b"
+        r"|(?<![\w:])[0-9a-fA-F]{0,4}(?::[0-9a-fA-F]{0,4}){2,7}(?![\w:])"
+    )),
+    ("path", re.compile(
+        r"\b[A-Za-z]:\\(?:[^\\/:*?\"<>|\r\n]+\\)*[^\\/:*?\"<>|\s]*"
+        r"|(?<![\w/.:~-])(?:~|\.{1,2})?(?:/[\w.@+-]+){2,}/?"
+    )),
+)
+_HASH_LENGTHS = {32, 40, 56, 64, 96, 128}
+_TRAILING_PUNCTUATION = ".,;:!?)]}>'\""
+
+
+def _valid_entity(kind: str, value: str) -> bool:
+    if kind == "hash":
+        # long decimal numbers and plain words are not hashes
+        return (
+            len(value) in _HASH_LENGTHS
+            and any(char.isdigit() for char in value)
+            and any(char.isalpha() for char in value)
+        )
+    if kind == "ip" and ":" in value:
+        if not value.strip(":"):
+            return False
+        try:
+            ipaddress.IPv6Address(value)
+        except ValueError:
+            return False
+    return bool(value)
+
+
+@registry.timed("detect.entities_ms")
+def extract_entities(text: str) -> list[Entity]:
+    # pull urls, emails, uuids, hashes, ips and paths out of free text
+    if not text:
+        return []
+    sample = text[:MAX_ENTITY_SCAN]
+    taken: list[tuple[int, int]] = []
+    entities: list[Entity] = []
+    for kind, pattern in _ENTITY_PATTERNS:
+        for match in pattern.finditer(sample):
+            value = match.group(0)
+            if kind in ("url", "path"):
+                value = value.rstrip(_TRAILING_PUNCTUATION)
+            start = match.start()
+            end = start + len(value)
+            if not _valid_entity(kind, value):
+                continue
+            if any(start < taken_end and taken_start < end for taken_start, taken_end in taken):
+                continue
+            taken.append((start, end))
+            entities.append(Entity(kind, start, end, value))
+            if len(entities) >= MAX_ENTITIES:
+                break
+        if len(entities) >= MAX_ENTITIES:
+            break
+    entities.sort(key=lambda entity: entity.start)
+    return entities
+
+
+def normalize_entity(entity: Entity) -> str:
+    # canonical form used for the blind index
+    if entity.kind in ("email", "uuid", "hash", "ip"):
+        return entity.value.lower()
+    if entity.kind == "url" and entity.value.lower().startswith("www."):
+        return "http://" + entity.value
+    return entity.value
+
+
+def entity_rows(
+    text: str,
+    encrypt: Callable[[str], bytes | str],
+    fingerprint: Callable[[str], str],
+) -> list[tuple[str, int, int, str, bytes | str]]:
+    # entity table rows: (kind, start, end, blind index, encrypted value)
+    return [
+        (entity.kind, entity.start, entity.end, fingerprint(normalize_entity(entity)), encrypt(entity.value))
+        for entity in extract_entities(text)
+    ]
@@ -3,7 +3,23 @@ from __future__ import annotations
 import datetime
 import os
 import sqlite3
-from collections.abc import Callable, Iterable
+import threading
+import weakref
+from collections.abc import Callable, Iterable, Sequence
+
+from metrics import registry
+from profiling import profiler
+from query_log import InstrumentedConnection, QueryLog
+
+_managers: weakref.WeakSet[DatabaseManager] = weakref.WeakSet()
+
+
+def release_thread_connections() -> None:
+    # for pool tasks to call when they finish. Qt pool threads drop their
+    # Python thread state between runnables, so the next task on the same
+    # thread would open a new connection and this one would stay open
+    for manager in list(_managers):
+        manager.release_connection()
 
 
 class DatabaseManager:
@@ -14,13 +30,31 @@ class DatabaseManager:
 
     def __init__(self, db_path: str):
         self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path, timeout=10)
-        self.conn.execute("pragma journal_mode = wal")
-        self.conn.execute("pragma synchronous = normal")
-        self.conn.execute("pragma busy_timeout = 10000")
-        self.conn.execute("pragma foreign_keys = on")
+        self.query_log = QueryLog(log_path=os.path.join(os.path.dirname(os.path.abspath(db_path)), "slow_queries.log"))
+        self._listeners: list[Callable[[str, str, int], None]] = []
+        # one connection per thread so background page loads can read
+        # while the GUI thread keeps writing (wal allows both)
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        _managers.add(self)
         self.create_tables()
 
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False, factory=InstrumentedConnection)
+            conn.query_log = self.query_log
+            conn.execute("pragma journal_mode = wal")
+            conn.execute("pragma synchronous = normal")
+            conn.execute("pragma busy_timeout = 10000")
+            conn.execute("pragma foreign_keys = on")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
     def create_tables(self) -> None:
         with self.conn:
             self.conn.execute(
@@ -32,13 +66,28 @@ class DatabaseManager:
                     is_code integer not null default 0,
                     pinned integer not null default 0,
                     favorite integer not null default 0,
-                    content_hash text
+                    content_hash text,
+                    entities_indexed integer not null default 0,
+                    use_count integer not null default 0,
+                    kind text not null default 'text',
+                    blob_hash text,
+                    chunk_count integer not null default 0
                 )
                 """
             )
             columns = {row[1] for row in self.conn.execute("pragma table_info(history)")}
             if "content_hash" not in columns:
                 self.conn.execute("alter table history add column content_hash text")
+            if "entities_indexed" not in columns:
+                self.conn.execute("alter table history add column entities_indexed integer not null default 0")
+            if "use_count" not in columns:
+                self.conn.execute("alter table history add column use_count integer not null default 0")
+            if "kind" not in columns:
+                self.conn.execute("alter table history add column kind text not null default 'text'")
+            if "blob_hash" not in columns:
+                self.conn.execute("alter table history add column blob_hash text")
+            if "chunk_count" not in columns:
+                self.conn.execute("alter table history add column chunk_count integer not null default 0")
 
             self.conn.execute(
                 """
@@ -73,61 +122,181 @@ class DatabaseManager:
                 )
                 """
             )
+            self.conn.execute(
+                """
+                create table if not exists entities (
+                    id integer primary key autoincrement,
+                    entry_id integer not null references history(id) on delete cascade,
+                    kind text not null,
+                    start_offset integer not null,
+                    end_offset integer not null,
+                    value_hash text not null,
+                    value blob not null
+                )
+                """
+            )
+            # content-addressed payloads (images, html) shared by every row
+            # whose blob_hash names them; data and thumbnails are encrypted
+            self.conn.execute(
+                """
+                create table if not exists blobs (
+                    hash text primary key,
+                    mime text not null,
+                    size integer not null,
+                    data blob not null
+                )
+                """
+            )
+            self.conn.execute(
+                """
+                create table if not exists thumbnails (
+                    blob_hash text not null,
+                    size integer not null,
+                    data blob not null,
+                    primary key (blob_hash, size)
+                )
+                """
+            )
+            # large text lives out of row, keyed by the row's content hash and
+            # split into separately encrypted chunks; history.text then holds
+            # only an encrypted preview and chunk_count says how many to read
+            self.conn.execute(
+                """
+                create table if not exists payload_chunks (
+                    hash text not null,
+                    seq integer not null,
+                    data blob not null,
+                    primary key (hash, seq)
+                )
+                """
+            )
+            self.conn.execute(
+                """
+                create table if not exists maintenance (
+                    name text primary key,
+                    state text not null default '{}',
+                    status text not null default 'pending',
+                    last_finished text,
+                    last_duration_ms real not null default 0,
+                    runs integer not null default 0,
+                    error text
+                )
+                """
+            )
             self.conn.execute("create index if not exists idx_history_sort on history(pinned desc, timestamp desc, id desc)")
             self.conn.execute("create index if not exists idx_history_hash on history(content_hash)")
+            # retention walks and deletes rows by age
+            self.conn.execute("create index if not exists idx_history_timestamp on history(timestamp)")
+            self.conn.execute("create index if not exists idx_history_blob on history(blob_hash) where blob_hash is not null")
             self.conn.execute("create index if not exists idx_entry_tags_tag on entry_tags(tag_id, entry_type, entry_id)")
             self.conn.execute("create index if not exists idx_entry_tags_entry on entry_tags(entry_id, entry_type)")
+            self.conn.execute("create index if not exists idx_entities_kind on entities(kind, entry_id)")
+            self.conn.execute("create index if not exists idx_entities_value on entities(value_hash, entry_id)")
+            self.conn.execute("create index if not exists idx_entities_entry on entities(entry_id)")
+
+    # Change events -------------------------------------------------------
+
+    def subscribe(self, listener: Callable[[str, str, int], None]) -> None:
+        # listener(action, entry_type, entry_id); action is one of
+        # created/updated/deleted/tagged/reset, entry_type history/snippet/tag
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[str, str, int], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, action: str, entry_type: str, entry_id: int = 0) -> None:
+        for listener in list(self._listeners):
+            listener(action, entry_type, int(entry_id))
 
     # History -------------------------------------------------------------
 
+    def content_hash_index_ready(self) -> bool:
+        return self.conn.execute(
+            "select 1 from sqlite_master where type = 'index' and name = 'uq_history_content_hash'"
+        ).fetchone() is not None
+
+    @profiler.profiled("reconcile_content_hashes")
     def reconcile_content_hashes(
         self,
         decrypt: Callable[[bytes | str], str],
         fingerprint: Callable[[str], str],
     ) -> int:
-        # deduplicate old rows using content hash
+        # deduplicate old rows using content hash; once the unique index is in
+        # place every hashed row is already distinct, so later starts only
+        # decrypt rows that arrived without a hash
+        where = " where content_hash is null" if self.content_hash_index_ready() else ""
         rows = self.conn.execute(
-            "select id, text, timestamp, pinned, favorite from history order by timestamp desc, id desc"
+            "select id, text, pinned, favorite from history" + where + " order by timestamp desc, id desc"
         ).fetchall()
+        with self.conn:
+            merged = self._reconcile_rows(rows, decrypt, fingerprint)
+            self.conn.execute(
+                "create unique index if not exists uq_history_content_hash on history(content_hash) where content_hash is not null"
+            )
+        return merged
+
+    def reconcile_content_hash_batch(
+        self,
+        decrypt: Callable[[bytes | str], str],
+        fingerprint: Callable[[str], str],
+        before_id: int | None = None,
+        limit: int = 50,
+    ) -> int | None:
+        # hash up to limit unhashed rows below before_id, newest id first;
+        # returns the lowest id handled as the next cursor, None when done.
+        # only valid once the unique index exists (see reconcile_content_hashes)
+        sql = "select id, text, pinned, favorite from history where content_hash is null"
+        params: tuple[int, ...] = ()
+        if before_id is not None:
+            sql += " and id < ?"
+            params = (int(before_id),)
+        rows = self.conn.execute(sql + " order by id desc limit ?", params + (max(1, int(limit)),)).fetchall()
+        if not rows:
+            return None
+        with self.conn:
+            self._reconcile_rows(rows, decrypt, fingerprint)
+        return rows[-1][0]
+
+    def _reconcile_rows(self, rows, decrypt, fingerprint) -> int:
         seen: dict[str, int] = {}
         merged = 0
-        with self.conn:
-            for entry_id, encrypted_text, _timestamp, pinned, favorite in rows:
-                plain_text = decrypt(encrypted_text)
-                if plain_text == "":
-                    continue
-                content_hash = fingerprint(plain_text)
-                keeper_id = seen.get(content_hash)
-                if keeper_id is None:
-                    existing = self.conn.execute(
-                        "select id from history where content_hash = ? and id <> ? order by timestamp desc, id desc limit 1",
+        for entry_id, encrypted_text, pinned, favorite in rows:
+            plain_text = decrypt(encrypted_text)
+            if plain_text == "":
+                continue
+            content_hash = fingerprint(plain_text)
+            keeper_id = seen.get(content_hash)
+            if keeper_id is None:
+                existing = self.conn.execute(
+                    "select id from history where content_hash = ? and id <> ? order by timestamp desc, id desc limit 1",
+                    (content_hash, entry_id),
+                ).fetchone()
+                if existing:
+                    keeper_id = existing[0]
+                    seen[content_hash] = keeper_id
+                else:
+                    self.conn.execute(
+                        "update history set content_hash = ? where id = ?",
                         (content_hash, entry_id),
-                    ).fetchone()
-                    if existing:
-                        keeper_id = existing[0]
-                        seen[content_hash] = keeper_id
-                    else:
-                        self.conn.execute(
-                            "update history set content_hash = ? where id = ?",
-                            (content_hash, entry_id),
-                        )
-                        seen[content_hash] = entry_id
-                        continue
-
-                if keeper_id == entry_id:
+                    )
+                    seen[content_hash] = entry_id
                     continue
-                self._merge_history_rows(keeper_id, entry_id, pinned, favorite)
-                merged += 1
 
-            self.conn.execute(
-                "create unique index if not exists uq_history_content_hash on history(content_hash) where content_hash is not null"
-            )
+            if keeper_id == entry_id:
+                continue
+            self._merge_history_rows(keeper_id, entry_id, pinned, favorite)
+            merged += 1
         return merged
 
     def _merge_history_rows(self, keeper_id: int, duplicate_id: int, pinned: int = 0, favorite: int = 0) -> None:
         self.conn.execute(
-            "update history set pinned = max(pinned, ?), favorite = max(favorite, ?) where id = ?",
-            (pinned, favorite, keeper_id),
+            """
+            update history set pinned = max(pinned, ?), favorite = max(favorite, ?),
+                use_count = use_count + 1 + coalesce((select use_count from history where id = ?), 0)
+            where id = ?
+            """,
+            (pinned, favorite, duplicate_id, keeper_id),
         )
         self.conn.execute(
             """
@@ -142,15 +311,42 @@ class DatabaseManager:
             (duplicate_id,),
         )
         self.conn.execute("delete from history where id = ?", (duplicate_id,))
+        self._notify("deleted", "history", duplicate_id)
 
+    @registry.timed("db.store_entry_ms")
     def store_entry(
         self,
         encrypted_text: bytes | str,
         timestamp: str,
         is_code_flag: int,
         content_hash: str,
+        entities: Iterable[tuple[str, int, int, str, bytes | str]] | None = None,
+        kind: str = "text",
+        blob: tuple[str, str, bytes] | None = None,
+        chunks: Sequence[bytes] = (),
     ) -> tuple[int, bool]:
-        # insert or move existing match to top
+        # insert or move existing match to top; entities, when given, are
+        # stored before listeners hear about the row. blob is
+        # (hash, mime, encrypted data) for image and html captures; data
+        # may be None when has_blob() already said it is stored. chunks,
+        # for large text, are the encrypted pieces of the full payload and
+        # encrypted_text is then just its preview
+        blob_hash = None
+        if blob is not None:
+            blob_hash = blob[0]
+            if blob[2] is not None:
+                self.put_blob(*blob)
+        self._put_chunks(content_hash, chunks)
+        entry_id, created = self._store_entry(
+            encrypted_text, timestamp, is_code_flag, content_hash, kind, blob_hash, len(chunks)
+        )
+        if entities is not None:
+            self.set_entities(entry_id, entities)
+        self._notify("created" if created else "updated", "history", entry_id)
+        return entry_id, created
+
+    def _store_entry(self, encrypted_text, timestamp, is_code_flag, content_hash,
+                     kind="text", blob_hash=None, chunk_count=0) -> tuple[int, bool]:
         with self.conn:
             existing = self.conn.execute(
                 "select id from history where content_hash = ?", (content_hash,)
@@ -158,17 +354,22 @@ class DatabaseManager:
             if existing:
                 entry_id = existing[0]
                 self.conn.execute(
-                    "update history set text = ?, timestamp = ?, is_code = ? where id = ?",
-                    (encrypted_text, timestamp, int(bool(is_code_flag)), entry_id),
+                    """
+                    update history set text = ?, timestamp = ?, is_code = ?, kind = ?, blob_hash = ?,
+                        chunk_count = ?, use_count = use_count + 1
+                    where id = ?
+                    """,
+                    (encrypted_text, timestamp, int(bool(is_code_flag)), kind, blob_hash, chunk_count, entry_id),
                 )
                 return entry_id, False
             try:
                 cursor = self.conn.execute(
                     """
-                    insert into history (text, timestamp, is_code, pinned, favorite, content_hash)
-                    values (?, ?, ?, 0, 0, ?)
+                    insert into history
+                        (text, timestamp, is_code, pinned, favorite, content_hash, kind, blob_hash, chunk_count)
+                    values (?, ?, ?, 0, 0, ?, ?, ?, ?)
                     """,
-                    (encrypted_text, timestamp, int(bool(is_code_flag)), content_hash),
+                    (encrypted_text, timestamp, int(bool(is_code_flag)), content_hash, kind, blob_hash, chunk_count),
                 )
                 return int(cursor.lastrowid), True
             except sqlite3.IntegrityError:
@@ -178,8 +379,12 @@ class DatabaseManager:
                 if row is None:
                     raise
                 self.conn.execute(
-                    "update history set text = ?, timestamp = ?, is_code = ? where id = ?",
-                    (encrypted_text, timestamp, int(bool(is_code_flag)), row[0]),
+                    """
+                    update history set text = ?, timestamp = ?, is_code = ?, kind = ?, blob_hash = ?,
+                        chunk_count = ?, use_count = use_count + 1
+                    where id = ?
+                    """,
+                    (encrypted_text, timestamp, int(bool(is_code_flag)), kind, blob_hash, chunk_count, row[0]),
                 )
                 return int(row[0]), False
 
@@ -191,48 +396,112 @@ class DatabaseManager:
                 "insert into history (text, timestamp, is_code, pinned, favorite) values (?, ?, ?, 0, 0)",
                 (encrypted_text, timestamp, int(bool(is_code_flag))),
             )
-            return int(cursor.lastrowid)
+        self._notify("created", "history", cursor.lastrowid)
+        return int(cursor.lastrowid)
 
-    def get_all_entries(self, limit: int | None = None, offset: int = 0):
-        sql = "select id, text, timestamp, is_code, pinned, favorite from history order by pinned desc, timestamp desc, id desc"
-        params: tuple[int, ...] = ()
+    def get_all_entries(self, limit: int | None = None, offset: int = 0, after=None):
+        # after is the (pinned, timestamp, id) of the last row already read
+        sql = "select id, text, timestamp, is_code, pinned, favorite, kind, blob_hash from history"
+        params: tuple = ()
+        if after is not None:
+            sql += " where (pinned, timestamp, id) < (?, ?, ?)"
+            params = tuple(after)
+        sql += " order by pinned desc, timestamp desc, id desc"
         if limit is not None:
             sql += " limit ? offset ?"
-            params = (max(0, int(limit)), max(0, int(offset)))
+            params += (max(0, int(limit)), max(0, int(offset)))
         return self.conn.execute(sql, params).fetchall()
 
+    def get_recent_entries(self, limit: int):
+        return self.conn.execute(
+            "select id, text, timestamp, is_code, pinned, favorite, kind, blob_hash from history order by timestamp desc, id desc limit ?",
+            (max(0, int(limit)),),
+        ).fetchall()
+
     def count_history(self) -> int:
         return int(self.conn.execute("select count(*) from history").fetchone()[0])
 
     def get_saved_history_entries(self):
         return self.conn.execute(
             """
-            select id, text, timestamp, is_code, pinned, favorite from history
+            select id, text, timestamp, is_code, pinned, favorite, kind, blob_hash from history
             where pinned = 1 or favorite = 1
             order by pinned desc, timestamp desc, id desc
             """
         ).fetchall()
 
+    def get_history_entry(self, entry_id):
+        return self.conn.execute(
+            "select id, text, timestamp, is_code, pinned, favorite, kind, blob_hash from history where id = ?", (entry_id,)
+        ).fetchone()
+
+    def get_use_counts(self) -> dict[int, int]:
+        # how often each row was copied again after it was first stored
+        return dict(self.conn.execute("select id, use_count from history where use_count > 0"))
+
+    def get_use_count(self, entry_id) -> int:
+        row = self.conn.execute("select use_count from history where id = ?", (entry_id,)).fetchone()
+        return int(row[0]) if row else 0
+
     def get_entry_by_id(self, entry_id):
         return self.conn.execute(
-            "select text, pinned, favorite from history where id = ?", (entry_id,)
+            "select text, pinned, favorite, kind, blob_hash from history where id = ?", (entry_id,)
         ).fetchone()
 
     def update_pin_state(self, entry_id, new_state):
         with self.conn:
             self.conn.execute("update history set pinned = ? where id = ?", (int(bool(new_state)), entry_id))
+        self._notify("updated", "history", entry_id)
 
     def update_favorite_state(self, entry_id, new_state):
         with self.conn:
             self.conn.execute("update history set favorite = ? where id = ?", (int(bool(new_state)), entry_id))
+        self._notify("updated", "history", entry_id)
 
-    def delete_entries_older_than(self, cutoff_timestamp):
+    def delete_entries_older_than(self, cutoff_timestamp, limit=None):
+        # with a limit only the oldest rows go, one event each, so a
+        # background pass does not make every page reload per batch
+        if limit is not None:
+            ids = [row[0] for row in self.get_entries_older_than(cutoff_timestamp, limit)]
+            self._delete_history_ids(ids)
+            return len(ids)
         with self.conn:
             self.conn.execute(
                 "delete from entry_tags where entry_type = 'history' and entry_id in (select id from history where timestamp < ?)",
                 (cutoff_timestamp,),
             )
-            self.conn.execute("delete from history where timestamp < ?", (cutoff_timestamp,))
+            deleted = self.conn.execute("delete from history where timestamp < ?", (cutoff_timestamp,)).rowcount
+        self._notify("reset", "history")
+        return deleted
+
+    def get_entries_older_than(self, cutoff_timestamp, limit=None):
+        sql = "select id, text, timestamp, is_code, pinned, favorite, kind, blob_hash from history where timestamp < ? order by timestamp, id"
+        params: tuple = (cutoff_timestamp,)
+        if limit is not None:
+            sql += " limit ?"
+            params += (max(1, int(limit)),)
+        return self.conn.execute(sql, params).fetchall()
+
+    def get_history_payloads(self, before_id: int | None = None, limit: int = 500):
+        # (id, encrypted text) newest first, for jobs that walk all history
+        if before_id is None:
+            return self.conn.execute(
+                "select id, text from history order by id desc limit ?", (max(1, int(limit)),)
+            ).fetchall()
+        return self.conn.execute(
+            "select id, text from history where id < ? order by id desc limit ?",
+            (int(before_id), max(1, int(limit))),
+        ).fetchall()
+
+    def _delete_history_ids(self, ids):
+        with self.conn:
+            self.conn.executemany(
+                "delete from entry_tags where entry_id = ? and entry_type = 'history'",
+                [(entry_id,) for entry_id in ids],
+            )
+            self.conn.executemany("delete from history where id = ?", [(entry_id,) for entry_id in ids])
+        for entry_id in ids:
+            self._notify("deleted", "history", entry_id)
 
     def delete_entry_by_id(self, entry_id):
         with self.conn:
@@ -240,17 +509,24 @@ class DatabaseManager:
                 "delete from entry_tags where entry_id = ? and entry_type = 'history'", (entry_id,)
             )
             self.conn.execute("delete from history where id = ?", (entry_id,))
+        self._notify("deleted", "history", entry_id)
 
     def clear_history(self):
         with self.conn:
             self.conn.execute("delete from entry_tags where entry_type = 'history'")
             self.conn.execute("delete from history")
+            self.conn.execute("delete from thumbnails")
+            self.conn.execute("delete from blobs")
+            self.conn.execute("delete from payload_chunks")
+        self._notify("reset", "history")
 
     def update_entry_text(self, entry_id, new_encrypted_text):
         with self.conn:
             self.conn.execute("update history set text = ? where id = ?", (new_encrypted_text, entry_id))
+        self._notify("updated", "history", entry_id)
 
-    def update_entry_content(self, entry_id, encrypted_text, content_hash, is_code_flag):
+    def update_entry_content(self, entry_id, encrypted_text, content_hash, is_code_flag, chunks=()):
+        self._put_chunks(content_hash, chunks)
         with self.conn:
             duplicate = self.conn.execute(
                 "select id from history where content_hash = ? and id <> ?", (content_hash, entry_id)
@@ -260,14 +536,26 @@ class DatabaseManager:
                     "select pinned, favorite from history where id = ?", (entry_id,)
                 ).fetchone() or (0, 0)
                 self._merge_history_rows(duplicate[0], entry_id, state[0], state[1])
-                return int(duplicate[0])
-            self.conn.execute(
-                "update history set text = ?, content_hash = ?, is_code = ? where id = ?",
-                (encrypted_text, content_hash, int(bool(is_code_flag)), entry_id),
-            )
-            return int(entry_id)
+                retained_id = int(duplicate[0])
+            else:
+                self.conn.execute(
+                    """
+                    update history set text = ?, content_hash = ?, is_code = ?, entities_indexed = 0,
+                        kind = 'text', blob_hash = null, chunk_count = ?
+                    where id = ?
+                    """,
+                    (encrypted_text, content_hash, int(bool(is_code_flag)), len(chunks), entry_id),
+                )
+                self.conn.execute("delete from entities where entry_id = ?", (entry_id,))
+                retained_id = int(entry_id)
+        self._notify("updated", "history", retained_id)
+        return retained_id
 
-    def reencrypt_payloads(self, transform: Callable[[bytes | str], bytes | str]):
+    def reencrypt_payloads(
+        self,
+        transform: Callable[[bytes | str], bytes | str],
+        transform_bytes: Callable[[bytes], bytes] | None = None,
+    ):
         history_updates = [
             (transform(payload), entry_id)
             for entry_id, payload in self.conn.execute("select id, text from history").fetchall()
@@ -276,9 +564,270 @@ class DatabaseManager:
             (transform(payload), snippet_id)
             for snippet_id, payload in self.conn.execute("select id, text from snippets").fetchall()
         ]
+        entity_updates = [
+            (transform(payload), entity_id)
+            for entity_id, payload in self.conn.execute("select id, value from entities").fetchall()
+        ]
+        chunk_updates = [
+            (transform(payload), chunk_hash, seq)
+            for chunk_hash, seq, payload in self.conn.execute("select hash, seq, data from payload_chunks").fetchall()
+        ]
+        blob_updates = thumbnail_updates = []
+        if transform_bytes is not None:
+            blob_updates = [
+                (transform_bytes(data), blob_hash)
+                for blob_hash, data in self.conn.execute("select hash, data from blobs").fetchall()
+            ]
+            thumbnail_updates = [
+                (transform_bytes(data), blob_hash, size)
+                for blob_hash, size, data in self.conn.execute("select blob_hash, size, data from thumbnails").fetchall()
+            ]
         with self.conn:
             self.conn.executemany("update history set text = ? where id = ?", history_updates)
             self.conn.executemany("update snippets set text = ? where id = ?", snippet_updates)
+            self.conn.executemany("update entities set value = ? where id = ?", entity_updates)
+            self.conn.executemany("update payload_chunks set data = ? where hash = ? and seq = ?", chunk_updates)
+            self.conn.executemany("update blobs set data = ? where hash = ?", blob_updates)
+            self.conn.executemany("update thumbnails set data = ? where blob_hash = ? and size = ?", thumbnail_updates)
+        self._notify("reset", "history")
+        self._notify("reset", "snippet")
+
+    # Entities ------------------------------------------------------------
+
+    def set_entities(
+        self,
+        entry_id: int,
+        entities: Iterable[tuple[str, int, int, str, bytes | str]],
+    ) -> None:
+        # rows are (kind, start, end, value_hash, encrypted_value)
+        rows = [(entry_id, *entity) for entity in entities]
+        with self.conn:
+            self.conn.execute("delete from entities where entry_id = ?", (entry_id,))
+            self.conn.executemany(
+                """
+                insert into entities (entry_id, kind, start_offset, end_offset, value_hash, value)
+                values (?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            self.conn.execute("update history set entities_indexed = 1 where id = ?", (entry_id,))
+
+    def get_entities(self, entry_id):
+        return self.conn.execute(
+            """
+            select kind, start_offset, end_offset, value from entities
+            where entry_id = ? order by start_offset
+            """,
+            (entry_id,),
+        ).fetchall()
+
+    def get_history_entries_with_entity(self, kind: str, limit: int | None = None, offset: int = 0, after=None):
+        sql = """
+            select id, text, timestamp, is_code, pinned, favorite, kind, blob_hash from history h
+            where exists (select 1 from entities e where e.entry_id = h.id and e.kind = ?)
+        """
+        params: tuple = (kind,)
+        if after is not None:
+            sql += " and (pinned, timestamp, id) < (?, ?, ?)"
+            params += tuple(after)
+        sql += " order by pinned desc, timestamp desc, id desc"
+        if limit is not None:
+            sql += " limit ? offset ?"
+            params += (max(0, int(limit)), max(0, int(offset)))
+        return self.conn.execute(sql, params).fetchall()
+
+    def entry_has_entity(self, entry_id, kind: str) -> bool:
+        return self.conn.execute(
+            "select 1 from entities where entry_id = ? and kind = ? limit 1", (entry_id, kind)
+        ).fetchone() is not None
+
+    def get_history_ids_with_entity(self, kind: str) -> set[int]:
+        return {row[0] for row in self.conn.execute("select distinct entry_id from entities where kind = ?", (kind,))}
+
+    def count_history_with_entity(self, kind: str) -> int:
+        return int(
+            self.conn.execute(
+                "select count(distinct entry_id) from entities where kind = ?", (kind,)
+            ).fetchone()[0]
+        )
+
+    def get_entity_values(self, kind: str):
+        # one encrypted sample per distinct value, most recently copied first
+        return self.conn.execute(
+            """
+            select e.value_hash, min(e.value), count(distinct e.entry_id), max(h.timestamp)
+            from entities e join history h on h.id = e.entry_id
+            where e.kind = ?
+            group by e.value_hash
+            order by max(h.timestamp) desc
+            """,
+            (kind,),
+        ).fetchall()
+
+    def get_entry_ids_for_entity_value(self, value_hash: str) -> list[int]:
+        return [
+            row[0]
+            for row in self.conn.execute(
+                "select distinct entry_id from entities where value_hash = ?", (value_hash,)
+            )
+        ]
+
+    def index_entities(
+        self,
+        decrypt: Callable[[bytes | str], str],
+        extract: Callable[[str], Iterable[tuple[str, int, int, str, bytes | str]]],
+        limit: int | None = None,
+    ) -> int:
+        # backfill entity rows for history captured before the index existed
+        sql = "select id, text from history where entities_indexed = 0 order by timestamp desc, id desc"
+        params: tuple[int, ...] = ()
+        if limit is not None:
+            sql += " limit ?"
+            params = (max(0, int(limit)),)
+        indexed = 0
+        for entry_id, encrypted_text in self.conn.execute(sql, params).fetchall():
+            plain_text = decrypt(encrypted_text)
+            self.set_entities(entry_id, extract(plain_text) if plain_text else ())
+            indexed += 1
+        return indexed
+
+    # Blobs ---------------------------------------------------------------
+
+    def put_blob(self, blob_hash: str, mime: str, data: bytes) -> bool:
+        # stored once per hash; a repeat capture of the same content is free
+        with self.conn:
+            cursor = self.conn.execute(
+                "insert or ignore into blobs (hash, mime, size, data) values (?, ?, ?, ?)",
+                (blob_hash, mime, len(data), data),
+            )
+        return cursor.rowcount > 0
+
+    def has_blob(self, blob_hash: str) -> bool:
+        return self.conn.execute("select 1 from blobs where hash = ?", (blob_hash,)).fetchone() is not None
+
+    def get_blob(self, blob_hash: str):
+        # (mime, encrypted data) or None
+        return self.conn.execute("select mime, data from blobs where hash = ?", (blob_hash,)).fetchone()
+
+    def get_thumbnail(self, blob_hash: str, size: int):
+        row = self.conn.execute(
+            "select data from thumbnails where blob_hash = ? and size = ?", (blob_hash, int(size))
+        ).fetchone()
+        return row[0] if row else None
+
+    def put_thumbnail(self, blob_hash: str, size: int, data: bytes) -> None:
+        with self.conn:
+            self.conn.execute(
+                "insert or replace into thumbnails (blob_hash, size, data) values (?, ?, ?)",
+                (blob_hash, int(size), data),
+            )
+
+    def delete_orphan_blobs(self, limit: int | None = None) -> int:
+        # blobs (and their thumbnails) and out-of-row text no history row
+        # points at any more
+        sql = "select hash from blobs b where not exists (select 1 from history h where h.blob_hash = b.hash)"
+        params: tuple[int, ...] = ()
+        if limit is not None:
+            sql += " limit ?"
+            params = (max(1, int(limit)),)
+        hashes = [(row[0],) for row in self.conn.execute(sql, params).fetchall()]
+        chunk_sql = (
+            "select distinct hash from payload_chunks c where not exists "
+            "(select 1 from history h where h.content_hash = c.hash and h.chunk_count > 0)"
+        )
+        if limit is not None:
+            chunk_sql += " limit ?"
+        chunk_hashes = [(row[0],) for row in self.conn.execute(chunk_sql, params).fetchall()]
+        with self.conn:
+            self.conn.executemany("delete from thumbnails where blob_hash = ?", hashes)
+            self.conn.executemany("delete from blobs where hash = ?", hashes)
+            self.conn.executemany("delete from payload_chunks where hash = ?", chunk_hashes)
+        return len(hashes) + len(chunk_hashes)
+
+    # Out-of-row text --------------------------------------------------------
+
+    def _put_chunks(self, content_hash: str, chunks: Sequence[bytes]) -> None:
+        if not chunks:
+            return
+        with self.conn:
+            stored = self.conn.execute(
+                "select count(*) from payload_chunks where hash = ?", (content_hash,)
+            ).fetchone()[0]
+            if stored == len(chunks):
+                return  # same content, already out of row
+            self.conn.execute("delete from payload_chunks where hash = ?", (content_hash,))
+            self.conn.executemany(
+                "insert into payload_chunks (hash, seq, data) values (?, ?, ?)",
+                [(content_hash, seq, chunk) for seq, chunk in enumerate(chunks)],
+            )
+
+    def get_payload_chunks(self, entry_id: int, limit: int | None = None) -> list[bytes]:
+        # encrypted pieces of a large entry, read with incremental blob i/o so
+        # no query ever drags them along with the row; empty when inline.
+        # with a limit only the leading pieces are read
+        sql = """
+            select c.rowid from payload_chunks c
+            join history h on h.content_hash = c.hash
+            where h.id = ? and h.chunk_count > 0
+            order by c.seq
+            """
+        params: tuple[int, ...] = (entry_id,)
+        if limit is not None:
+            sql += " limit ?"
+            params += (max(1, int(limit)),)
+        rows = self.conn.execute(sql, params).fetchall()
+        chunks = []
+        for (rowid,) in rows:
+            with self.conn.blobopen("payload_chunks", "data", rowid, readonly=True) as blob:
+                chunks.append(blob.read())
+        return chunks
+
+    def get_chunked_entry_ids(self) -> set[int]:
+        return {row[0] for row in self.conn.execute("select id from history where chunk_count > 0")}
+
+    def get_inline_entries_over(self, min_length: int, before_id: int | None = None, limit: int = 50):
+        # rows stored before out-of-row text existed that may need moving
+        sql = "select id, text from history where chunk_count = 0 and length(text) > ?"
+        params: list = [int(min_length)]
+        if before_id is not None:
+            sql += " and id < ?"
+            params.append(int(before_id))
+        sql += " order by id desc limit ?"
+        params.append(max(1, int(limit)))
+        return self.conn.execute(sql, params).fetchall()
+
+    def move_text_out_of_row(self, entry_id: int, encrypted_preview, chunks: Sequence[bytes]) -> None:
+        row = self.conn.execute("select content_hash from history where id = ?", (entry_id,)).fetchone()
+        if row is None or row[0] is None or not chunks:
+            return
+        self._put_chunks(row[0], chunks)
+        with self.conn:
+            self.conn.execute(
+                "update history set text = ?, chunk_count = ? where id = ?",
+                (encrypted_preview, len(chunks), entry_id),
+            )
+
+    def blob_usage(self) -> tuple[int, int]:
+        # (blob count, stored bytes)
+        count, size = self.conn.execute("select count(*), coalesce(sum(length(data)), 0) from blobs").fetchone()
+        return int(count), int(size)
+
+    def storage_stats(self) -> dict:
+        # file size, row counts and mean payload size for the diagnostics page
+        page_count = self.conn.execute("pragma page_count").fetchone()[0]
+        page_size = self.conn.execute("pragma page_size").fetchone()[0]
+        wal_path = f"{self.db_path}-wal"
+        wal_bytes = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+        stats = {"size_bytes": page_count * page_size + wal_bytes, "wal_bytes": wal_bytes}
+        for table in ("history", "snippets", "entities", "blobs", "thumbnails", "payload_chunks"):
+            stats[f"rows.{table}"] = int(self.conn.execute(f"select count(*) from {table}").fetchone()[0])
+        inline = self.conn.execute(
+            "select coalesce(sum(length(text)), 0) from history where chunk_count = 0"
+        ).fetchone()[0]
+        chunked = self.conn.execute("select coalesce(sum(length(data)), 0) from payload_chunks").fetchone()[0]
+        history = stats["rows.history"]
+        stats["avg_payload_bytes"] = (inline + chunked) / history if history else 0.0
+        return stats
 
     # Snippets ------------------------------------------------------------
 
@@ -289,7 +838,8 @@ class DatabaseManager:
                 "insert into snippets (title, text, language, timestamp, favorite) values (?, ?, ?, ?, 0)",
                 (title, encrypted_text, language, timestamp),
             )
-            return int(cursor.lastrowid)
+        self._notify("created", "snippet", cursor.lastrowid)
+        return int(cursor.lastrowid)
 
     def get_all_snippets(self):
         return self.conn.execute(
@@ -322,12 +872,14 @@ class DatabaseManager:
         values.append(snippet_id)
         with self.conn:
             self.conn.execute(f"update snippets set {', '.join(updates)} where id = ?", values)
+        self._notify("updated", "snippet", snippet_id)
 
     def update_snippet_favorite(self, snippet_id, new_state):
         with self.conn:
             self.conn.execute(
                 "update snippets set favorite = ? where id = ?", (int(bool(new_state)), snippet_id)
             )
+        self._notify("updated", "snippet", snippet_id)
 
     def delete_snippet_by_id(self, snippet_id):
         with self.conn:
@@ -335,6 +887,7 @@ class DatabaseManager:
                 "delete from entry_tags where entry_id = ? and entry_type = 'snippet'", (snippet_id,)
             )
             self.conn.execute("delete from snippets where id = ?", (snippet_id,))
+        self._notify("deleted", "snippet", snippet_id)
 
     # Tags ----------------------------------------------------------------
 
@@ -353,7 +906,8 @@ class DatabaseManager:
         try:
             with self.conn:
                 cursor = self.conn.execute("insert into tags (name, color) values (?, ?)", (name, color))
-                return int(cursor.lastrowid)
+            self._notify("created", "tag", cursor.lastrowid)
+            return int(cursor.lastrowid)
         except sqlite3.IntegrityError:
             row = self.conn.execute(
                 "select id from tags where name = ? collate nocase", (name,)
@@ -372,6 +926,7 @@ class DatabaseManager:
         with self.conn:
             self.conn.execute("delete from entry_tags where tag_id = ?", (tag_id,))
             self.conn.execute("delete from tags where id = ?", (tag_id,))
+        self._notify("deleted", "tag", tag_id)
 
     def get_tag_counts(self):
         return self.conn.execute(
@@ -388,6 +943,7 @@ class DatabaseManager:
                 "insert or ignore into entry_tags (entry_id, tag_id, entry_type) values (?, ?, ?)",
                 (entry_id, tag_id, entry_type),
             )
+        self._notify("tagged", entry_type, entry_id)
 
     def untag_entry(self, entry_id, tag_id, entry_type="history"):
         with self.conn:
@@ -395,6 +951,7 @@ class DatabaseManager:
                 "delete from entry_tags where entry_id = ? and tag_id = ? and entry_type = ?",
                 (entry_id, tag_id, entry_type),
             )
+        self._notify("tagged", entry_type, entry_id)
 
     def set_tags_for_entry(self, entry_id: int, tag_ids: Iterable[int], entry_type="history"):
         wanted = {int(tag_id) for tag_id in tag_ids}
@@ -416,6 +973,7 @@ class DatabaseManager:
                     "insert or ignore into entry_tags (entry_id, tag_id, entry_type) values (?, ?, ?)",
                     (entry_id, tag_id, entry_type),
                 )
+        self._notify("tagged", entry_type, entry_id)
 
     def get_tags_for_entry(self, entry_id, entry_type="history"):
         return self.conn.execute(
@@ -428,6 +986,12 @@ class DatabaseManager:
             (entry_id, entry_type),
         ).fetchall()
 
+    def entry_has_tag(self, entry_id, tag_id, entry_type="history") -> bool:
+        return self.conn.execute(
+            "select 1 from entry_tags where entry_id = ? and tag_id = ? and entry_type = ?",
+            (entry_id, tag_id, entry_type),
+        ).fetchone() is not None
+
     def get_entries_by_tag(self, tag_id):
         return self.conn.execute(
             "select entry_id, entry_type from entry_tags where tag_id = ?", (tag_id,)
@@ -436,7 +1000,7 @@ class DatabaseManager:
     def get_history_entries_by_tag(self, tag_id):
         return self.conn.execute(
             """
-            select h.id, h.text, h.timestamp, h.is_code, h.pinned, h.favorite
+            select h.id, h.text, h.timestamp, h.is_code, h.pinned, h.favorite, h.kind, h.blob_hash
             from history h join entry_tags et
               on h.id = et.entry_id and et.entry_type = 'history'
             where et.tag_id = ?
@@ -457,8 +1021,54 @@ class DatabaseManager:
             (tag_id,),
         ).fetchall()
 
+    # Maintenance ---------------------------------------------------------
+
+    def get_maintenance_states(self) -> dict[str, tuple]:
+        # name -> (state json, status, last_finished, last_duration_ms, runs, error)
+        rows = self.conn.execute(
+            "select name, state, status, last_finished, last_duration_ms, runs, error from maintenance"
+        ).fetchall()
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    def save_maintenance_state(self, name, state, status, last_finished, last_duration_ms, runs, error=None):
+        with self.conn:
+            self.conn.execute(
+                """
+                insert into maintenance (name, state, status, last_finished, last_duration_ms, runs, error)
+                values (?, ?, ?, ?, ?, ?, ?)
+                on conflict(name) do update set
+                    state = excluded.state, status = excluded.status,
+                    last_finished = excluded.last_finished,
+                    last_duration_ms = excluded.last_duration_ms,
+                    runs = excluded.runs, error = excluded.error
+                """,
+                (name, state, status, last_finished, float(last_duration_ms), int(runs), error),
+            )
+
+    def checkpoint(self) -> None:
+        # fold the wal back into the main file without waiting on readers
+        self.conn.execute("pragma wal_checkpoint(passive)")
+
+    def optimize(self) -> None:
+        self.conn.execute("pragma optimize")
+
+    def release_connection(self) -> None:
+        # closes the calling thread's connection; the next use opens another
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._connections_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+
     def close(self):
-        self.conn.close()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
 
 
 class ArchiveDatabaseManager:
@@ -469,24 +1079,67 @@ class ArchiveDatabaseManager:
             create table if not exists archive_history (
                 id integer primary key autoincrement,
                 text blob, timestamp text, is_code integer,
-                pinned integer default 0, favorite integer default 0
+                pinned integer default 0, favorite integer default 0,
+                kind text not null default 'text', blob_hash text
+            )
+            """
+        )
+        columns = {row[1] for row in self.conn.execute("pragma table_info(archive_history)")}
+        if "kind" not in columns:
+            self.conn.execute("alter table archive_history add column kind text not null default 'text'")
+        if "blob_hash" not in columns:
+            self.conn.execute("alter table archive_history add column blob_hash text")
+        # large text and image/html payloads move with their rows, still encrypted
+        self.conn.execute(
+            """
+            create table if not exists archive_chunks (
+                archive_id integer not null, seq integer not null, data blob not null,
+                primary key (archive_id, seq)
             )
             """
         )
+        self.conn.execute(
+            "create table if not exists archive_blobs (hash text primary key, mime text not null, data blob not null)"
+        )
         self.conn.commit()
 
-    def add_entries(self, entries):
+    def add_entries(self, entries, chunks=None, blobs=None):
+        # entries as from get_entries_older_than; chunks maps an entry id to
+        # its encrypted payload pieces and blobs a blob hash to (mime, data)
+        chunks, blobs = chunks or {}, blobs or {}
         with self.conn:
+            for entry in entries:
+                archive_id = self.conn.execute(
+                    "insert into archive_history (text, timestamp, is_code, pinned, favorite, kind, blob_hash) "
+                    "values (?, ?, ?, ?, ?, ?, ?)",
+                    (entry[1], entry[2], entry[3], entry[4], entry[5],
+                     entry[6] if len(entry) > 6 else "text", entry[7] if len(entry) > 7 else None),
+                ).lastrowid
+                self.conn.executemany(
+                    "insert into archive_chunks (archive_id, seq, data) values (?, ?, ?)",
+                    [(archive_id, seq, chunk) for seq, chunk in enumerate(chunks.get(entry[0], ()))],
+                )
             self.conn.executemany(
-                "insert into archive_history (text, timestamp, is_code, pinned, favorite) values (?, ?, ?, ?, ?)",
-                [(entry[1], entry[2], entry[3], entry[4], entry[5]) for entry in entries],
+                "insert or ignore into archive_blobs (hash, mime, data) values (?, ?, ?)",
+                [(blob_hash, mime, data) for blob_hash, (mime, data) in blobs.items()],
             )
 
+    def get_payload_chunks(self, archive_id):
+        return [row[0] for row in self.conn.execute(
+            "select data from archive_chunks where archive_id = ? order by seq", (archive_id,)
+        )]
+
+    def get_blob(self, blob_hash):
+        return self.conn.execute("select mime, data from archive_blobs where hash = ?", (blob_hash,)).fetchone()
+
     def close(self):
         self.conn.close()
 
 
-def manage_history(db_manager, settings, app_dir):
+@profiler.profiled("manage_history")
+def manage_history(db_manager, settings, app_dir, limit=None):
+    # applies the retention setting; with a limit it handles at most that
+    # many of the oldest rows and returns how many it moved or deleted
     mode = settings.get("history_management", "keep")
     try:
         threshold_days = max(1, int(settings.get("history_threshold_days", "30")))
@@ -494,19 +1147,32 @@ def manage_history(db_manager, settings, app_dir):
         threshold_days = 30
     cutoff = (datetime.datetime.now() - datetime.timedelta(days=threshold_days)).strftime("%Y-%m-%d %H:%M:%S")
     if mode == "auto-delete":
-        db_manager.delete_entries_older_than(cutoff)
-    elif mode == "archive":
-        entries = [entry for entry in db_manager.get_all_entries() if entry[2] < cutoff]
+        return db_manager.delete_entries_older_than(cutoff, limit)
+    if mode == "archive":
+        entries = db_manager.get_entries_older_than(cutoff, limit)
         if entries:
+            # the full payload has to be copied before the orphan sweep drops it
+            chunks = {entry[0]: db_manager.get_payload_chunks(entry[0]) for entry in entries}
+            blobs = {}
+            for entry in entries:
+                blob = db_manager.get_blob(entry[7]) if entry[7] else None
+                if blob is not None:
+                    blobs[entry[7]] = (blob[0], blob[1])
             archive = ArchiveDatabaseManager(os.path.join(app_dir, "clipboard_manager_archive.db"))
             try:
-                archive.add_entries(entries)
+                archive.add_entries(entries, chunks, blobs)
             finally:
                 archive.close()
-            with db_manager.conn:
-                ids = [entry[0] for entry in entries]
-                db_manager.conn.executemany(
-                    "delete from entry_tags where entry_id = ? and entry_type = 'history'",
-                    [(entry_id,) for entry_id in ids],
-                )
-                db_manager.conn.executemany("delete from history where id = ?", [(entry_id,) for entry_id in ids])
+            ids = [entry[0] for entry in entries]
+            if limit is not None:
+                db_manager._delete_history_ids(ids)
+            else:
+                with db_manager.conn:
+                    db_manager.conn.executemany(
+                        "delete from entry_tags where entry_id = ? and entry_type = 'history'",
+                        [(entry_id,) for entry_id in ids],
+                    )
+                    db_manager.conn.executemany("delete from history where id = ?", [(entry_id,) for entry_id in ids])
+                db_manager._notify("reset", "history")
+        return len(entries)
+    return 0
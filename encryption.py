@@ -8,11 +8,20 @@ from cryptography.hazmat.backends import default_backend
 import secrets
 import hmac
 
+from metrics import registry
+
 ENCRYPTION_VERSION = 2
 PBKDF2_ITERATIONS_NORMAL = 200_000
 PBKDF2_ITERATIONS_HARD = 600_000
 SALT_SIZE = 16
 
+# text longer than this is stored out of row in chunks, with a preview inline
+LARGE_TEXT_CHARS = 64 * 1024
+PREVIEW_CHARS = 2048
+CHUNK_CHARS = 256 * 1024
+# how far into an entry text searches look, the same as rule matching
+SEARCH_CHARS = 64 * 1024
+
 
 class DummyFernet:
     def encrypt(self, text_bytes):
@@ -38,6 +47,7 @@ def derive_key(password: str, salt: bytes, mode: str = 'normal') -> bytes:
     return base64.urlsafe_b64encode(kdf.derive(password.encode()))
 
 
+@registry.timed("crypto.encrypt_ms")
 def encrypt_text(text, fernet, version=ENCRYPTION_VERSION, salt=None, mode='normal'):
     if version == 2 and salt is not None:
         token = fernet.encrypt(text.encode())
@@ -46,6 +56,7 @@ def encrypt_text(text, fernet, version=ENCRYPTION_VERSION, salt=None, mode='norm
         return fernet.encrypt(text.encode())
 
 
+@registry.timed("crypto.decrypt_ms")
 def decrypt_text_strict(token, fernet, password=None):
     # decrypt payload or throw if format/key is broken
     if isinstance(token, bytes):
@@ -62,6 +73,45 @@ def decrypt_text_strict(token, fernet, password=None):
     return fernet.decrypt(token.encode() if isinstance(token, str) else token).decode()
 
 
+def encrypt_bytes(data: bytes, fernet) -> bytes:
+    # binary payloads (images, html) carry no version prefix
+    return fernet.encrypt(data)
+
+
+def decrypt_bytes(token: bytes, fernet) -> bytes:
+    return fernet.decrypt(token)
+
+
+def encrypt_payload(text, fernet):
+    # (row token, chunk tokens); chunks is empty for text kept inline
+    if len(text) <= LARGE_TEXT_CHARS:
+        return encrypt_text(text, fernet), []
+    chunks = [encrypt_text(text[start:start + CHUNK_CHARS], fernet)
+              for start in range(0, len(text), CHUNK_CHARS)]
+    return encrypt_text(text[:PREVIEW_CHARS], fernet), chunks
+
+
+def decrypt_entry_text(db_manager, entry_id, token, fernet):
+    # full text of a history entry; token is its row text (the preview
+    # when the payload is out of row)
+    chunks = db_manager.get_payload_chunks(entry_id)
+    if chunks:
+        return "".join(decrypt_text(chunk, fernet) for chunk in chunks)
+    return decrypt_text(token, fernet)
+
+
+def searchable_text(db_manager, entry_id, text, fernet):
+    # what text searches match for a history entry whose row text decrypts
+    # to text: the first SEARCH_CHARS of the payload when it is out of row.
+    # only a full-length preview can have chunks behind it
+    if len(text) != PREVIEW_CHARS:
+        return text
+    chunks = db_manager.get_payload_chunks(entry_id, -(-SEARCH_CHARS // CHUNK_CHARS))
+    if not chunks:
+        return text
+    return "".join(decrypt_text(chunk, fernet) for chunk in chunks)[:SEARCH_CHARS]
+
+
 def decrypt_text(token, fernet, password=None):
     # quiet fallback for UI reads
     try:
@@ -105,13 +155,18 @@ def content_fingerprint(text: str, secret: bytes) -> str:
     return hmac.new(secret, normalized.encode("utf-8"), hashlib.sha256).hexdigest()
 
 
+def data_fingerprint(data: bytes, secret: bytes) -> str:
+    # same as content_fingerprint for raw bytes, e.g. image pixels
+    return hmac.new(secret, data, hashlib.sha256).hexdigest()
+
+
 def reencrypt_all_data(db_manager, old_password, new_password, settings, mode='normal'):
     entries = db_manager.get_all_entries()
     new_salt = generate_salt()
     new_key = derive_key(new_password, new_salt, mode)
     new_fernet = Fernet(new_key)
     for entry in entries:
-        entry_id, enc_text, timestamp, is_code, pinned, favorite = entry
+        entry_id, enc_text = entry[0], entry[1]
         plain = decrypt_text(enc_text, None, old_password)
         if plain:
             new_enc = encrypt_text(plain, new_fernet, version=2, salt=new_salt, mode=mode)
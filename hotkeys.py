@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import sys
+import time
 
 from PySide6.QtCore import QAbstractNativeEventFilter, QCoreApplication, QObject, Signal
 from shortcut_parser import parse_shortcut
@@ -41,11 +42,17 @@ class GlobalHotkeyManager(QObject):
         super().__init__(parent)
         self._bound = False
         self._fallback_handle = None
+        # perf_counter() when the hotkey last fired, before the signal is queued
+        self.activated_at = None
         self._native_filter = _WindowsNativeFilter(
-            self.activated.emit, self._HOTKEY_ID, self._WM_HOTKEY
+            self._trigger, self._HOTKEY_ID, self._WM_HOTKEY
         )
         QCoreApplication.instance().installNativeEventFilter(self._native_filter)
 
+    def _trigger(self):
+        self.activated_at = time.perf_counter()
+        self.activated.emit()
+
     @staticmethod
     def _virtual_key(key: str) -> int:
         if len(key) == 1 and key.isalpha():
@@ -96,7 +103,7 @@ class GlobalHotkeyManager(QObject):
 
             self._fallback_handle = keyboard.add_hotkey(
                 shortcut,
-                self.activated.emit,
+                self._trigger,
                 suppress=False,
                 trigger_on_release=True,
             )
@@ -1,26 +1,35 @@
 import sys
 import os
 
+# started before the heavy imports so they show up as the first phase
+from startup_trace import StartupTracer
+
+startup_trace = StartupTracer()
+
 # SHUT UP QT QPA MIME WARNINGS
 os.environ["QT_LOGGING_RULES"] = "qt.qpa.mime.warning=false;qt.qpa.mime*=false"
 
 import tempfile
 import base64
 import hashlib
+import multiprocessing
 from PySide6.QtWidgets import QApplication, QDialog, QMessageBox
-from PySide6.QtCore import QLockFile, qInstallMessageHandler
+from PySide6.QtCore import QLockFile, QTimer, qInstallMessageHandler
 from PySide6.QtGui import QIcon
 from cryptography.fernet import Fernet
-from database import DatabaseManager, manage_history
-from encryption import (DummyFernet, content_fingerprint, decrypt_text,
-                        decrypt_text_strict, derive_key, encrypt_text,
-                        generate_salt, load_key)
+from database import DatabaseManager
+from encryption import (DummyFernet, content_fingerprint, decrypt_bytes,
+                        decrypt_text, decrypt_text_strict, derive_key,
+                        encrypt_bytes, encrypt_text, generate_salt, load_key)
 from settings import SettingsManager
-from ui.startup_wizard import StartupWizard
+from profiling import profiler
+from tracing import tracer
 from ui.fluent_window import ClipboardManagerWindow
 from qfluentwidgets import setTheme, Theme
 from utils import get_app_font, get_system_theme
 
+startup_trace.lap("imports")
+
 
 def _qt_message_handler(mode, context, message):
     # filter out qt clipboard spam
@@ -44,6 +53,7 @@ def main():
     app.setApplicationName("Clipboard Manager")
     app.setOrganizationName("ClipboardManager")
     app.setQuitOnLastWindowClosed(False)
+    startup_trace.lap("qt app")
     home_dir = os.path.expanduser("~")
     app_dir = os.path.join(home_dir, "ClipboardManager")
     os.makedirs(app_dir, exist_ok=True)
@@ -77,6 +87,9 @@ def main():
 
     settings = SettingsManager.load_settings(settings_file, settings_encryption_key)
     if settings is None:
+        # only the first run needs the wizard
+        from ui.startup_wizard import StartupWizard
+
         wizard = StartupWizard()
         if wizard.exec() == QDialog.Accepted:
             settings = wizard.settings
@@ -97,6 +110,9 @@ def main():
             setTheme(Theme.LIGHT)
 
     app.setFont(get_app_font(10, settings))
+    tracer.set_enabled(settings.get("trace_enabled", False))
+    profiler.configure(os.path.join(app_dir, "profiles"), settings.get("profile_mode", "off"))
+    startup_trace.lap("settings")
 
     migrate_legacy_personal_key = False
     if settings.get("encryption_enabled", True):
@@ -118,14 +134,17 @@ def main():
             fernet = Fernet(key)
     else:
         fernet = DummyFernet()
+    startup_trace.lap("kdf" if settings.get("use_personal_key", False) else "key load")
 
     db_manager = DatabaseManager(db_path)
+    startup_trace.lap("db open")
     if migrate_legacy_personal_key:
         new_salt = generate_salt()
         new_fernet = Fernet(derive_key(settings["personal_key"], new_salt, "normal"))
         try:
             db_manager.reencrypt_payloads(
-                lambda token: encrypt_text(decrypt_text_strict(token, fernet), new_fernet)
+                lambda token: encrypt_text(decrypt_text_strict(token, fernet), new_fernet),
+                lambda token: encrypt_bytes(decrypt_bytes(token, fernet), new_fernet),
             )
         except Exception as exc:
             db_manager.close()
@@ -141,12 +160,16 @@ def main():
         settings["encryption_mode"] = "normal"
         SettingsManager.save_settings(settings, settings_file, settings_encryption_key)
         fernet = new_fernet
-
-    db_manager.reconcile_content_hashes(
-        lambda token: decrypt_text(token, fernet),
-        lambda text: content_fingerprint(text, settings_encryption_key),
-    )
-    manage_history(db_manager, settings, app_dir)
+        startup_trace.lap("reencrypt")
+
+    if not db_manager.content_hash_index_ready():
+        # one-time dedupe of databases from before content hashes; later
+        # backfills, retention and entity indexing run as idle maintenance
+        db_manager.reconcile_content_hashes(
+            lambda token: decrypt_text(token, fernet),
+            lambda text: content_fingerprint(text, settings_encryption_key),
+        )
+        startup_trace.lap("reconcile")
     window = ClipboardManagerWindow(
         db_manager,
         fernet,
@@ -155,9 +178,23 @@ def main():
         fingerprint_key=settings_encryption_key,
         settings_encryption_key=settings_encryption_key,
     )
+    startup_trace.lap("window build")
     window.show()
+    startup_trace.lap("window show")
+
+    def first_turn():
+        # the tray icon and window are on screen once the loop first turns
+        startup_trace.mark("tray visible")
+        startup_trace.write(os.path.join(app_dir, "startup.log"))
+        for name, offset, duration in startup_trace.phases:
+            tracer.record(name, startup_trace.origin + offset, duration, cat="startup")
+        tracer.record("startup", startup_trace.origin, startup_trace.elapsed(), cat="startup")
+
+    QTimer.singleShot(0, first_turn)
     return app.exec()
 
 
 if __name__ == "__main__":
+    # rule backtests run in spawned processes, which frozen builds must dispatch
+    multiprocessing.freeze_support()
     sys.exit(main())
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import datetime
+import json
+import time
+from collections.abc import Callable
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class MaintenanceTask:
+    # one named housekeeping job, advanced a small step at a time.
+    #
+    # step(state) does a bounded unit of work and returns True once the
+    # current run is finished. state is a json-able dict (e.g. a cursor)
+    # that survives between slices and restarts; each new run starts with
+    # it empty. interval None runs the task once per application start,
+    # otherwise it is due interval seconds after its last finished run.
+
+    def __init__(self, name: str, step: Callable[[dict], bool], priority: int = 100,
+                 interval: float | None = None):
+        self.name = name
+        self.step = step
+        self.priority = priority
+        self.interval = interval
+        self.state: dict = {}
+        self.status = "pending"  # pending, running, idle, error
+        self.last_finished: str | None = None
+        self.last_duration_ms = 0.0  # busy time of the last complete run
+        self.runs = 0
+        self.error: str | None = None
+        self.slices = 0  # this start only
+        self.requested = False
+        self._run_ms = 0.0
+        self._finished_this_start = False
+
+    def due(self, now: datetime.datetime) -> bool:
+        if self.status == "running" or self.requested:
+            return True
+        if self.interval is None:
+            return not self._finished_this_start
+        if self.last_finished is None:
+            return True
+        try:
+            finished = datetime.datetime.strptime(self.last_finished, TIMESTAMP_FORMAT)
+        except ValueError:
+            return True
+        return (now - finished).total_seconds() >= self.interval
+
+
+class MaintenanceScheduler:
+    # runs registered tasks in short slices while the user is not typing,
+    # clicking or copying. The owner calls run_slice() from a timer; the
+    # scheduler itself never blocks for longer than one slice.
+
+    SLICE_MS = 10
+    IDLE_AFTER = 1.5  # seconds since the last input or capture
+    HIDDEN_IDLE_AFTER = 0.25  # only captures count while the window is hidden
+
+    def __init__(self, db_manager, clock: Callable[[], float] = time.monotonic):
+        self.db_manager = db_manager
+        self.clock = clock
+        self.tasks: dict[str, MaintenanceTask] = {}
+        self._saved = db_manager.get_maintenance_states()
+        self._last_activity = float("-inf")
+
+    def register(self, task: MaintenanceTask) -> MaintenanceTask:
+        saved = self._saved.get(task.name)
+        if saved is not None:
+            state, status, last_finished, last_duration_ms, runs, error = saved
+            # a run cut short by the last exit resumes from its saved state
+            try:
+                task.state = json.loads(state) if status == "running" else {}
+            except ValueError:
+                task.state = {}
+            task.status = status
+            task.last_finished = last_finished
+            task.last_duration_ms = last_duration_ms or 0.0
+            task.runs = runs or 0
+            task.error = error
+        self.tasks[task.name] = task
+        return task
+
+    def request(self, name: str) -> None:
+        # run a task again soon, e.g. after the setting it applies changed
+        if name in self.tasks:
+            self.tasks[name].requested = True
+
+    def note_activity(self) -> None:
+        self._last_activity = self.clock()
+
+    def is_idle(self, hidden: bool = False) -> bool:
+        quiet = self.HIDDEN_IDLE_AFTER if hidden else self.IDLE_AFTER
+        return self.clock() - self._last_activity >= quiet
+
+    def next_task(self) -> MaintenanceTask | None:
+        now = datetime.datetime.now()
+        due = [task for task in self.tasks.values() if task.due(now)]
+        return min(due, key=lambda task: (task.priority, task.name)) if due else None
+
+    def run_slice(self, hidden: bool = False, budget_ms: float | None = None) -> bool:
+        # returns whether work is still due, so the caller can tick sooner
+        if not self.is_idle(hidden):
+            return self.next_task() is not None
+        budget = (self.SLICE_MS if budget_ms is None else budget_ms) / 1000
+        started = time.perf_counter()
+        touched = {}
+        # at least one step per slice, then as many as fit the budget
+        while True:
+            task = self.next_task()
+            if task is None:
+                break
+            touched[task.name] = task
+            self._step(task)
+            if time.perf_counter() - started >= budget:
+                break
+        for task in touched.values():
+            self._save(task)
+        return self.next_task() is not None
+
+    def _step(self, task: MaintenanceTask) -> None:
+        if task.status != "running":
+            task.status = "running"
+            task.state = {}
+            task.error = None
+            task._run_ms = 0.0
+        step_started = time.perf_counter()
+        try:
+            finished = task.step(task.state)
+        except Exception as exc:
+            task.error = f"{type(exc).__name__}: {exc}"
+            finished = True
+        task._run_ms += (time.perf_counter() - step_started) * 1000
+        task.slices += 1
+        if finished:
+            task.status = "error" if task.error else "idle"
+            task.state = {}
+            task.last_finished = datetime.datetime.now().strftime(TIMESTAMP_FORMAT)
+            task.last_duration_ms = task._run_ms
+            task.runs += 1
+            task.requested = False
+            task._finished_this_start = True
+
+    def _save(self, task: MaintenanceTask) -> None:
+        self.db_manager.save_maintenance_state(
+            task.name, json.dumps(task.state), task.status, task.last_finished,
+            task.last_duration_ms, task.runs, task.error,
+        )
+
+    def save(self) -> None:
+        # keeps cursors of unfinished runs for the next start
+        for task in self.tasks.values():
+            self._save(task)
+
+    def status(self) -> list[dict]:
+        return [
+            {
+                "name": task.name,
+                "priority": task.priority,
+                "status": task.status,
+                "last_finished": task.last_finished,
+                "last_duration_ms": task.last_duration_ms,
+                "runs": task.runs,
+                "slices": task.slices,
+                "error": task.error,
+            }
+            for task in sorted(self.tasks.values(), key=lambda task: (task.priority, task.name))
+        ]
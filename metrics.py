@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import functools
+import json
+import math
+import threading
+import time
+from collections.abc import Callable
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    # either set() from the code that knows the value, or read from a
+    # callback when a snapshot is taken
+
+    def __init__(self, read: Callable[[], float] | None = None):
+        self.value = 0.0
+        self.read = read
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def get(self) -> float:
+        return self.read() if self.read is not None else self.value
+
+
+class Histogram:
+    # log-linear buckets in the style of HdrHistogram.
+    #
+    # values are kept as integer thousandths (microseconds for ms timings)
+    # and bucketed by their top SUB_BITS significant bits, so every bucket
+    # is within 1/2**(SUB_BITS-1) of the values in it whatever the scale.
+    # Recording is a dict increment; memory grows with the spread of the
+    # values, not with how many there are.
+
+    SUB_BITS = 7
+    SCALE = 1000
+
+    def __init__(self):
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _index(cls, units: int) -> int:
+        shift = units.bit_length() - cls.SUB_BITS
+        if shift <= 0:
+            return units
+        return (shift << cls.SUB_BITS) + (units >> shift)
+
+    @classmethod
+    def _value(cls, index: int) -> float:
+        # midpoint of the bucket, back in recorded units
+        shift = index >> cls.SUB_BITS
+        if shift == 0:
+            return index / cls.SCALE
+        low = (index & ((1 << cls.SUB_BITS) - 1)) << shift
+        return (low + (1 << shift) / 2) / cls.SCALE
+
+    def record(self, value: float) -> None:
+        value = max(0.0, value)
+        index = self._index(int(value * self.SCALE))
+        with self._lock:
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+            self.count += 1
+            self.total += value
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, math.ceil(q / 100 * self.count))
+            seen = 0
+            for index in sorted(self.buckets):
+                seen += self.buckets[index]
+                if seen >= rank:
+                    return min(max(self._value(index), self.min), self.max)
+            return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+
+class MetricsRegistry:
+    # process-wide counters, gauges and histograms, looked up by dotted name.
+    #
+    # cheap enough for the capture worker and per-row UI loads: one dict
+    # lookup and one short lock per update. Collectors are callables that
+    # return {name: value} and are only run when a snapshot is taken, for
+    # numbers that cost a query (database size, row counts).
+
+    def __init__(self):
+        self.started = time.time()
+        self.counters: dict[str, Counter] = {}
+        self.gauges: dict[str, Gauge] = {}
+        self.histograms: dict[str, Histogram] = {}
+        self._collectors: dict[str, Callable[[], dict]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str) -> Counter:
+        counter = self.counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self.counters.setdefault(name, Counter())
+        return counter
+
+    def gauge(self, name: str, read: Callable[[], float] | None = None) -> Gauge:
+        gauge = self.gauges.get(name)
+        if gauge is None:
+            with self._lock:
+                gauge = self.gauges.setdefault(name, Gauge(read))
+        if read is not None:
+            gauge.read = read
+        return gauge
+
+    def histogram(self, name: str) -> Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        self.counter(name).inc(amount)
+
+    def observe(self, name: str, value: float) -> None:
+        self.histogram(name).record(value)
+
+    def timed(self, name: str):
+        # decorator recording each call's wall time in ms, failures included
+        def decorate(function):
+            histogram = self.histogram(name)
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    histogram.record((time.perf_counter() - started) * 1000)
+            return wrapper
+        return decorate
+
+    def add_collector(self, prefix: str, collect: Callable[[], dict]) -> None:
+        with self._lock:
+            self._collectors[prefix] = collect
+
+    def remove_collector(self, prefix: str) -> None:
+        with self._lock:
+            self._collectors.pop(prefix, None)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started = time.time()
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> dict:
+        uptime = max(time.time() - self.started, 1e-9)
+        per_minute = 60 / uptime
+        # other threads add names while this runs; read copies
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+            gauge_items = list(self.gauges.items())
+            collectors = list(self._collectors.items())
+        gauges = {}
+        for name, gauge in gauge_items:
+            try:
+                gauges[name] = gauge.get()
+            except Exception:
+                gauges[name] = None
+        for prefix, collect in collectors:
+            try:
+                values = collect()
+            except Exception:
+                continue
+            for name, value in values.items():
+                gauges[f"{prefix}.{name}"] = value
+        return {
+            "taken_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "uptime_s": uptime,
+            "counters": {
+                name: {"value": counter.value, "per_min": counter.value * per_minute}
+                for name, counter in counters
+            },
+            "gauges": dict(sorted(gauges.items())),
+            "histograms": {
+                name: {**histogram.summary(), "per_min": histogram.count * per_minute}
+                for name, histogram in histograms
+            },
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def hit_ratio(self, name: str) -> float | None:
+        # name.hits / (name.hits + name.misses), None before the first lookup
+        hits = self.counters.get(f"{name}.hits")
+        misses = self.counters.get(f"{name}.misses")
+        total = (hits.value if hits else 0) + (misses.value if misses else 0)
+        return (hits.value if hits else 0) / total if total else None
+
+
+registry = MetricsRegistry()
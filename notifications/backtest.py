@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import re
+import threading
+import time
+
+from PySide6.QtCore import QObject, Signal
+
+from encryption import CHUNK_CHARS, decrypt_text
+from notifications.rule_matcher import RuleMatcher, required_literals
+
+# worker side ------------------------------------------------------------
+# plain functions and tuples only: chunks are matched in spawned processes
+
+SAMPLES = 5
+SLOW_MATCH_MS = 50  # one search slower than this counts as a timeout
+
+_compiled: dict[str, re.Pattern] = {}
+
+
+def _empty_report():
+    # hits, fired (first matching rule), skipped by prefilter, total ms, max ms, slow, samples
+    return [0, 0, 0, 0.0, 0.0, 0, []]
+
+
+def match_chunk(fernet, rules, rows, scan_chars=RuleMatcher.SCAN_CHARS):
+    # rules are (name, pattern) in rule order; rows are (id, encrypted text)
+    # or, for out-of-row text, (id, tuple of its leading encrypted chunks).
+    # every rule is tried on every clip so each gets its own hit count
+    reports = {name: _empty_report() for name, _pattern in rules}
+    compiled = []
+    for name, pattern in rules:
+        if pattern not in _compiled:
+            _compiled[pattern] = re.compile(pattern, re.IGNORECASE)
+        compiled.append((name, _compiled[pattern], required_literals(pattern)))
+    for entry_id, token in rows:
+        if isinstance(token, tuple):
+            text = "".join(decrypt_text(chunk, fernet) for chunk in token)[:scan_chars]
+        else:
+            text = decrypt_text(token, fernet)[:scan_chars]
+        if not text:
+            continue
+        folded = text.casefold()
+        fired = False
+        for name, regex, literals in compiled:
+            report = reports[name]
+            if literals is not None and not any(literal in folded for literal in literals):
+                report[2] += 1
+                continue
+            started = time.perf_counter()
+            found = regex.search(text)
+            elapsed = (time.perf_counter() - started) * 1000
+            report[3] += elapsed
+            report[4] = max(report[4], elapsed)
+            if elapsed > SLOW_MATCH_MS:
+                report[5] += 1
+            if found:
+                report[0] += 1
+                if not fired:
+                    report[1] += 1
+                    fired = True
+                if len(report[6]) < SAMPLES:
+                    report[6].append((entry_id, found.group(0)[:80]))
+    return reports
+
+
+# GUI side ---------------------------------------------------------------
+
+class BacktestResult:
+    def __init__(self, rules):
+        self.rules = [name for name, _pattern in rules]
+        self.reports = {name: _empty_report() for name in self.rules}
+        self.clips = 0
+        self.elapsed = 0.0  # seconds
+        self.timed_out = False
+        self.cancelled = False
+        self.error = None
+
+    def merge(self, reports):
+        for name, (hits, fired, skipped, total, worst, slow, samples) in reports.items():
+            report = self.reports[name]
+            report[0] += hits
+            report[1] += fired
+            report[2] += skipped
+            report[3] += total
+            report[4] = max(report[4], worst)
+            report[5] += slow
+            report[6].extend(samples[:SAMPLES - len(report[6])])
+
+    def summary(self, name):
+        hits, fired, skipped, total, worst, slow, samples = self.reports[name]
+        searched = self.clips - skipped
+        return {
+            "hits": hits,
+            "fired": fired,
+            "rate": hits / self.clips if self.clips else 0.0,
+            "skipped": skipped,
+            "mean_ms": total / searched if searched else 0.0,
+            "max_ms": worst,
+            "timeouts": slow,
+            "samples": samples,
+        }
+
+
+class BacktestJob(QObject):
+    # runs rules over every history entry without blocking the GUI.
+    #
+    # a feeder thread reads encrypted rows in CHUNK_ROWS batches and hands
+    # them to a process pool, so decrypting and matching use every core.
+    # A chunk that does not come back within CHUNK_DEADLINE seconds means
+    # some rule is backtracking catastrophically; the pool is killed and
+    # the result is marked timed_out. Signals arrive on the GUI thread.
+
+    CHUNK_ROWS = 500
+    CHUNK_DEADLINE = 20.0
+    # out-of-row pieces needed to cover what RuleMatcher scans live
+    SCAN_CHUNKS = -(-RuleMatcher.SCAN_CHARS // CHUNK_CHARS)
+
+    progress = Signal(int, int)  # clips done, total
+    finished = Signal(object)  # BacktestResult
+
+    def __init__(self, db_manager, fernet, rules, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.fernet = fernet
+        self.rules = [(name, pattern) for name, pattern in rules]
+        self._cancel = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="rule-backtest", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _run(self):
+        result = BacktestResult(self.rules)
+        started = time.perf_counter()
+        total = self.db_manager.count_history()
+        workers = max(1, min(os.cpu_count() or 1, 8) - 1)
+        pool = None
+        try:
+            # spawn, not fork: the parent has Qt and worker threads running
+            pool = multiprocessing.get_context("spawn").Pool(workers)
+            pending = []
+            before_id = None
+            # the row text of a large clip is only its preview
+            chunked = self.db_manager.get_chunked_entry_ids()
+            while not self._cancel.is_set():
+                rows = self.db_manager.get_history_payloads(before_id, self.CHUNK_ROWS)
+                if not rows:
+                    break
+                before_id = rows[-1][0]
+                rows = [
+                    (entry_id, tuple(self.db_manager.get_payload_chunks(entry_id, self.SCAN_CHUNKS)))
+                    if entry_id in chunked else (entry_id, token)
+                    for entry_id, token in rows
+                ]
+                pending.append((len(rows), pool.apply_async(match_chunk, (self.fernet, self.rules, rows))))
+                # keep a couple of chunks per worker in flight, not the whole history
+                while len(pending) > workers * 2:
+                    self._collect(pending.pop(0), result, total)
+            while pending and not self._cancel.is_set():
+                self._collect(pending.pop(0), result, total)
+        except multiprocessing.TimeoutError:
+            result.timed_out = True
+        except Exception as exc:
+            result.error = f"{type(exc).__name__}: {exc}"
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            self.db_manager.release_connection()
+        result.cancelled = self._cancel.is_set()
+        result.elapsed = time.perf_counter() - started
+        self.finished.emit(result)
+
+    def _collect(self, chunk, result, total):
+        count, pending = chunk
+        result.merge(pending.get(self.CHUNK_DEADLINE))
+        result.clips += count
+        self.progress.emit(result.clips, total)
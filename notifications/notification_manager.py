@@ -1,10 +1,13 @@
 from PySide6.QtWidgets import QSystemTrayIcon
-from PySide6.QtCore import QObject, Signal
+from PySide6.QtCore import QObject, QTimer, Signal
 import json
 import os
 import re
+import threading
 from datetime import datetime
 
+from notifications.rule_matcher import RuleMatcher
+
 class NotificationRule:
     def __init__(self, name, pattern, enabled=True):
         self.name = name
@@ -33,12 +36,27 @@ class NotificationRule:
 class NotificationManager(QObject):
     # signal emitted when a notification rule is triggered
     notification_triggered = Signal(str, str)  # rule_name, matched_text
+
+    # rule edits are written SAVE_DELAY_MS after the last one; matches
+    # within COALESCE_MS of a shown toast are summed up in a single one
+    SAVE_DELAY_MS = 500
+    COALESCE_MS = 2000
     
     def __init__(self, app_dir):
         super().__init__()
         self.app_dir = app_dir
         self.rules = []
         self.tray_icon = None
+        self.rule_stats = {}
+        self._stats_lock = threading.Lock()
+        self._matcher = RuleMatcher([])
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.timeout.connect(self.save_rules)
+        self._pending = []  # (rule name, text) matched since the last toast
+        self._toast_timer = QTimer(self)
+        self._toast_timer.setSingleShot(True)
+        self._toast_timer.timeout.connect(self._show_pending)
         self.load_rules()
         
     def set_tray_icon(self, tray_icon):
@@ -53,6 +71,7 @@ class NotificationManager(QObject):
                     self.rules = [NotificationRule.from_dict(rule) for rule in rules_data]
             except Exception:
                 self.rules = []
+            self._rebuild()
         else:
             # default rules
             self.rules = [
@@ -60,8 +79,23 @@ class NotificationManager(QObject):
                 NotificationRule("URL", r"https?://\S+"),
                 NotificationRule("Email", r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
             ]
+            self._rebuild()
             self.save_rules()
-            
+
+    def _rebuild(self):
+        # swapped in whole; a capture already matching keeps the old one
+        self._matcher = RuleMatcher(self.rules, self.rule_stats, self._stats_lock)
+
+    def _schedule_save(self):
+        self._rebuild()
+        self._save_timer.start(self.SAVE_DELAY_MS)
+
+    def flush(self):
+        # writes edits still waiting for the save timer
+        if self._save_timer.isActive():
+            self._save_timer.stop()
+            self.save_rules()
+
     def save_rules(self):
         rules_path = os.path.join(self.app_dir, "notification_rules.json")
         rules_data = [rule.to_dict() for rule in self.rules]
@@ -71,34 +105,76 @@ class NotificationManager(QObject):
     def add_rule(self, name, pattern):
         rule = NotificationRule(name, pattern)
         self.rules.append(rule)
-        self.save_rules()
+        self._schedule_save()
         return rule
         
+    def update_rule(self, name, pattern):
+        # keeps the rule's place in the order and its enabled state; the list
+        # is swapped whole, like remove_rule, so a running match is unaffected
+        for index, rule in enumerate(self.rules):
+            if rule.name == name:
+                updated = NotificationRule(name, pattern, rule.enabled)
+                self.rules = self.rules[:index] + [updated] + self.rules[index + 1:]
+                self._schedule_save()
+                return updated
+        return None
+
     def remove_rule(self, name):
         self.rules = [rule for rule in self.rules if rule.name != name]
-        self.save_rules()
+        self._schedule_save()
         
     def toggle_rule(self, name):
         for rule in self.rules:
             if rule.name == name:
                 rule.enabled = not rule.enabled
-                self.save_rules()
+                self._schedule_save()
                 return rule.enabled
         return False
         
     def check_text(self, text):
-        if not self.tray_icon or not text:
+        rule = self.match(text)
+        if rule is not None:
+            self.notify(rule, text)
+
+    def match(self, text):
+        # first enabled rule matching text; touches no Qt state, so the
+        # capture worker can call it
+        return self._matcher.match(text)
+
+    def get_stats(self):
+        # rule name -> checks, skipped by the literal prefilter, hits, mean and max regex ms
+        with self._stats_lock:
+            return {
+                name: {
+                    "checks": checks,
+                    "skipped": skipped,
+                    "hits": hits,
+                    "mean_ms": total / (checks - skipped) if checks > skipped else 0.0,
+                    "max_ms": worst,
+                }
+                for name, (checks, skipped, hits, total, worst) in self.rule_stats.items()
+            }
+
+    def notify(self, rule, text):
+        self.notification_triggered.emit(rule.name, text)
+        if not self.tray_icon:
             return
-            
-        for rule in self.rules:
-            if rule.matches(text):
-                # truncate text for notification
-                display_text = text[:100] + "..." if len(text) > 100 else text
-                self.tray_icon.showMessage(
-                    "Clipboard Manager",
-                    f"Matched {rule.name}: {display_text}",
-                    QSystemTrayIcon.Information,
-                    3000
-                )
-                self.notification_triggered.emit(rule.name, text)
-                break 
\ No newline at end of file
+        self._pending.append((rule.name, text))
+        if not self._toast_timer.isActive():
+            # the first match of a burst shows at once, the rest together after it
+            self._show_pending()
+            self._toast_timer.start(self.COALESCE_MS)
+
+    def _show_pending(self):
+        pending, self._pending = self._pending, []
+        if not pending or not self.tray_icon:
+            return
+        if len(pending) == 1:
+            name, text = pending[0]
+            # truncate text for notification
+            display_text = text[:100] + "..." if len(text) > 100 else text
+            message = f"Matched {name}: {display_text}"
+        else:
+            names = list(dict.fromkeys(name for name, _text in pending))
+            message = f"Matched {', '.join(names)} in {len(pending)} clips"
+        self.tray_icon.showMessage("Clipboard Manager", message, QSystemTrayIcon.Information, 3000) 
\ No newline at end of file
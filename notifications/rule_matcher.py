@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # python < 3.11
+    import sre_constants
+    import sre_parse
+
+
+def required_literals(pattern: str, flags: int = re.IGNORECASE) -> frozenset[str] | None:
+    # casefolded strings of which every match contains at least one, or
+    # None when nothing useful can be said (the rule then always runs)
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except re.error:
+        return None
+    literals = _required(list(parsed))
+    if not literals:
+        return None
+    return frozenset(literal.casefold() for literal in literals)
+
+
+def _required(items) -> set[str] | None:
+    candidates = []
+    run = []
+
+    def end_run():
+        if run:
+            candidates.append({"".join(run)})
+            run.clear()
+
+    for op, value in items:
+        if op is sre_constants.LITERAL:
+            run.append(chr(value))
+            continue
+        end_run()
+        if op is sre_constants.SUBPATTERN:
+            inner = _required(list(value[-1]))
+        elif op is sre_constants.BRANCH:
+            branches = [_required(list(branch)) for branch in value[1]]
+            inner = set().union(*branches) if all(branches) else None
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and value[0] >= 1:
+            inner = _required(list(value[2]))
+        else:
+            inner = None
+        if inner:
+            candidates.append(inner)
+    end_run()
+    if not candidates:
+        return None
+    # the most selective: longest shortest-alternative, then fewest alternatives
+    return max(candidates, key=lambda literals: (min(map(len, literals)), -len(literals)))
+
+
+class RuleMatcher:
+    # the enabled rules compiled into one matcher.
+    #
+    # each rule's regex is reduced to literals it cannot match without;
+    # a clip is casefolded once, the distinct literals of all rules are
+    # looked up in it (each at most once), and only rules whose literals
+    # are present run their regex. Rules keep their order: the first
+    # match wins. Only the first SCAN_CHARS of a clip are looked at.
+    # Immutable once built, so the capture worker can use it while the
+    # GUI thread builds a replacement.
+
+    SCAN_CHARS = 64 * 1024
+
+    def __init__(self, rules, stats: dict | None = None, lock: threading.Lock | None = None):
+        self.rules = [rule for rule in rules if rule.enabled]
+        self.prefilters = [required_literals(rule.pattern) for rule in self.rules]
+        self.stats = stats if stats is not None else {}  # name -> [checks, skipped, hits, total ms, max ms]
+        self._lock = lock or threading.Lock()
+
+    def match(self, text: str):
+        if not text or not self.rules:
+            return None
+        scanned = text[:self.SCAN_CHARS]
+        folded = None
+        present: dict[str, bool] = {}
+        for rule, literals in zip(self.rules, self.prefilters):
+            if literals is not None:
+                if folded is None:
+                    folded = scanned.casefold()
+                gated = True
+                for literal in literals:
+                    if literal not in present:
+                        present[literal] = literal in folded
+                    if present[literal]:
+                        gated = False
+                        break
+                if gated:
+                    self._record(rule.name, skipped=True)
+                    continue
+            started = time.perf_counter()
+            found = rule.compiled_pattern.search(scanned) is not None
+            self._record(rule.name, elapsed=(time.perf_counter() - started) * 1000, hit=found)
+            if found:
+                return rule
+        return None
+
+    def _record(self, name, elapsed=0.0, hit=False, skipped=False):
+        with self._lock:
+            stats = self.stats.setdefault(name, [0, 0, 0, 0.0, 0.0])
+            stats[0] += 1
+            if skipped:
+                stats[1] += 1
+                return
+            stats[2] += int(hit)
+            stats[3] += elapsed
+            stats[4] = max(stats[4], elapsed)
@@ -2,8 +2,15 @@ import os
 import sys
 import importlib.util
 import json
+import threading
+import time
+from collections import deque
+import queue
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 from PySide6.QtCore import QObject, Signal
 
+from tracing import tracer
+
 class Plugin:
     def __init__(self, name, version, description, author):
         self.name = name
@@ -33,16 +40,90 @@ class Plugin:
         plugin.enabled = data.get("enabled", True)
         return plugin
 
+class PluginStats:
+    # timings of one plugin's hook calls since the app started
+
+    WINDOW = 200  # recent calls kept for percentiles
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.overruns = 0
+        self.consecutive_overruns = 0
+        self.last_error = None
+        self.durations = deque(maxlen=self.WINDOW)  # ms
+
+    def percentile(self, fraction):
+        if not self.durations:
+            return 0.0
+        ordered = sorted(self.durations)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "overruns": self.overruns,
+            "p50_ms": self.percentile(0.5),
+            "p99_ms": self.percentile(0.99),
+            "last_error": self.last_error,
+        }
+
+
+class HookWorker:
+    # one daemon thread running a plugin's hooks in order. A hook that never
+    # returns keeps its thread, but being a daemon it cannot hold up exit
+
+    def __init__(self, name):
+        self._calls = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name=f"plugin-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, method, *args):
+        future = Future()
+        self._calls.put((future, method, args))
+        return future
+
+    def close(self):
+        self._calls.put(None)
+
+    def _run(self):
+        while True:
+            call = self._calls.get()
+            if call is None:
+                return
+            future, method, args = call
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(method(*args))
+            except BaseException as exc:
+                future.set_exception(exc)
+
+
 class PluginManager(QObject):
     # signals for plugin events
     plugin_loaded = Signal(str)  # plugin_name
     plugin_unloaded = Signal(str)  # plugin_name
-    
-    def __init__(self, app_dir):
+    plugin_disabled = Signal(str, str)  # plugin_name, reason
+
+    # hooks run on the capture worker, each plugin on its own thread so one
+    # that hangs can be given up on. A call over budget_ms counts as an
+    # overrun; MAX_OVERRUNS in a row, or one call past HANG_FACTOR times
+    # the budget, disables the plugin
+    DEFAULT_BUDGET_MS = 50
+    MAX_OVERRUNS = 3
+    HANG_FACTOR = 20
+
+    def __init__(self, app_dir, budget_ms=DEFAULT_BUDGET_MS):
         super().__init__()
         self.app_dir = app_dir
         self.plugins = {}
         self.plugins_dir = os.path.join(app_dir, "plugins")
+        self.budget_ms = budget_ms
+        self.stats = {}
+        self._workers = {}
+        self._lock = threading.Lock()
         self.load_plugin_config()
         self.scan_plugins()
         
@@ -109,6 +190,9 @@ class PluginManager(QObject):
             plugin = self.plugins[name]
             if not plugin.enabled:
                 plugin.enabled = True
+                with self._lock:
+                    if name in self.stats:
+                        self.stats[name].consecutive_overruns = 0
                 self.save_plugin_config()
                 return True
         return False
@@ -134,4 +218,77 @@ class PluginManager(QObject):
             method = getattr(plugin.instance, method_name, None)
             if method:
                 return method(*args, **kwargs)
-        return None 
\ No newline at end of file
+        return None
+
+    # Hooks ---------------------------------------------------------------
+
+    def set_budget(self, budget_ms):
+        self.budget_ms = max(1, int(budget_ms))
+
+    def run_clipboard_hooks(self, text, plugins=None):
+        # on_clipboard_change of each plugin in turn; a plugin that fails,
+        # runs over its hard limit or was disabled meanwhile leaves the text as is
+        for plugin in self.get_enabled_plugins() if plugins is None else plugins:
+            if not plugin.enabled or not plugin.instance or not hasattr(plugin.instance, 'on_clipboard_change'):
+                continue
+            result = self._call_hook(plugin, plugin.instance.on_clipboard_change, text)
+            if isinstance(result, str) and result:
+                text = result
+        return text
+
+    def _call_hook(self, plugin, method, *args):
+        budget = self.budget_ms
+        worker = self._workers.get(plugin.name)
+        if worker is None:
+            worker = self._workers[plugin.name] = HookWorker(plugin.name)
+        started = time.perf_counter()
+        result = error = None
+        hung = False
+        try:
+            result = worker.submit(method, *args).result(timeout=budget * self.HANG_FACTOR / 1000)
+        except FutureTimeout:
+            hung = True
+            # the thread cannot be stopped; leave it to finish (or not) on its
+            # own and give the plugin a fresh one if it is enabled again
+            worker.close()
+            self._workers.pop(plugin.name, None)
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+        elapsed = (time.perf_counter() - started) * 1000
+        tracer.record(f"plugin {plugin.name}", started, elapsed / 1000, cat="plugins",
+                      method=getattr(method, "__name__", ""), error=error, hung=hung)
+
+        reason = None
+        with self._lock:
+            stats = self.stats.setdefault(plugin.name, PluginStats())
+            stats.calls += 1
+            stats.durations.append(elapsed)
+            if error:
+                stats.errors += 1
+                stats.last_error = error
+            if elapsed > budget:
+                stats.overruns += 1
+                stats.consecutive_overruns += 1
+            else:
+                stats.consecutive_overruns = 0
+            if hung:
+                reason = f"stopped responding (no result after {elapsed:.0f} ms)"
+            elif stats.consecutive_overruns >= self.MAX_OVERRUNS:
+                reason = f"took longer than {budget} ms {stats.consecutive_overruns} times in a row"
+        if reason is not None:
+            self._auto_disable(plugin, reason)
+        return None if hung else result
+
+    def _auto_disable(self, plugin, reason):
+        if plugin.enabled:
+            plugin.enabled = False
+            try:
+                self.save_plugin_config()
+            except OSError:
+                pass
+            self.plugin_disabled.emit(plugin.name, reason)
+
+    def get_stats(self, name):
+        with self._lock:
+            stats = self.stats.get(name)
+            return stats.to_dict() if stats is not None else PluginStats().to_dict()
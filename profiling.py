@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import cProfile
+import datetime
+import functools
+import glob
+import itertools
+import os
+import threading
+import time
+import tracemalloc
+
+MODES = ("off", "cpu", "memory", "cpu+memory")
+
+
+class Profiler:
+    # opt-in cProfile and tracemalloc capture around chosen entry points.
+    #
+    # each invocation of a profiled entry point writes its own file(s) to
+    # directory: <name>-<time>-<n>.prof for cProfile (pstats / snakeviz)
+    # and .tracemalloc for the allocations still alive when it returned
+    # (tracemalloc.Snapshot.load). Only the newest KEEP per entry point are
+    # kept. Calls nested inside a profiled call are part of its profile.
+    #
+    # CLIPBOARD_MANAGER_PROFILE=cpu|memory|cpu+memory overrides the setting;
+    # CLIPBOARD_MANAGER_PROFILE_ONLY=load_entries,sync limits it to entry
+    # points whose name contains one of the given words.
+
+    ENV_VAR = "CLIPBOARD_MANAGER_PROFILE"
+    ONLY_ENV_VAR = "CLIPBOARD_MANAGER_PROFILE_ONLY"
+    KEEP = 10
+
+    def __init__(self):
+        self.forced = os.environ.get(self.ENV_VAR, "").strip().lower().replace(",", "+")
+        self.only = tuple(word.strip() for word in os.environ.get(self.ONLY_ENV_VAR, "").split(",") if word.strip())
+        self.directory: str | None = None
+        self.cpu = self.memory = False
+        self._local = threading.local()
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+        self.set_mode("off")
+
+    def configure(self, directory: str, mode: str = "off") -> None:
+        self.directory = directory
+        self.set_mode(mode)
+
+    def set_mode(self, mode: str) -> None:
+        mode = self.forced if self.forced in MODES else (mode if mode in MODES else "off")
+        self.cpu = mode in ("cpu", "cpu+memory")
+        self.memory = mode in ("memory", "cpu+memory")
+
+    @property
+    def enabled(self) -> bool:
+        return (self.cpu or self.memory) and self.directory is not None
+
+    def wants(self, name: str) -> bool:
+        return not self.only or any(word in name for word in self.only)
+
+    def profiled(self, name: str):
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or getattr(self._local, "active", False) or not self.wants(name):
+                    return function(*args, **kwargs)
+                return self._run(name, function, args, kwargs)
+            return wrapper
+        return decorate
+
+    def _run(self, name, function, args, kwargs):
+        cpu = self.cpu
+        # tracemalloc is process-wide; leave it alone if something else started it
+        memory = self.memory and not tracemalloc.is_tracing()
+        profile = cProfile.Profile() if cpu else None
+        self._local.active = True
+        if memory:
+            tracemalloc.start(25)
+        started = time.perf_counter()
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:
+                # another thread is profiling and this python allows only one
+                profile = None
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+            elapsed = time.perf_counter() - started
+            snapshot = None
+            if memory:
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+            self._local.active = False
+            self._write(name, profile, snapshot, elapsed)
+
+    def _write(self, name, profile, snapshot, elapsed):
+        stem = f"{name}-{datetime.datetime.now():%Y%m%d-%H%M%S}-{next(self._sequence):04d}-{elapsed * 1000:.0f}ms"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if profile is not None:
+                profile.dump_stats(os.path.join(self.directory, f"{stem}.prof"))
+            if snapshot is not None:
+                snapshot.dump(os.path.join(self.directory, f"{stem}.tracemalloc"))
+            self._rotate(name)
+        except OSError:
+            pass
+
+    def _rotate(self, name):
+        with self._lock:
+            for extension in (".prof", ".tracemalloc"):
+                files = sorted(glob.glob(os.path.join(glob.escape(self.directory), f"{glob.escape(name)}-*{extension}")),
+                               key=os.path.getmtime)
+                for path in files[:-self.KEEP]:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+
+profiler = Profiler()
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import datetime
+import functools
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from metrics import registry
+
+SLOW_QUERY_MS = 50.0
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_EXPLAINABLE = ("select", "insert", "update", "delete", "replace", "with")
+
+
+@functools.lru_cache(maxsize=512)
+def normalize_sql(sql: str) -> str:
+    # one line with literals and in-lists folded, so repeats aggregate.
+    # statements come from a small fixed set of literals, so it is cached
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _SPACE.sub(" ", sql).strip()
+    return _IN_LIST.sub("(?, ...)", sql)
+
+
+def format_plan(rows) -> str:
+    # explain query plan rows (id, parent, notused, detail) as an indented tree
+    depth = {0: -1}
+    lines = []
+    for node, parent, _notused, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return "\n".join(lines)
+
+
+def full_scans(plan: str, tables) -> list[str]:
+    # plan lines that read every row of one of the given tables (or aliases)
+    scans = []
+    for line in plan.splitlines():
+        words = line.split()
+        if len(words) >= 2 and words[0] == "SCAN" and words[1] in tables and "COVERING INDEX" not in line:
+            scans.append(line.strip())
+    return scans
+
+
+class QueryLog:
+    # per-statement latency and rows touched for one database, aggregated
+    # by normalized sql.
+    #
+    # a statement is timed from execute() until its cursor is exhausted or
+    # dropped, so lazily iterated selects include their fetches. Statements
+    # over slow_ms are kept with their query plan and appended to log_path.
+
+    KEEP_SLOW = 100
+    MAX_LOG_BYTES = 512 * 1024
+
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS, log_path: str | None = None):
+        self.slow_ms = slow_ms
+        self.log_path = log_path
+        self.statements: dict[str, list] = {}  # sql -> [calls, total ms, max ms, rows]
+        self.slow: deque = deque(maxlen=self.KEEP_SLOW)  # when, ms, rows, sql, plan
+        self._plans: dict[str, str] = {}
+        self._samples: dict[str, tuple] = {}  # sql -> first raw (sql, params), to explain later
+        self._lock = threading.Lock()
+
+    def record(self, conn, sql, params, elapsed_ms: float, rows: int) -> None:
+        key = normalize_sql(sql)
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = [0, 0.0, 0.0, 0]
+                self._samples[key] = (sql, params)
+            stats[0] += 1
+            stats[1] += elapsed_ms
+            stats[2] = max(stats[2], elapsed_ms)
+            stats[3] += rows
+        registry.observe("db.query_ms", elapsed_ms)
+        if elapsed_ms >= self.slow_ms:
+            self._log_slow(conn, key, sql, params, elapsed_ms, rows)
+
+    def explain(self, conn, sql, params=()) -> str:
+        if not sql.lstrip().lower().startswith(_EXPLAINABLE):
+            return ""
+        try:
+            # the plain execute, so explaining is not itself recorded
+            rows = sqlite3.Connection.execute(conn, f"explain query plan {sql}", params).fetchall()
+        except sqlite3.Error:
+            return ""
+        return format_plan(rows)
+
+    def plan(self, conn, key: str) -> str:
+        # query plan of an aggregated statement, from the first call seen
+        sample = self._samples.get(key)
+        return self.explain(conn, *sample) if sample else ""
+
+    def _log_slow(self, conn, key, sql, params, elapsed_ms, rows):
+        registry.inc("db.slow_queries")
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._plans[key] = self.explain(conn, sql, params)
+        when = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.slow.append((when, elapsed_ms, rows, key, plan))
+        if not self.log_path:
+            return
+        lines = [f"{when}  {elapsed_ms:.1f} ms  {rows} rows  {key}"]
+        lines.extend(f"    {line}" for line in plan.splitlines())
+        with self._lock:
+            try:
+                if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > self.MAX_LOG_BYTES:
+                    os.replace(self.log_path, f"{self.log_path}.1")
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+            except OSError:
+                pass
+
+    def top(self, count: int = 10) -> list[dict]:
+        # statements by total time spent in them
+        with self._lock:
+            items = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)[:count]
+        return [
+            {"sql": sql, "calls": calls, "total_ms": total, "mean_ms": total / calls, "max_ms": worst, "rows": rows}
+            for sql, (calls, total, worst, rows) in items
+        ]
+
+
+class TimedCursor(sqlite3.Cursor):
+    _open = False
+
+    def execute(self, sql, parameters=()):
+        self._sql, self._params = sql, parameters
+        self._elapsed, self._rows, self._open = 0.0, 0, False
+        started = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self._elapsed += time.perf_counter() - started
+        self._open = True
+        if self.description is None:
+            # no result rows: writes report how many they changed
+            self._rows = max(self.rowcount, 0)
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        # the first parameter set stands in for the rest when explaining
+        first = seq_of_parameters[0] if isinstance(seq_of_parameters, (list, tuple)) and seq_of_parameters else ()
+        self._sql, self._params = sql, first
+        self._elapsed, self._rows, self._open = 0.0, 0, False
+        started = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._elapsed += time.perf_counter() - started
+        self._open = True
+        self._rows = max(self.rowcount, 0)
+        self._finish()
+        return self
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._elapsed += time.perf_counter() - started
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._elapsed += time.perf_counter() - started
+        self._rows += len(rows)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._elapsed += time.perf_counter() - started
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._elapsed += time.perf_counter() - started
+            self._finish()
+            raise
+        self._elapsed += time.perf_counter() - started
+        self._rows += 1
+        return row
+
+    def __del__(self):
+        if self._open:
+            self._finish()
+
+    def _finish(self):
+        if not self._open:
+            return
+        self._open = False
+        log = getattr(self.connection, "query_log", None)
+        if log is not None:
+            log.record(self.connection, self._sql, self._params, self._elapsed * 1000, self._rows)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    # sqlite3 connection whose execute() and commits are timed into query_log
+
+    query_log: QueryLog | None = None
+
+    def execute(self, sql, parameters=()):
+        return self.cursor(TimedCursor).execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor(TimedCursor).executemany(sql, seq_of_parameters)
+
+    def __exit__(self, exc_type, exc, tb):
+        started = time.perf_counter()
+        try:
+            return super().__exit__(exc_type, exc, tb)
+        finally:
+            if self.query_log is not None:
+                self.query_log.record(self, "rollback" if exc_type else "commit", (),
+                                      (time.perf_counter() - started) * 1000, 0)
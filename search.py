@@ -0,0 +1,428 @@
+from __future__ import annotations
+
+import bisect
+import heapq
+import itertools
+import math
+import re
+import threading
+import time
+from collections.abc import Callable, Hashable, Iterable, Iterator
+from typing import Any
+
+
+class SearchSession:
+    # result cache for one lineage of growing queries ("conf" -> "confi").
+    #
+    # candidates holds every source row scanned so far whose lowercased text
+    # contains the query, in source order, as (cursor_key, lowered, payload).
+    # cursor_key is the sort key the source is paged by (descending), and
+    # cursor is the key of the last row scanned. When a new query contains
+    # the previous one, its matches must be among those candidates, so only
+    # they are re-checked before the scan resumes at cursor. Any other edit
+    # starts from scratch.
+
+    def __init__(self, scope: Hashable, query: str, previous: SearchSession | None = None):
+        self.scope = scope
+        self.query = query
+        self.candidates: list[tuple[Any, str, Any]] = []
+        self.cursor: Any = None
+        self.exhausted = False
+        self.narrowed = False
+        self._seed: list[tuple[Any, str, Any]] = []
+        self._resume: Any = None
+        if (previous is not None and previous.scope == scope and previous.query
+                and previous.query in query and previous.cursor is not None):
+            # read the cursor before the list; a scan still running for the
+            # previous query may append rows past it, which are re-scanned
+            cursor, exhausted = previous.cursor, previous.exhausted
+            self._seed = [row for row in list(previous.candidates) if row[0] >= cursor]
+            self._resume = cursor
+            self.exhausted = exhausted and len(self._seed) == len(previous.candidates)
+            self.narrowed = True
+
+    def matches(
+        self,
+        rows: Callable[[Any], Iterable[tuple[Any, str, Any]]],
+        prepare: Callable[[Any], Any] = lambda raw: raw,
+    ) -> Iterator[Any | None]:
+        # rows(after) yields (cursor_key, lowered, raw) for source rows past
+        # `after` (None for the start); prepare(raw) builds the cached payload
+        # for a new match. Yields payloads, or None for rows that did not match.
+        for key, lowered, payload in self._seed:
+            if self.query in lowered:
+                self.candidates.append((key, lowered, payload))
+                yield payload
+            else:
+                yield None
+        self._seed = []
+        self.cursor = self._resume
+        if self.exhausted:
+            return
+        for key, lowered, raw in rows(self.cursor):
+            if self.query in lowered:
+                payload = prepare(raw)
+                self.candidates.append((key, lowered, payload))
+                self.cursor = key
+                yield payload
+            else:
+                self.cursor = key
+                yield None
+        self.exhausted = True
+
+
+# fzf-style scoring: every matched character earns SCORE_MATCH plus a bonus for
+# where it lands; gaps between matched characters cost GAP_START + GAP_EXTENSION
+# per extra character. The first query character's bonus counts double.
+SCORE_MATCH = 16
+GAP_START = -3
+GAP_EXTENSION = -1
+BONUS_WHITESPACE = 10
+BONUS_DELIMITER = 9
+BONUS_BOUNDARY = 8
+BONUS_CONSECUTIVE = -(GAP_START + GAP_EXTENSION)
+FIRST_CHAR_MULTIPLIER = 2
+
+# bonus for a match that follows this character; letters and digits get none
+_BOUNDARY_BONUS = {chr(code): BONUS_BOUNDARY for code in range(128) if not chr(code).isalnum()}
+_BOUNDARY_BONUS.update(dict.fromkeys("/\\,:;|-_.=", BONUS_DELIMITER))
+_BOUNDARY_BONUS.update(dict.fromkeys(" \t\r\n", BONUS_WHITESPACE))
+
+
+def score_positions(text: str, positions: list[int]) -> int:
+    score = 0
+    chunk_bonus = 0
+    previous = -2
+    first = True
+    for position in positions:
+        bonus = _BOUNDARY_BONUS.get(text[position - 1], 0) if position else BONUS_WHITESPACE
+        if position == previous + 1:
+            # a run keeps the bonus of the boundary it started on
+            if bonus < chunk_bonus:
+                bonus = chunk_bonus
+            if bonus < BONUS_CONSECUTIVE:
+                bonus = BONUS_CONSECUTIVE
+            chunk_bonus = bonus
+        else:
+            if not first:
+                score += GAP_START + GAP_EXTENSION * (position - previous - 2)
+            chunk_bonus = bonus
+        score += SCORE_MATCH + (bonus * FIRST_CHAR_MULTIPLIER if first else bonus)
+        first = False
+        previous = position
+    return score
+
+
+def fuzzy_positions(query: str, text: str) -> list[int] | None:
+    # earliest in-order positions of query's characters in text
+    positions = []
+    start = 0
+    for char in query:
+        position = text.find(char, start)
+        if position < 0:
+            return None
+        positions.append(position)
+        start = position + 1
+    return positions
+
+
+def fuzzy_score(query: str, text: str) -> int | None:
+    # both arguments are expected lowercased; None when query is not a subsequence
+    positions = fuzzy_positions(query, text)
+    if positions is None:
+        return None
+    return _best_score(query, text, positions)
+
+
+def _boundary_positions(query: str, text: str, positions: list[int]) -> list[int]:
+    # re-align from the earliest positions, preferring to extend a run and
+    # then to land on a word boundary, without passing the latest position
+    # each character can take and still leave room for the rest
+    latest = [0] * len(query)
+    limit = len(text)
+    for index in range(len(query) - 1, -1, -1):
+        limit = text.rfind(query[index], 0, limit)
+        latest[index] = limit
+    aligned = []
+    start = 0
+    for index, char in enumerate(query):
+        position = max(start, positions[index])
+        if not (aligned and text[start:start + 1] == char and start == aligned[-1] + 1):
+            candidate = position
+            while 0 <= candidate <= latest[index]:
+                if candidate == 0 or text[candidate - 1] in _BOUNDARY_BONUS:
+                    position = candidate
+                    break
+                candidate = text.find(char, candidate + 1, latest[index] + 1)
+        else:
+            position = start
+        aligned.append(position)
+        start = position + 1
+    return aligned
+
+
+def _best_score(query: str, text: str, positions: list[int]) -> int:
+    # the earliest alignment can scatter ("config" in "c..o..nfig"), so it is
+    # re-aligned onto word boundaries and checked against contiguous occurrences
+    start = text.find(query)
+    if start == 0 or start > 0 and text[start - 1] in _BOUNDARY_BONUS:
+        return score_positions(text, range(start, start + len(query)))
+    best = score_positions(text, _boundary_positions(query, text, positions))
+    checked = 0
+    while start >= 0 and checked < 4:
+        best = max(best, score_positions(text, range(start, start + len(query))))
+        start = text.find(query, start + 1)
+        checked += 1
+    return best
+
+
+def _subsequence_pattern(query: str) -> re.Pattern:
+    # each gap is possessive and excludes the next wanted character, so an
+    # attempt never backtracks; the literal first character lets the regex
+    # engine skip ahead quickly, and the trailing [^\n]* ends the match at the
+    # end of the line so each line is reported at most once
+    parts = []
+    for index, char in enumerate(query):
+        escaped = re.escape(char)
+        parts.append(f"({escaped})" if index == 0 else f"[^\\n{escaped}]*+({escaped})")
+    parts.append("[^\\n]*")
+    return re.compile("".join(parts))
+
+
+def _contiguous_pattern(query: str) -> re.Pattern:
+    # lines holding query as a run, each reported once
+    return re.compile(re.escape(query) + "[^\\n]*")
+
+
+def _is_subsequence(short: str, long: str) -> bool:
+    remaining = iter(long)
+    return all(char in remaining for char in short)
+
+
+def _narrows(previous: tuple[str, ...], terms: tuple[str, ...]) -> bool:
+    # every line matching all of terms also matches all of previous
+    return all(any(_is_subsequence(old, new) for new in terms) for old in previous)
+
+
+def _score_terms(terms: tuple[str, ...], text: str) -> int | None:
+    # whitespace separates independent fuzzy terms, as in fzf
+    total = 0
+    for term in terms:
+        positions = fuzzy_positions(term, text)
+        if positions is None:
+            return None
+        total += _best_score(term, text, positions)
+    return total
+
+
+# frecency: recency buckets (max age in days, weight) scaled by use count
+RECENCY_WEIGHTS = ((1, 100), (4, 80), (14, 60), (31, 40), (90, 20))
+FRECENCY_SCALE = 4
+
+
+def frecency_bonus(epoch: float, use_count: int, now: float) -> int:
+    age_days = max(0.0, now - epoch) / 86400 if epoch else float("inf")
+    weight = next((value for days, value in RECENCY_WEIGHTS if age_days < days), 10)
+    return int(FRECENCY_SCALE * math.log2(1 + weight * (1 + use_count) / 10))
+
+
+class _Partition:
+    # the items of one entry type. Their lines live in a joined blob, most
+    # recent first; lines added or edited since the blob was built are kept
+    # in `recent`, and blob lines that no longer hold are listed in `stale`.
+    # The blob is only rebuilt once `recent` outgrows RECENT_LIMIT.
+
+    RECENT_LIMIT = 256
+
+    def __init__(self):
+        self.items: dict[Hashable, Any] = {}
+        self.texts: dict[Hashable, str] = {}
+        self.uses: dict[Hashable, int] = {}
+        self.order: list[Hashable] = []
+        self.starts: list[int] = []
+        self.blob = ""
+        self.recent: list[Hashable] = []
+        self.stale: set[Hashable] = set()
+        self.dirty = True
+        # (terms, every key matching them) from the last uncapped scan
+        self.last: tuple[tuple[str, ...], list[Hashable]] | None = None
+
+    def put(self, key, item, text, use_count):
+        previous = self.texts.get(key)
+        self.items[key] = item
+        self.uses[key] = use_count
+        if previous == text:
+            return
+        self.texts[key] = text
+        self.last = None
+        if not self.dirty:
+            if previous is not None and key not in self.recent:
+                self.stale.add(key)
+            if key not in self.recent:
+                self.recent.append(key)
+            self.dirty = len(self.recent) > self.RECENT_LIMIT
+
+    def drop(self, key):
+        if self.items.pop(key, None) is None:
+            return
+        del self.texts[key]
+        self.uses.pop(key, None)
+        self.last = None
+        if key in self.recent:
+            self.recent.remove(key)
+        else:
+            self.stale.add(key)
+
+    def rebuild(self):
+        items = self.items
+        self.order = sorted(items, key=lambda key: items[key].epoch, reverse=True)
+        texts = [self.texts[key] for key in self.order]
+        self.starts = list(itertools.accumulate((len(text) + 1 for text in texts), initial=0))[:-1]
+        self.blob = "\n".join(texts)
+        self.recent = []
+        self.stale = set()
+        self.dirty = False
+
+    def scan(self, pattern):
+        # keys whose current line matches pattern, newest additions first
+        texts = self.texts
+        for key in reversed(self.recent):
+            if pattern.search(texts[key]):
+                yield key
+        starts, order, stale = self.starts, self.order, self.stale
+        for match in pattern.finditer(self.blob):
+            key = order[bisect.bisect_right(starts, match.start()) - 1]
+            if key not in stale:
+                yield key
+
+
+class SearchIndex:
+    # compact in-memory fuzzy index over clipboard items' titles and previews.
+    #
+    # Each entry type keeps its items as one lowercased line apiece in a
+    # joined blob, in most-recent-first order. The longest whitespace-separated
+    # term of a query compiles to a regex that finds the lines containing it as
+    # a subsequence in a single C-level pass. Only the accepted lines are
+    # scored, and the top `limit` come back ranked by score plus frecency.
+    # Broad queries stop after MAX_SCORED accepted lines: lines holding the
+    # term as a run are taken first, most recent first, and scattered matches
+    # fill what is left. The cap is shared between a query's terms, since each
+    # term is scored separately. A query that extends the previous one
+    # re-checks only the lines that matched before.
+
+    MAX_SCORED = 300
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._parts: dict[str, _Partition] = {}
+        self._removed: set[Hashable] = set()
+        self.ready = False
+
+    def __len__(self):
+        return sum(len(part.items) for part in self._parts.values())
+
+    @staticmethod
+    def haystack(item) -> str:
+        return f"{item.title} {item.preview}".replace("\n", " ").lower()
+
+    def add(self, item, use_count: int = 0, only_if_absent: bool = False) -> None:
+        # only_if_absent is for bulk loads racing live updates: rows changed
+        # or removed since the load read them are left alone
+        with self._lock:
+            part = self._parts.setdefault(item.entry_type, _Partition())
+            if only_if_absent and (item.key in part.items or item.key in self._removed):
+                return
+            part.put(item.key, item, self.haystack(item), use_count)
+            self._removed.discard(item.key)
+
+    def remove(self, key: Hashable) -> None:
+        with self._lock:
+            if not self.ready:
+                self._removed.add(key)
+            part = self._parts.get(key[0])
+            if part is not None:
+                part.drop(key)
+
+    def get(self, key: Hashable):
+        with self._lock:
+            part = self._parts.get(key[0])
+            return part.items.get(key) if part is not None else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._parts.clear()
+            self._removed.clear()
+            self.ready = False
+
+    def mark_ready(self) -> None:
+        # called by the bulk loader, so the blobs are built on its thread
+        # rather than by the first search
+        with self._lock:
+            for part in self._parts.values():
+                if part.dirty:
+                    part.rebuild()
+            self._removed.clear()
+            self.ready = True
+
+    def _candidates(self, part, terms, accept):
+        # (accepted keys, keys that may match or None when MAX_SCORED cut the
+        # scan short, whether the keys came from a fresh scan)
+        if part.last is not None and _narrows(part.last[0], terms):
+            keys = part.last[1]
+            return [key for key in keys if accept is None or accept(part.items[key])], keys, False
+        if part.dirty:
+            part.rebuild()
+        # the regex scans run on the longest term; the rest are checked per line
+        term = max(terms, key=len)
+        found = []
+        max_scored = max(1, self.MAX_SCORED // len(terms))
+        # contiguous hits outscore scattered ones, so they claim the cap first
+        contiguous = set()
+        for key in part.scan(_contiguous_pattern(term)):
+            contiguous.add(key)
+            if accept is None or accept(part.items[key]):
+                found.append(key)
+                if len(found) >= max_scored:
+                    return found, None, True
+        keys = []
+        for key in part.scan(_subsequence_pattern(term)):
+            keys.append(key)
+            if key in contiguous:
+                continue
+            if accept is None or accept(part.items[key]):
+                found.append(key)
+                if len(found) >= max_scored:
+                    return found, None, True
+        return found, keys, True
+
+    def search(self, query: str, limit: int, entry_types: Iterable[str],
+               accept: Callable[[Any], bool] | None = None, now: float | None = None) -> list[tuple[int, Any]]:
+        terms = tuple(query.lower().split())
+        if not terms:
+            return []
+        now = time.time() if now is None else now
+        ranked = []
+        with self._lock:
+            for entry_type in entry_types:
+                part = self._parts.get(entry_type)
+                if part is None:
+                    continue
+                found, keys, fresh = self._candidates(part, terms, accept)
+                matched = []
+                for key in found:
+                    score = _score_terms(terms, part.texts[key])
+                    if score is None:
+                        continue
+                    matched.append(key)
+                    item = part.items[key]
+                    ranked.append((score + frecency_bonus(item.epoch, part.uses[key], now), item.epoch, key, item))
+                if keys is None:
+                    part.last = None
+                elif len(found) == len(keys):
+                    part.last = (terms, matched)
+                elif fresh:
+                    # rejected lines were only checked against the scanned term
+                    part.last = ((max(terms, key=len),), keys)
+                # otherwise the entry that was narrowed from still holds
+        top = heapq.nlargest(limit, ranked, key=lambda row: row[:2])
+        return [(score, item) for score, _epoch, _key, item in top]
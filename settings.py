@@ -16,6 +16,10 @@ DEFAULT_SETTINGS = {
     "custom_font_path": "",
     "history_management": "keep",
     "history_threshold_days": "30",
+    "capture_coalesce_ms": "100",
+    "plugin_budget_ms": "50",
+    "trace_enabled": False,
+    "profile_mode": "off",
     "gdrive_enabled": False,
     "gdrive_token": "",
 }
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import datetime
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import NamedTuple
+
+from PySide6.QtCore import QObject, Qt, QTimer
+
+from metrics import registry
+from tracing import tracer
+
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class Stall(NamedTuple):
+    when: str
+    duration_ms: float
+    culprit: str  # innermost app frame of the most sampled stack
+    stacks: list  # [(samples, formatted stack)], most sampled first
+
+
+def _culprit(summary) -> str:
+    # innermost app frame, e.g. "ui/history_page.py:212 in load_entries",
+    # else the innermost frame. Qt busy in C++ shows up as main.py's app.exec()
+    for frame in reversed(summary):
+        if frame.filename.startswith(APP_ROOT):
+            return f"{os.path.relpath(frame.filename, APP_ROOT)}:{frame.lineno} in {frame.name}"
+    if summary:
+        frame = summary[-1]
+        return f"{os.path.basename(frame.filename)}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+class StallWatchdog(QObject):
+    # notices when the GUI event loop stops turning.
+    #
+    # a coarse timer on the GUI thread stamps a heartbeat every INTERVAL_MS;
+    # a watcher thread checks it. Once the heartbeat is THRESHOLD_MS late
+    # the watcher samples the GUI thread's Python stack (and again every
+    # THRESHOLD_MS while it stays blocked), and when the heartbeat resumes
+    # the stall is kept with its duration and the stacks it was caught in.
+    # Gaps longer than MAX_STALL_S are taken for a suspended machine.
+
+    INTERVAL_MS = 100
+    THRESHOLD_MS = 250
+    MAX_STALL_S = 600
+    MAX_SAMPLES = 20
+    KEEP = 50
+    MAX_LOG_BYTES = 512 * 1024
+
+    def __init__(self, threshold_ms: int = THRESHOLD_MS, log_path: str | None = None, parent=None):
+        super().__init__(parent)
+        self.threshold_ms = threshold_ms
+        self.log_path = log_path
+        self.stalls: deque[Stall] = deque(maxlen=self.KEEP)
+        self._gui_thread = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.CoarseTimer)
+        self._timer.setInterval(self.INTERVAL_MS)
+        self._timer.timeout.connect(self._on_beat)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._beat = time.perf_counter()
+        self._stop.clear()
+        self._timer.start()
+        self._thread = threading.Thread(target=self._watch, name="stall-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._timer.stop()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+
+    def _on_beat(self):
+        self._beat = time.perf_counter()
+
+    # watcher thread ------------------------------------------------------
+
+    def _watch(self):
+        poll = self.INTERVAL_MS / 2000
+        late_after = (self.INTERVAL_MS + self.threshold_ms) / 1000
+        stalled_beat = None
+        samples: dict[str, list] = {}  # stack -> [count, culprit]
+        next_sample = 0.0
+        while not self._stop.wait(poll):
+            beat, now = self._beat, time.perf_counter()
+            if stalled_beat is not None and beat != stalled_beat:
+                # the loop turned again; it was blocked from the beat that never came
+                started = stalled_beat + self.INTERVAL_MS / 1000
+                self._record(started, beat - started, samples)
+                stalled_beat, samples = None, {}
+            if now - beat < late_after:
+                continue
+            if stalled_beat is None:
+                stalled_beat, next_sample = beat, now
+            if now >= next_sample and sum(count for count, _culprit in samples.values()) < self.MAX_SAMPLES:
+                stack, culprit = self._gui_stack()
+                samples.setdefault(stack, [0, culprit])[0] += 1
+                next_sample = now + self.threshold_ms / 1000
+
+    def _gui_stack(self):
+        frame = sys._current_frames().get(self._gui_thread)
+        if frame is None:
+            return "", "unknown"
+        summary = traceback.extract_stack(frame)
+        return "".join(summary.format()), _culprit(summary)
+
+    def _record(self, started, duration, samples):
+        if duration * 1000 < self.threshold_ms or duration > self.MAX_STALL_S:
+            return
+        when = datetime.datetime.now() - datetime.timedelta(seconds=time.perf_counter() - started)
+        ranked = sorted(samples.items(), key=lambda item: item[1][0], reverse=True)
+        culprit = ranked[0][1][1] if ranked else "unknown"
+        stacks = [(count, stack) for stack, (count, _culprit) in ranked]
+        stall = Stall(when.strftime("%Y-%m-%d %H:%M:%S"), duration * 1000, culprit, stacks)
+        self.stalls.append(stall)
+        registry.inc("ui.stalls")
+        registry.observe("ui.stall_ms", stall.duration_ms)
+        tracer.record("stall", started, duration, cat="ui", culprit=culprit)
+        self._write(stall)
+
+    def _write(self, stall):
+        if not self.log_path:
+            return
+        lines = [f"{stall.when}  GUI thread blocked {stall.duration_ms:.0f} ms in {stall.culprit}"]
+        for count, stack in stall.stacks:
+            lines.append(f"  {count} sample(s):")
+            lines.extend(f"    {line}" for line in stack.rstrip().splitlines())
+        try:
+            if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > self.MAX_LOG_BYTES:
+                os.replace(self.log_path, f"{self.log_path}.1")
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError:
+            pass
+
+    def snapshot(self) -> list[dict]:
+        return [
+            {"when": stall.when, "duration_ms": stall.duration_ms, "culprit": stall.culprit,
+             "stacks": [{"samples": count, "stack": stack} for count, stack in stall.stacks]}
+            for stall in list(self.stalls)
+        ]
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import datetime
+import os
+import time
+
+
+class StartupTracer:
+    # wall-clock timings of one application start, split into phases
+
+    # phases are laps: each one runs from the end of the previous lap (or
+    # the tracer's creation) to the moment it is recorded, so main() only
+    # has to call lap() after every step on the critical path
+    KEEP_RUNS = 30
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self._last = self.origin
+        self.phases: list[tuple[str, float, float]] = []  # name, offset, duration (seconds)
+
+    def lap(self, name: str) -> float:
+        now = time.perf_counter()
+        duration = now - self._last
+        self.phases.append((name, self._last - self.origin, duration))
+        self._last = now
+        return duration
+
+    def mark(self, name: str) -> None:
+        # zero-length milestone, e.g. the first turn of the event loop
+        now = time.perf_counter()
+        self.phases.append((name, now - self.origin, 0.0))
+        self._last = now
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.origin
+
+    def format(self) -> str:
+        total = max((offset + duration for _name, offset, duration in self.phases), default=0.0)
+        lines = [f"startup {datetime.datetime.now():%Y-%m-%d %H:%M:%S}  total {total * 1000:.1f} ms"]
+        for name, offset, duration in self.phases:
+            lines.append(f"  {name:<16} at {offset * 1000:8.1f} ms  took {duration * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+    def write(self, path: str) -> None:
+        # append this run, keeping only the most recent KEEP_RUNS
+        runs = []
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    runs = [run.strip("\n") for run in f.read().split("\n\n") if run.strip()]
+            except OSError:
+                runs = []
+        runs.append(self.format())
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n\n".join(runs[-self.KEEP_RUNS:]) + "\n")
+        except OSError:
+            pass
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+from PySide6.QtCore import QCoreApplication, QEventLoop, QTimer
+
+from database import DatabaseManager
+from encryption import DummyFernet, content_fingerprint, encrypt_payload, encrypt_text
+from notifications.backtest import BacktestJob, match_chunk
+from notifications.rule_matcher import RuleMatcher
+
+
+class BacktestTests(unittest.TestCase):
+    def setUp(self):
+        self.fernet = DummyFernet()
+
+    def rows(self, *texts):
+        return [(index, encrypt_text(text, self.fernet)) for index, text in enumerate(texts, 1)]
+
+    def test_chunk_reports_hits_fires_and_samples(self):
+        rules = [("URL", r"https?://\S+"), ("Example", r"example\.\w+")]
+        reports = match_chunk(self.fernet, rules, self.rows("see https://a.example.com", "mail example.org", "plain"))
+
+        hits, fired, skipped, _total, _worst, slow, samples = reports["URL"]
+        self.assertEqual((hits, fired, skipped, slow), (1, 1, 2, 0))
+        self.assertEqual(samples, [(1, "https://a.example.com")])
+        hits, fired, skipped, *_rest, samples = reports["Example"]
+        # matched both clips but is only the notifying rule where URL did not match
+        self.assertEqual((hits, fired, skipped), (2, 1, 1))
+        self.assertEqual([entry_id for entry_id, _sample in samples], [1, 2])
+
+    def run_job(self, db, rules):
+        job = BacktestJob(db, self.fernet, rules)
+        job.CHUNK_ROWS = 5
+        results, progress = [], []
+        loop = QEventLoop()
+        job.progress.connect(lambda done, total: progress.append(done))
+        job.finished.connect(lambda result: (results.append(result), loop.quit()))
+        QTimer.singleShot(60000, loop.quit)
+        job.start()
+        loop.exec()
+        return results[0], progress
+
+    def test_large_clips_are_matched_on_what_live_matching_scans(self):
+        app = QCoreApplication.instance() or QCoreApplication([])
+        temp_dir = tempfile.TemporaryDirectory()
+        db = DatabaseManager(os.path.join(temp_dir.name, "history.db"))
+        try:
+            # both are stored out of row; one token is past the stored preview
+            # but inside SCAN_CHARS, the other past SCAN_CHARS
+            for text in ("x" * 10000 + " token-inside " + "z" * RuleMatcher.SCAN_CHARS,
+                         "y" * RuleMatcher.SCAN_CHARS + " token-outside "):
+                preview, chunks = encrypt_payload(text, self.fernet)
+                db.store_entry(preview, "2026-01-01 10:00:00", 0, content_fingerprint(text, b"k"), chunks=chunks)
+
+            result, _progress = self.run_job(db, [("Token", r"token-\w+")])
+
+            self.assertEqual(result.summary("Token")["hits"], 1)
+            self.assertEqual([sample for _id, sample in result.summary("Token")["samples"]], ["token-inside"])
+        finally:
+            db.close()
+            temp_dir.cleanup()
+
+    def test_job_walks_all_history_in_chunks(self):
+        app = QCoreApplication.instance() or QCoreApplication([])
+        temp_dir = tempfile.TemporaryDirectory()
+        db = DatabaseManager(os.path.join(temp_dir.name, "history.db"))
+        try:
+            for index in range(12):
+                db.add_entry(encrypt_text(f"clip {index} https://x{index}.example", self.fernet), "2026-01-01 10:00:00", 0)
+            result, progress = self.run_job(db, [("URL", r"https?://\S+")])
+            self.assertEqual((result.clips, result.timed_out, result.error), (12, False, None))
+            self.assertEqual(result.summary("URL")["hits"], 12)
+            self.assertEqual(progress, [5, 10, 12])
+        finally:
+            db.close()
+            temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+from PySide6.QtCore import QCoreApplication
+from PySide6.QtGui import QColor, QImage
+
+from capture_pipeline import CapturePipeline, CaptureRequest
+from clipboard_media import THUMBNAIL_SIZE, image_from_bytes, png_bytes
+from database import DatabaseManager
+from encryption import DummyFernet, decrypt_bytes, decrypt_text
+
+
+class CapturePipelineTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # the coalescing timer needs an event loop
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.temp_dir.name, "history.db"))
+        self.fernet = DummyFernet()
+        self.pipeline = CapturePipeline(self.db, self.fernet, b"unit-test-fingerprint-secret")
+
+    def tearDown(self):
+        self.pipeline.close()
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def request(self, text, plugins=(), match=None, kind="text", data=None):
+        return CaptureRequest(text, plugins, match, time.perf_counter(), kind, data)
+
+    def test_capture_is_transformed_stored_and_indexed(self):
+        upper = SimpleNamespace(instance=SimpleNamespace(on_clipboard_change=str.upper))
+        events = []
+        self.db.subscribe(lambda *event: events.append((event, self.db.get_entities(event[2]))))
+
+        result = self.pipeline.process(self.request("mail a@b.com", [upper], lambda text: "email"))
+
+        self.assertTrue(result.created)
+        self.assertEqual((result.text, result.stored_text, result.rule), ("mail a@b.com", "MAIL A@B.COM", "email"))
+        self.assertEqual(decrypt_text(self.db.get_entry_by_id(result.entry_id)[0], self.fernet), "MAIL A@B.COM")
+        # listeners hear about the row only once its entities are stored
+        self.assertEqual(events[0][0], ("created", "history", result.entry_id))
+        self.assertTrue(events[0][1])
+        self.assertEqual(set(result.timings), set(CapturePipeline.STAGES))
+
+    def test_repeats_and_own_copies_are_skipped(self):
+        self.assertIsNotNone(self.pipeline.process(self.request("first")))
+        self.assertIsNone(self.pipeline.process(self.request("first")))
+        self.pipeline.expect("copied by the app")
+        self.assertIsNone(self.pipeline.process(self.request("copied by the app")))
+
+        stats = self.pipeline.stats()
+        self.assertEqual((stats["processed"], stats["duplicates"]), (1, 2))
+        self.assertEqual(stats["stages"]["persist"]["count"], 1)
+
+    def test_same_pixels_are_stored_once(self):
+        image = QImage(300, 200, QImage.Format_RGB32)
+        image.fill(QColor(10, 20, 30))
+        first = self.pipeline.process(self.request("Image 300×200", kind="image", data=image))
+        self.pipeline.process(self.request("other"))
+        # same pixels, different format and encoding
+        again = image_from_bytes(png_bytes(image.convertToFormat(QImage.Format_ARGB32)))
+        second = self.pipeline.process(self.request("Image 300×200", kind="image", data=again))
+
+        self.assertEqual(second.entry_id, first.entry_id)
+        self.assertEqual(self.db.blob_usage()[0], 1)
+        _text, _pinned, _favorite, kind, blob_hash = self.db.get_entry_by_id(first.entry_id)
+        self.assertEqual(kind, "image")
+        mime, data = self.db.get_blob(blob_hash)
+        self.assertEqual((mime, image_from_bytes(decrypt_bytes(data, self.fernet)).size()), ("image/png", image.size()))
+        thumbnail = image_from_bytes(decrypt_bytes(self.db.get_thumbnail(blob_hash, THUMBNAIL_SIZE), self.fernet))
+        self.assertEqual(max(thumbnail.width(), thumbnail.height()), THUMBNAIL_SIZE)
+
+    def test_html_keeps_markup_unless_a_plugin_rewrites_it(self):
+        upper = SimpleNamespace(instance=SimpleNamespace(on_clipboard_change=str.upper))
+        rich = self.pipeline.process(self.request("bold", kind="html", data="<b>bold</b>"))
+        rewritten = self.pipeline.process(self.request("quiet", [upper], kind="html", data="<i>quiet</i>"))
+
+        blob_hash = self.db.get_entry_by_id(rich.entry_id)[4]
+        self.assertEqual(decrypt_bytes(self.db.get_blob(blob_hash)[1], self.fernet), b"<b>bold</b>")
+        self.assertEqual(self.db.get_entry_by_id(rewritten.entry_id)[3:], ("text", None))
+        self.assertEqual(rewritten.kind, "text")
+
+    def test_full_queue_drops_the_oldest_capture(self):
+        for index in range(CapturePipeline.MAX_PENDING + 3):
+            self.pipeline.submit(f"clip {index}")
+
+        self.assertEqual(self.pipeline.pending(), CapturePipeline.MAX_PENDING)
+        self.assertEqual(self.pipeline.stats()["dropped"], 3)
+        self.assertEqual(self.pipeline._queue.get_nowait().text, "clip 3")
+
+    def test_bursts_collapse_into_one_capture(self):
+        snapshots = []
+        self.pipeline.snapshot = lambda: snapshots.append(len(snapshots)) or None
+        self.pipeline.set_coalesce_window(20)
+        for _ in range(5):
+            self.pipeline.changed()
+
+        deadline = time.perf_counter() + 1
+        while not snapshots and time.perf_counter() < deadline:
+            self.app.processEvents()
+            time.sleep(0.005)
+
+        self.assertEqual(snapshots, [0])
+        stats = self.pipeline.stats()
+        self.assertEqual((stats["events"], stats["merged"]), (5, 4))
+
+    def test_endless_burst_is_still_captured(self):
+        snapshots = []
+        self.pipeline.snapshot = lambda: snapshots.append(1) or None
+        self.pipeline.set_coalesce_window(1)
+        self.pipeline.changed()
+        time.sleep(0.01)
+        self.pipeline.changed()
+
+        self.assertEqual(snapshots, [1])
+
+    def test_zero_window_captures_every_change(self):
+        snapshots = []
+        self.pipeline.snapshot = lambda: snapshots.append(1) or None
+        self.pipeline.set_coalesce_window(0)
+        for _ in range(3):
+            self.pipeline.changed()
+
+        self.assertEqual(len(snapshots), 3)
+        self.assertEqual(self.pipeline.stats()["merged"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
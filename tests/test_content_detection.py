@@ -1,6 +1,6 @@
 import unittest
 
-from content_detection import detect_content_type, detect_language, is_code
+from content_detection import detect_content_type, detect_language, extract_entities, is_code
 
 
 class ContentDetectionTests(unittest.TestCase):
@@ -39,6 +39,28 @@ function greet($name) {
         self.assertEqual(detect_language('{\n  "ready": true\n}'), "JSON")
         self.assertEqual(detect_content_type("https://example.com/path?q=1"), "link")
 
+    def test_entities_are_extracted_with_offsets(self):
+        text = (
+            "Deploy notes: https://example.com/build?id=7, ping ops@example.org.\n"
+            "Logs in /var/log/app/server.log from 10.0.0.12, run "
+            "550e8400-e29b-41d4-a716-446655440000 at d41d8cd98f00b204e9800998ecf8427e"
+        )
+        entities = extract_entities(text)
+        found = {(entity.kind, entity.value) for entity in entities}
+        self.assertEqual(found, {
+            ("url", "https://example.com/build?id=7"),
+            ("email", "ops@example.org"),
+            ("path", "/var/log/app/server.log"),
+            ("ip", "10.0.0.12"),
+            ("uuid", "550e8400-e29b-41d4-a716-446655440000"),
+            ("hash", "d41d8cd98f00b204e9800998ecf8427e"),
+        })
+        for entity in entities:
+            self.assertEqual(text[entity.start:entity.end], entity.value)
+
+    def test_entities_ignore_lookalikes(self):
+        self.assertEqual(extract_entities("and/or 12345678901234567890123456789012 at 12:30:45"), [])
+
 
 if __name__ == "__main__":
     unittest.main()
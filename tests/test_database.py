@@ -1,12 +1,16 @@
 import os
 import tempfile
+import threading
 import unittest
 
 from cryptography.fernet import Fernet
+from PySide6.QtCore import QThreadPool
 
-from database import DatabaseManager
-from encryption import (DummyFernet, content_fingerprint, decrypt_text,
-                        decrypt_text_strict, encrypt_text)
+from content_detection import entity_rows
+from database import ArchiveDatabaseManager, DatabaseManager, manage_history, release_thread_connections
+from encryption import (PREVIEW_CHARS, DummyFernet, content_fingerprint,
+                        decrypt_entry_text, decrypt_text, decrypt_text_strict,
+                        encrypt_payload, encrypt_text, searchable_text)
 
 
 class DatabaseTests(unittest.TestCase):
@@ -33,6 +37,15 @@ class DatabaseTests(unittest.TestCase):
         self.assertEqual(first_id, second_id)
         self.assertEqual(self.db.count_history(), 1)
         self.assertEqual(self.db.get_all_entries()[0][2], "2026-01-02 10:00:00")
+        self.assertEqual(self.db.get_use_count(first_id), 1)
+
+    def test_recent_entries_ignore_pins(self):
+        older_id = self.db.add_entry(encrypt_text("older", self.fernet), "2026-01-01 10:00:00", 0)
+        newer_id = self.db.add_entry(encrypt_text("newer", self.fernet), "2026-01-02 10:00:00", 0)
+        self.db.update_pin_state(older_id, 1)
+
+        self.assertEqual([row[0] for row in self.db.get_recent_entries(5)], [newer_id, older_id])
+        self.assertEqual([row[0] for row in self.db.get_all_entries()], [older_id, newer_id])
 
     def test_startup_reconciliation_merges_state_and_tags(self):
         older_id = self.db.add_entry(encrypt_text("duplicate", self.fernet), "2026-01-01 10:00:00", 0)
@@ -53,6 +66,94 @@ class DatabaseTests(unittest.TestCase):
         self.assertEqual((row[4], row[5]), (1, 1))
         self.assertEqual(self.db.get_tags_for_entry(newer_id)[0][1], "Important")
 
+    def test_later_reconciliation_only_decrypts_unhashed_rows(self):
+        self.db.store_entry(encrypt_text("hashed", self.fernet), "2026-01-01 10:00:00", 0, self.fingerprint("hashed"))
+        self.db.reconcile_content_hashes(lambda value: decrypt_text(value, self.fernet), self.fingerprint)
+        self.db.add_entry(encrypt_text("hashed", self.fernet), "2026-01-02 10:00:00", 0)
+        decrypted = []
+
+        def decrypt(value):
+            decrypted.append(value)
+            return decrypt_text(value, self.fernet)
+
+        merged = self.db.reconcile_content_hashes(decrypt, self.fingerprint)
+
+        self.assertEqual(len(decrypted), 1)
+        self.assertEqual(merged, 1)
+        self.assertEqual(self.db.count_history(), 1)
+
+    def test_hash_batches_walk_down_by_id(self):
+        self.db.reconcile_content_hashes(lambda value: decrypt_text(value, self.fernet), self.fingerprint)
+        ids = [self.db.add_entry(encrypt_text(f"row {index}", self.fernet), "2026-01-01 10:00:00", 0)
+               for index in range(5)]
+
+        cursor = self.db.reconcile_content_hash_batch(
+            lambda value: decrypt_text(value, self.fernet), self.fingerprint, limit=3
+        )
+        self.assertEqual(cursor, ids[2])
+        cursor = self.db.reconcile_content_hash_batch(
+            lambda value: decrypt_text(value, self.fernet), self.fingerprint, cursor, limit=3
+        )
+        self.assertEqual(cursor, ids[0])
+        self.assertIsNone(self.db.reconcile_content_hash_batch(
+            lambda value: decrypt_text(value, self.fernet), self.fingerprint, cursor, limit=3
+        ))
+        self.assertEqual(self.db.conn.execute("select count(*) from history where content_hash is null").fetchone()[0], 0)
+
+    def test_limited_retention_deletes_oldest_first(self):
+        for day in range(1, 4):
+            self.db.add_entry(encrypt_text(f"old {day}", self.fernet), f"2020-01-0{day} 10:00:00", 0)
+        keep_id = self.db.add_entry(encrypt_text("new", self.fernet), "2999-01-01 10:00:00", 0)
+        settings = {"history_management": "auto-delete", "history_threshold_days": "30"}
+
+        self.assertEqual(manage_history(self.db, settings, self.temp_dir.name, limit=2), 2)
+        self.assertEqual(manage_history(self.db, settings, self.temp_dir.name, limit=2), 1)
+        self.assertEqual(manage_history(self.db, settings, self.temp_dir.name, limit=2), 0)
+        self.assertEqual([row[0] for row in self.db.get_all_entries()], [keep_id])
+
+    def test_archive_keeps_large_text_and_blobs(self):
+        large = "archived line\n" * 10000
+        preview, chunks = encrypt_payload(large, self.fernet)
+        self.db.store_entry(preview, "2020-01-01 10:00:00", 0, self.fingerprint(large), chunks=chunks)
+        self.db.store_entry(
+            encrypt_text("[image 2x2]", self.fernet), "2020-01-02 10:00:00", 0, self.fingerprint("image"),
+            kind="image", blob=("imagehash", "image/png", b"encrypted png"),
+        )
+        settings = {"history_management": "archive", "history_threshold_days": "30"}
+
+        self.assertEqual(manage_history(self.db, settings, self.temp_dir.name, limit=10), 2)
+        self.db.delete_orphan_blobs()
+
+        archive = ArchiveDatabaseManager(os.path.join(self.temp_dir.name, "clipboard_manager_archive.db"))
+        try:
+            rows = archive.conn.execute("select id, kind, blob_hash from archive_history order by id").fetchall()
+            self.assertEqual([row[1:] for row in rows], [("text", None), ("image", "imagehash")])
+            full_text = "".join(decrypt_text(chunk, self.fernet) for chunk in archive.get_payload_chunks(rows[0][0]))
+            self.assertEqual(full_text, large)
+            self.assertEqual(archive.get_blob("imagehash"), ("image/png", b"encrypted png"))
+        finally:
+            archive.close()
+        self.assertEqual(self.db.count_history(), 0)
+
+    def test_pool_tasks_do_not_leave_connections_open(self):
+        self.db.count_history()
+        pool = QThreadPool()
+        pool.setMaxThreadCount(2)
+        counts = []
+
+        def task():
+            try:
+                counts.append(self.db.count_history())
+            finally:
+                release_thread_connections()
+
+        for _ in range(20):
+            pool.start(task)
+            pool.waitForDone()
+
+        self.assertEqual(counts, [0] * 20)
+        self.assertEqual(len(self.db._connections), 1)
+
     def test_existing_tags_are_case_insensitive_and_replaceable(self):
         first = self.db.add_tag("Work")
         second = self.db.add_tag("work")
@@ -77,6 +178,50 @@ class DatabaseTests(unittest.TestCase):
         self.assertEqual(self.db.count_history(), 1)
         self.assertEqual(self.db.get_entry_by_id(first)[1], 1)
 
+    def test_changes_are_published_after_commit(self):
+        events = []
+        self.db.subscribe(lambda *event: events.append(event))
+        first, _ = self.db.store_entry(b"one", "2026-01-01 10:00:00", 0, self.fingerprint("one"))
+        self.db.store_entry(b"one", "2026-01-02 10:00:00", 0, self.fingerprint("one"))
+        second, _ = self.db.store_entry(b"two", "2026-01-03 10:00:00", 0, self.fingerprint("two"))
+        self.db.update_pin_state(second, 1)
+        retained = self.db.update_entry_content(second, b"one", self.fingerprint("one"), 0)
+        tag_id = self.db.add_tag("work")
+        self.db.tag_entry(retained, tag_id)
+        snippet_id = self.db.add_snippet("title", b"body", "Python", "2026-01-04 10:00:00")
+        self.db.delete_snippet_by_id(snippet_id)
+        self.db.clear_history()
+
+        self.assertEqual(events, [
+            ("created", "history", first),
+            ("updated", "history", first),
+            ("created", "history", second),
+            ("updated", "history", second),
+            ("deleted", "history", second),
+            ("updated", "history", first),
+            ("created", "tag", tag_id),
+            ("tagged", "history", first),
+            ("created", "snippet", snippet_id),
+            ("deleted", "snippet", snippet_id),
+            ("reset", "history", 0),
+        ])
+
+    def test_worker_threads_read_through_their_own_connection(self):
+        entry_id, _ = self.db.store_entry(b"one", "2026-01-01 10:00:00", 0, self.fingerprint("one"))
+        seen = []
+
+        def read():
+            seen.append((self.db.conn is not main_conn, self.db.get_history_entry(entry_id)[0]))
+
+        main_conn = self.db.conn
+        worker = threading.Thread(target=read)
+        worker.start()
+        worker.join()
+
+        self.assertEqual(seen, [(True, entry_id)])
+        self.db.close()
+        self.assertIsNot(self.db.conn, main_conn)
+
     def test_reencryption_validates_then_updates_history_and_snippets(self):
         old_fernet = Fernet(Fernet.generate_key())
         new_fernet = Fernet(Fernet.generate_key())
@@ -90,6 +235,87 @@ class DatabaseTests(unittest.TestCase):
         self.assertEqual(decrypt_text(self.db.get_entry_by_id(entry_id)[0], new_fernet), "history")
         self.assertEqual(decrypt_text(self.db.get_snippet_by_id(snippet_id)[2], new_fernet), "snippet")
 
+    def test_blobs_are_shared_and_dropped_with_their_last_row(self):
+        blob = ("blob-hash", "image/png", b"png")
+        first, _ = self.db.store_entry(b"one", "2026-01-01 10:00:00", 0, "a", kind="image", blob=blob)
+        second, _ = self.db.store_entry(b"two", "2026-01-02 10:00:00", 0, "b", kind="image", blob=blob)
+        self.db.put_thumbnail("blob-hash", 128, b"thumb")
+
+        self.assertEqual(self.db.blob_usage(), (1, 3))
+        self.db.delete_entry_by_id(first)
+        self.assertEqual(self.db.delete_orphan_blobs(), 0)
+        self.db.delete_entry_by_id(second)
+        self.assertEqual(self.db.delete_orphan_blobs(), 1)
+        self.assertIsNone(self.db.get_thumbnail("blob-hash", 128))
+        self.assertEqual(self.db.blob_usage(), (0, 0))
+
+    def test_large_text_is_read_lazily_from_chunks(self):
+        text = "".join(f"line {index}\n" for index in range(60000))
+        preview, chunks = encrypt_payload(text, self.fernet)
+        entry_id, _ = self.db.store_entry(preview, "2026-01-01 10:00:00", 0, self.fingerprint(text), chunks=chunks)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(len(decrypt_text(self.db.get_all_entries()[0][1], self.fernet)), PREVIEW_CHARS)
+        self.assertEqual(decrypt_entry_text(self.db, entry_id, preview, self.fernet), text)
+        self.db.update_entry_content(entry_id, b"small", self.fingerprint("small"), 0)
+        self.assertEqual(self.db.get_payload_chunks(entry_id), [])
+        self.assertEqual(self.db.delete_orphan_blobs(), 1)
+        self.assertEqual(self.db.conn.execute("select count(*) from payload_chunks").fetchone()[0], 0)
+
+    def test_search_text_reaches_past_the_preview(self):
+        text = "x" * 10_000 + " needle " + "y" * 100_000
+        preview, chunks = encrypt_payload(text, self.fernet)
+        entry_id, _ = self.db.store_entry(preview, "2026-01-01 10:00:00", 0, self.fingerprint(text), chunks=chunks)
+        short = "z" * PREVIEW_CHARS
+        short_id, _ = self.db.store_entry(encrypt_text(short, self.fernet), "2026-01-02 10:00:00", 0,
+                                          self.fingerprint(short))
+
+        row_text = decrypt_text(preview, self.fernet)
+        self.assertNotIn("needle", row_text)
+        searched = searchable_text(self.db, entry_id, row_text, self.fernet)
+        self.assertIn("needle", searched)
+        self.assertEqual(len(searched), 64 * 1024)
+        self.assertEqual(searchable_text(self.db, short_id, short, self.fernet), short)
+
+    def test_inline_large_rows_can_move_out_of_row(self):
+        text = "x" * 100_000
+        entry_id, _ = self.db.store_entry(encrypt_text(text, self.fernet), "2026-01-01 10:00:00", 0, self.fingerprint(text))
+        self.db.store_entry(b"small", "2026-01-02 10:00:00", 0, self.fingerprint("small"))
+
+        rows = self.db.get_inline_entries_over(64 * 1024)
+        self.assertEqual([row[0] for row in rows], [entry_id])
+        self.db.move_text_out_of_row(entry_id, *encrypt_payload(text, self.fernet))
+        self.assertEqual(self.db.get_inline_entries_over(64 * 1024), [])
+        self.assertEqual(decrypt_entry_text(self.db, entry_id, self.db.get_entry_by_id(entry_id)[0], self.fernet), text)
+
+    def entity_rows(self, text):
+        return entity_rows(text, lambda value: encrypt_text(value, self.fernet), self.fingerprint)
+
+    def test_entity_index_answers_kind_and_value_lookups(self):
+        link_id, _ = self.db.store_entry(b"see https://a.example", "2026-01-01 10:00:00", 0, self.fingerprint("link"))
+        mail_id, _ = self.db.store_entry(b"mail bob@example.com", "2026-01-02 10:00:00", 0, self.fingerprint("mail"))
+        self.db.store_entry(b"plain", "2026-01-03 10:00:00", 0, self.fingerprint("plain"))
+
+        indexed = self.db.index_entities(lambda value: decrypt_text(value, self.fernet), self.entity_rows)
+
+        self.assertEqual(indexed, 3)
+        self.assertEqual([row[0] for row in self.db.get_history_entries_with_entity("url")], [link_id])
+        self.assertEqual(self.db.count_history_with_entity("email"), 1)
+        value_hash, encrypted, count, _last = self.db.get_entity_values("email")[0]
+        self.assertEqual(decrypt_text(encrypted, self.fernet), "bob@example.com")
+        self.assertEqual(self.db.get_entry_ids_for_entity_value(value_hash), [mail_id])
+        self.assertEqual(self.db.index_entities(lambda value: decrypt_text(value, self.fernet), self.entity_rows), 0)
+
+    def test_entities_follow_edits_and_deletes(self):
+        entry_id, _ = self.db.store_entry(b"https://a.example", "2026-01-01 10:00:00", 0, self.fingerprint("a"))
+        self.db.set_entities(entry_id, self.entity_rows("https://a.example"))
+
+        self.db.update_entry_content(entry_id, b"no links", self.fingerprint("no links"), 0)
+        self.assertEqual(self.db.get_entities(entry_id), [])
+        self.db.set_entities(entry_id, self.entity_rows("ops@example.org"))
+        self.db.delete_entry_by_id(entry_id)
+        self.assertEqual(self.db.conn.execute("select count(*) from entities").fetchone()[0], 0)
+
 
 if __name__ == "__main__":
     unittest.main()
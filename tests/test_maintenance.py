@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from database import DatabaseManager
+from maintenance import MaintenanceScheduler, MaintenanceTask
+
+
+class MaintenanceSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "history.db")
+        self.db = DatabaseManager(self.db_path)
+        self.now = 100.0
+
+    def tearDown(self):
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def scheduler(self):
+        return MaintenanceScheduler(self.db, clock=lambda: self.now)
+
+    def test_tasks_run_by_priority_and_once_per_start(self):
+        order = []
+        scheduler = self.scheduler()
+        scheduler.register(MaintenanceTask("later", lambda state: order.append("later") or True, priority=20))
+        scheduler.register(MaintenanceTask("first", lambda state: order.append("first") or True, priority=10))
+
+        self.assertFalse(scheduler.run_slice(budget_ms=1000))
+        self.assertFalse(scheduler.run_slice(budget_ms=1000))
+        self.assertEqual(order, ["first", "later"])
+        self.assertEqual([task["status"] for task in scheduler.status()], ["idle", "idle"])
+
+    def test_recent_activity_postpones_work(self):
+        ran = []
+        scheduler = self.scheduler()
+        scheduler.register(MaintenanceTask("task", lambda state: ran.append(1) or True))
+        scheduler.note_activity()
+
+        self.assertTrue(scheduler.run_slice(budget_ms=1000))
+        self.assertEqual(ran, [])
+        self.now += scheduler.HIDDEN_IDLE_AFTER
+        self.assertTrue(scheduler.run_slice(budget_ms=1000))
+        self.assertFalse(scheduler.run_slice(hidden=True, budget_ms=1000))
+        self.assertEqual(ran, [1])
+
+    def test_unfinished_run_resumes_after_restart(self):
+        def step(state):
+            state["cursor"] = state.get("cursor", 0) + 1
+            return state["cursor"] >= 3
+
+        scheduler = self.scheduler()
+        scheduler.register(MaintenanceTask("backfill", step))
+        self.assertTrue(scheduler.run_slice(budget_ms=0))
+        scheduler.save()
+
+        seen = []
+        restarted = self.scheduler()
+        restarted.register(MaintenanceTask("backfill", lambda state: seen.append(dict(state)) or step(state)))
+        restarted.run_slice(budget_ms=1000)
+
+        self.assertEqual(seen[0], {"cursor": 1})
+        self.assertEqual(restarted.status()[0]["runs"], 1)
+
+    def test_failing_task_is_recorded_not_raised(self):
+        def step(state):
+            raise RuntimeError("disk full")
+
+        scheduler = self.scheduler()
+        scheduler.register(MaintenanceTask("broken", step, interval=3600))
+
+        self.assertFalse(scheduler.run_slice(budget_ms=1000))
+        status = scheduler.status()[0]
+        self.assertEqual(status["status"], "error")
+        self.assertIn("disk full", status["error"])
+        self.assertEqual(self.db.get_maintenance_states()["broken"][1], "error")
+
+
+if __name__ == "__main__":
+    unittest.main()
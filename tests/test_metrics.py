@@ -0,0 +1,73 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from database import DatabaseManager
+from encryption import DummyFernet, encrypt_payload
+from metrics import Histogram, MetricsRegistry
+
+
+class MetricsTests(unittest.TestCase):
+    def test_histogram_percentiles_stay_within_bucket_precision(self):
+        histogram = Histogram()
+        rng = random.Random(7)
+        values = [rng.lognormvariate(0, 2) for _ in range(5000)]
+        for value in values:
+            histogram.record(value)
+
+        ordered = sorted(values)
+        for q in (50, 90, 99):
+            exact = ordered[int(q / 100 * len(ordered)) - 1]
+            self.assertAlmostEqual(histogram.percentile(q), exact, delta=exact * 0.03)
+        self.assertEqual(histogram.summary()["max"], max(values))
+        self.assertLess(len(histogram.buckets), 1000)
+
+    def test_snapshot_counts_rates_collectors_and_json(self):
+        registry = MetricsRegistry()
+        registry.inc("thumbnails.hits", 3)
+        registry.inc("thumbnails.misses")
+        registry.gauge("queue", lambda: 4)
+        registry.add_collector("db", lambda: {"size_bytes": 2048})
+        registry.add_collector("broken", lambda: 1 / 0)
+
+        @registry.timed("work_ms")
+        def work(fail):
+            if fail:
+                raise ValueError
+            return "done"
+
+        self.assertEqual(work(False), "done")
+        with self.assertRaises(ValueError):
+            work(True)
+
+        snapshot = json.loads(registry.to_json())
+        self.assertEqual(snapshot["counters"]["thumbnails.hits"]["value"], 3)
+        self.assertGreater(snapshot["counters"]["thumbnails.hits"]["per_min"], 0)
+        self.assertEqual(snapshot["gauges"], {"db.size_bytes": 2048, "queue": 4})
+        self.assertEqual(snapshot["histograms"]["work_ms"]["count"], 2)
+        self.assertEqual(registry.hit_ratio("thumbnails"), 0.75)
+        self.assertIsNone(registry.hit_ratio("search.sessions"))
+
+    def test_storage_stats_include_out_of_row_payloads(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        db = DatabaseManager(os.path.join(temp_dir.name, "history.db"))
+        try:
+            fernet = DummyFernet()
+            for index, text in enumerate(("short", "x" * 200_000)):
+                token, chunks = encrypt_payload(text, fernet)
+                db.store_entry(token, "2026-01-01 10:00:00", 0, f"hash{index}", chunks=chunks)
+
+            stats = db.storage_stats()
+            self.assertEqual(stats["rows.history"], 2)
+            self.assertEqual(stats["rows.payload_chunks"], 1)
+            self.assertGreater(stats["avg_payload_bytes"], 100_000)
+            self.assertGreater(stats["size_bytes"], 0)
+        finally:
+            db.close()
+            temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import tempfile
+import unittest
+
+from PySide6.QtCore import QCoreApplication
+
+from notifications.notification_manager import NotificationManager, NotificationRule
+from notifications.rule_matcher import RuleMatcher, required_literals
+
+
+class FakeTray:
+    def __init__(self):
+        self.messages = []
+
+    def showMessage(self, title, message, *args):
+        self.messages.append(message)
+
+
+class RuleMatcherTests(unittest.TestCase):
+    def test_literals_every_match_needs(self):
+        self.assertEqual(required_literals(r"https?://\S+"), {"http"})
+        self.assertEqual(required_literals(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"), {"@"})
+        self.assertEqual(required_literals(r"(TODO|FIXME):?"), {"todo", "fixme"})
+        self.assertEqual(required_literals(r"(foo|bar)bazz"), {"bazz"})
+        self.assertEqual(required_literals(r"\d{4}-\d{2}"), {"-"})
+        self.assertIsNone(required_literals(r"\d{4,}"))
+        self.assertIsNone(required_literals(r"(a|\d)x?"))
+
+    def test_gated_rules_skip_their_regex_and_order_is_kept(self):
+        rules = [NotificationRule("URL", r"https?://\S+"), NotificationRule("Ticket", r"[A-Z]+-\d+"),
+                 NotificationRule("Shout", r"HTTP")]
+        stats = {}
+        matcher = RuleMatcher(rules, stats)
+
+        self.assertIs(matcher.match("see HTTPS://x.example"), rules[0])
+        self.assertIs(matcher.match("fix ABC-12"), rules[1])
+        self.assertIsNone(matcher.match("plain words"))
+        self.assertEqual(stats["URL"][:3], [3, 2, 1])
+        self.assertEqual(stats["Shout"][:3], [1, 1, 0])
+
+    def test_only_the_head_of_a_clip_is_scanned(self):
+        matcher = RuleMatcher([NotificationRule("URL", r"https?://\S+")])
+        self.assertIsNone(matcher.match("x" * RuleMatcher.SCAN_CHARS + " https://late.example"))
+
+
+class NotificationManagerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.manager = NotificationManager(self.temp_dir.name)
+        self.tray = FakeTray()
+        self.manager.set_tray_icon(self.tray)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_bursts_become_one_toast(self):
+        url = self.manager.match("https://a.example")
+        email = self.manager.match("bob@example.com")
+        for rule, text in ((url, "https://a.example"), (email, "bob@example.com"), (url, "https://b.example")):
+            self.manager.notify(rule, text)
+
+        self.assertEqual(self.tray.messages, ["Matched URL: https://a.example"])
+        self.manager._toast_timer.timeout.emit()
+        self.assertEqual(self.tray.messages[1], "Matched Email, URL in 2 clips")
+
+    def test_toggles_are_saved_once_and_apply_at_once(self):
+        saves = []
+        self.manager.save_rules = lambda: saves.append(1)
+        self.manager.toggle_rule("URL")
+        self.manager.toggle_rule("Email")
+
+        self.assertIsNone(self.manager.match("https://a.example bob@example.com"))
+        self.assertEqual(saves, [])
+        self.manager.flush()
+        self.assertEqual(saves, [1])
+
+    def test_edited_rule_keeps_its_place_and_state(self):
+        names = [rule.name for rule in self.manager.rules]
+        self.manager.toggle_rule(names[0])
+
+        self.manager.update_rule(names[0], r"\bexample\.org\b")
+
+        self.assertEqual([rule.name for rule in self.manager.rules], names)
+        edited = self.manager.rules[0]
+        self.assertEqual(edited.pattern, r"\bexample\.org\b")
+        self.assertFalse(edited.enabled)
+        self.assertIsNone(self.manager.match("see example.org"))
+        self.assertIsNone(self.manager.update_rule("Missing", "x"))
+
+
+if __name__ == "__main__":
+    unittest.main()
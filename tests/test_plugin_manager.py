@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from plugins.plugin_manager import Plugin, PluginManager
+
+
+class PluginManagerTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.manager = PluginManager(self.temp_dir.name, budget_ms=20)
+        self.disabled = []
+        self.manager.plugin_disabled.connect(lambda name, reason: self.disabled.append(name))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def add(self, name, hook):
+        plugin = Plugin(name, "1.0.0", "", "test")
+        plugin.instance = SimpleNamespace(on_clipboard_change=hook)
+        self.manager.plugins[name] = plugin
+        return plugin
+
+    def test_hooks_transform_and_are_timed(self):
+        self.add("upper", str.upper)
+        self.add("broken", lambda text: 1 / 0)
+
+        self.assertEqual(self.manager.run_clipboard_hooks("abc"), "ABC")
+        upper, broken = self.manager.get_stats("upper"), self.manager.get_stats("broken")
+        self.assertEqual((upper["calls"], upper["errors"]), (1, 0))
+        self.assertEqual(broken["errors"], 1)
+        self.assertIn("ZeroDivisionError", broken["last_error"])
+        self.assertLess(upper["p99_ms"], 20)
+
+    def test_repeatedly_slow_plugin_is_disabled(self):
+        slow = self.add("slow", lambda text: time.sleep(0.03) or text + "!")
+
+        for _ in range(PluginManager.MAX_OVERRUNS - 1):
+            self.assertEqual(self.manager.run_clipboard_hooks("a"), "a!")
+        self.assertTrue(slow.enabled)
+        self.manager.run_clipboard_hooks("a")
+
+        self.assertFalse(slow.enabled)
+        self.assertEqual(self.disabled, ["slow"])
+        self.assertEqual(self.manager.run_clipboard_hooks("a"), "a")
+        self.manager.enable_plugin("slow")
+        self.assertEqual(self.manager.get_stats("slow")["overruns"], PluginManager.MAX_OVERRUNS)
+
+    def test_hanging_plugin_is_abandoned(self):
+        release = threading.Event()
+        hung = self.add("hung", lambda text: release.wait(5) and "late")
+        self.manager.set_budget(5)
+
+        started = time.perf_counter()
+        self.assertEqual(self.manager.run_clipboard_hooks("a"), "a")
+        release.set()
+
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertFalse(hung.enabled)
+        self.assertEqual(self.disabled, ["hung"])
+
+    def test_hung_plugin_does_not_block_exit(self):
+        script = (
+            "import sys, tempfile, time\n"
+            "from types import SimpleNamespace\n"
+            "from plugins.plugin_manager import Plugin, PluginManager\n"
+            "manager = PluginManager(tempfile.mkdtemp(), budget_ms=5)\n"
+            "plugin = Plugin('hung', '1.0.0', '', 'test')\n"
+            "plugin.instance = SimpleNamespace(on_clipboard_change=lambda text: time.sleep(30))\n"
+            "manager.plugins['hung'] = plugin\n"
+            "print(manager.run_clipboard_hooks('a'))\n"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True, timeout=20)
+
+        self.assertEqual(result.stdout.strip(), "a", result.stderr)
+        self.assertLess(time.perf_counter() - started, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import glob
+import os
+import pstats
+import tempfile
+import tracemalloc
+import unittest
+
+from profiling import Profiler
+
+
+def build_rows(count):
+    return [f"row {index}" * 4 for index in range(count)]
+
+
+class ProfilingTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.profiler = Profiler()
+        self.profiler.forced = ""
+        self.profiler.only = ()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def files(self, pattern="*"):
+        return sorted(glob.glob(os.path.join(self.temp_dir.name, pattern)))
+
+    def test_off_writes_nothing(self):
+        self.profiler.configure(self.temp_dir.name, "off")
+        load = self.profiler.profiled("history.load_entries")(build_rows)
+
+        self.assertEqual(len(load(10)), 10)
+        self.assertEqual(self.files(), [])
+
+    def test_each_invocation_writes_cpu_and_memory_files(self):
+        self.profiler.configure(self.temp_dir.name, "cpu+memory")
+        load = self.profiler.profiled("history.load_entries")(build_rows)
+
+        rows = load(2000)
+        load(10)
+
+        self.assertEqual(len(rows), 2000)
+        self.assertEqual(len(self.files("history.load_entries-*.prof")), 2)
+        self.assertEqual(len(self.files("history.load_entries-*.tracemalloc")), 2)
+        self.assertFalse(tracemalloc.is_tracing())
+        stats = pstats.Stats(self.files("*.prof")[0])
+        self.assertTrue(any(function == "build_rows" for _file, _line, function in stats.stats))
+        snapshot = tracemalloc.Snapshot.load(self.files("*.tracemalloc")[0])
+        self.assertTrue(snapshot.traces)
+
+    def test_only_the_newest_files_are_kept(self):
+        self.profiler.configure(self.temp_dir.name, "cpu")
+        self.profiler.KEEP = 3
+        load = self.profiler.profiled("sync")(build_rows)
+        download = self.profiler.profiled("sync.download")(build_rows)
+
+        for _ in range(5):
+            load(1)
+        download(1)
+
+        kept = self.files("sync-*.prof")
+        self.assertEqual(len(kept), 3)
+        self.assertTrue(all(name.endswith(("0003", "0004", "0005")) for name in
+                            (os.path.basename(path).split("-")[3] for path in kept)))
+        self.assertEqual(len(self.files("sync.download-*.prof")), 1)
+
+    def test_nested_entry_points_belong_to_the_outer_profile(self):
+        self.profiler.configure(self.temp_dir.name, "cpu")
+        inner = self.profiler.profiled("reconcile_content_hashes")(build_rows)
+        outer = self.profiler.profiled("sync")(lambda: inner(5))
+
+        outer()
+
+        self.assertEqual(len(self.files("sync-*.prof")), 1)
+        self.assertEqual(self.files("reconcile_content_hashes-*"), [])
+
+    def test_only_filter_limits_entry_points(self):
+        self.profiler.configure(self.temp_dir.name, "memory")
+        self.profiler.only = ("load_entries",)
+
+        self.profiler.profiled("clipboard_change")(build_rows)(5)
+        self.profiler.profiled("pinned.load_entries")(build_rows)(5)
+
+        self.assertEqual([os.path.basename(path).split("-")[0] for path in self.files()], ["pinned.load_entries"])
+        self.assertEqual(self.files("*.prof"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
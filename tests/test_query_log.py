@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+from database import DatabaseManager
+from query_log import full_scans, normalize_sql
+
+LARGE_TABLES = ("history", "entry_tags", "h", "et")
+
+
+class QueryLogTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.temp_dir.name, "history.db"))
+        self.log = self.db.query_log
+
+    def tearDown(self):
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def add(self, count):
+        for index in range(count):
+            self.db.add_entry(f"clip {index}".encode(), f"2026-01-{index % 28 + 1:02d} 10:00:00", 0)
+
+    def test_statements_aggregate_by_normalized_sql(self):
+        self.assertEqual(
+            normalize_sql("select *\n  from history where id in (1, 2,3) and kind = 'it''s'"),
+            "select * from history where id in (?, ...) and kind = ?",
+        )
+        self.add(5)
+        self.assertGreaterEqual(self.log.statements["commit"][0], 5)
+        self.log.statements.clear()
+
+        for entry_id in (1, 2, 3):
+            self.db.get_entry_by_id(entry_id)
+        rows = list(self.db.conn.execute("select id from history order by id"))
+
+        top = {statement["sql"]: statement for statement in self.log.top()}
+        by_id = next(statement for sql, statement in top.items() if "where id = ?" in sql and sql.startswith("select"))
+        self.assertEqual((by_id["calls"], by_id["rows"]), (3, 3))
+        # an iterated cursor is recorded once it is exhausted
+        self.assertEqual(top["select id from history order by id"]["rows"], len(rows))
+
+    def test_slow_statements_are_logged_with_their_plan(self):
+        self.add(3)
+        self.log.slow_ms = 0
+
+        self.db.get_entries_older_than("2026-01-02 00:00:00", 10)
+
+        when, elapsed, rows, sql, plan = self.log.slow[-1]
+        self.assertTrue(sql.startswith("select id, text"))
+        self.assertEqual(rows, 1)
+        self.assertIn("idx_history_timestamp", plan)
+        with open(self.log.log_path, encoding="utf-8") as f:
+            self.assertIn("idx_history_timestamp", f.read())
+
+    def test_tag_and_retention_queries_use_indexes(self):
+        self.add(20)
+        tag_id = self.db.add_tag("work", "#EF4444")
+        self.db.tag_entry(1, tag_id)
+        self.log.statements.clear()
+
+        self.db.get_tag_counts()
+        self.db.get_history_entries_by_tag(tag_id)
+        self.db.delete_entries_older_than("2026-01-05 00:00:00", limit=2)
+        self.db.delete_entries_older_than("2026-01-05 00:00:00")
+
+        plans = [self.log.plan(self.db.conn, statement["sql"]) for statement in self.log.top(50)]
+        plans = [plan for plan in plans if plan]
+        self.assertGreaterEqual(len(plans), 5)
+        for plan in plans:
+            self.assertEqual(full_scans(plan, LARGE_TABLES), [], plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+
+from search import SearchIndex, SearchSession, fuzzy_score
+from ui.clipboard_items import ClipboardItem
+
+
+class SearchSessionTests(unittest.TestCase):
+    def setUp(self):
+        texts = ["config.yaml", "confirm order", "docker compose up", "conference notes", "CONFIG backup"]
+        # source rows are paged by a descending key, like history's keyset
+        self.rows = [(len(texts) - i, text.lower(), text) for i, text in enumerate(texts)]
+        self.scanned = []
+
+    def source(self, after):
+        for key, lowered, raw in self.rows:
+            if after is None or key < after:
+                self.scanned.append(key)
+                yield key, lowered, raw
+
+    def run_session(self, session):
+        return [payload for payload in session.matches(self.source) if payload is not None]
+
+    def test_extended_query_only_rechecks_previous_matches(self):
+        first = SearchSession("all", "conf")
+        self.assertEqual(len(self.run_session(first)), 4)
+        self.scanned.clear()
+
+        second = SearchSession("all", "confi", first)
+        self.assertTrue(second.narrowed)
+        self.assertEqual(self.run_session(second), ["config.yaml", "confirm order", "CONFIG backup"])
+        self.assertEqual(self.scanned, [])
+
+    def test_partial_scan_resumes_after_cursor(self):
+        first = SearchSession("all", "co")
+        matches = first.matches(self.source)
+        next(matches)
+        next(matches)
+        self.scanned.clear()
+
+        second = SearchSession("all", "con", first)
+        self.assertEqual(self.run_session(second), ["config.yaml", "confirm order", "conference notes", "CONFIG backup"])
+        self.assertEqual(self.scanned, [3, 2, 1])
+
+    def test_edits_and_scope_changes_start_over(self):
+        first = SearchSession("all", "conf")
+        self.run_session(first)
+        self.assertFalse(SearchSession("all", "cnf", first).narrowed)
+        self.assertFalse(SearchSession("favorites", "confi", first).narrowed)
+
+
+def make_item(entry_id, title, epoch=1_000_000.0, entry_type="history", favorite=False):
+    return ClipboardItem(entry_type, entry_id, title, "", "", epoch, "Text", "text", False, favorite, False)
+
+
+class FuzzyScoreTests(unittest.TestCase):
+    def test_boundaries_and_runs_beat_scattered_letters(self):
+        self.assertIsNone(fuzzy_score("dcu", "docker"))
+        self.assertGreater(fuzzy_score("dcu", "docker compose up"), fuzzy_score("dcu", "abducted cupid"))
+        self.assertGreater(fuzzy_score("dcu", "abducted cupid"), fuzzy_score("dcu", "pandacub"))
+        self.assertGreater(fuzzy_score("conf", "my config"), fuzzy_score("conf", "acorn fence"))
+
+
+class SearchIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.now = 2_000_000_000.0
+        self.index = SearchIndex()
+        titles = ["docker compose up -d", "abducted cupid", "git commit --amend", "docker ps", "decode url"]
+        for entry_id, title in enumerate(titles, 1):
+            self.index.add(make_item(entry_id, title, self.now - 86400 * 60))
+        self.index.add(make_item(9, "Docker Compose snippet", self.now - 86400 * 60, "snippet", True))
+        self.index.mark_ready()
+
+    def search(self, query, limit=10, entry_types=("history",), accept=None):
+        return [item.entry_id for _score, item in
+                self.index.search(query, limit, entry_types, accept=accept, now=self.now)]
+
+    def test_results_are_ranked_and_limited(self):
+        self.assertEqual(self.search("dcu", limit=2), [1, 5])
+        self.assertEqual(self.search("docker compose", entry_types=("history", "snippet")), [1, 9])
+        self.assertEqual(self.search("docker", accept=lambda item: item.entry_id != 1), [4])
+        self.assertEqual(self.search("zzz"), [])
+
+    def test_index_follows_edits_and_removals(self):
+        self.assertEqual(self.search("dock"), [1, 4])
+        self.assertEqual(self.search("docke"), [1, 4])
+        self.index.add(make_item(4, "kubectl get pods", self.now - 86400 * 60))
+        self.index.remove(("history", 1))
+        self.index.add(make_item(6, "docker build .", self.now - 86400 * 60))
+        self.assertEqual(self.search("docker"), [6])
+
+    def test_loading_builds_the_blob_and_broad_queries_are_capped(self):
+        index = SearchIndex()
+        index.MAX_SCORED = 10
+        for entry_id in range(1, 51):
+            index.add(make_item(entry_id, f"note {entry_id}", self.now - entry_id))
+        self.assertTrue(index._parts["history"].dirty)
+        index.mark_ready()
+        self.assertFalse(index._parts["history"].dirty)
+
+        # the most recent matches are the ones scored
+        self.assertEqual(sorted(item.entry_id for _score, item in index.search("nt", 50, ("history",), now=self.now)),
+                         list(range(1, 11)))
+        self.assertEqual(len(index.search("no te", 50, ("history",), now=self.now)), 5)
+
+    def test_old_exact_matches_survive_the_cap(self):
+        index = SearchIndex()
+        index.MAX_SCORED = 10
+        index.add(make_item(1, "config.yaml", self.now - 86400 * 300))
+        for entry_id in range(2, 52):
+            index.add(make_item(entry_id, f"cxoxnxfxixg {entry_id}", self.now - entry_id))
+        index.mark_ready()
+
+        found = index.search("config", 3, ("history",), now=self.now)
+        self.assertEqual(found[0][1].entry_id, 1)
+        self.assertEqual(len(found), 3)
+
+    def test_recent_and_reused_entries_win_ties(self):
+        index = SearchIndex()
+        index.add(make_item(1, "ssh deploy@host", self.now - 86400 * 200))
+        index.add(make_item(2, "ssh deploy@host", self.now - 3600))
+        index.add(make_item(3, "ssh deploy@host", self.now - 86400 * 200), use_count=40)
+        index.mark_ready()
+        found = [item.entry_id for _score, item in index.search("ssh", 3, ("history",), now=self.now)]
+        self.assertEqual(sorted(found[:2]), [2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
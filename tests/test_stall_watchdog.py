@@ -0,0 +1,58 @@
+import os
+import tempfile
+import time
+import unittest
+
+from PySide6.QtCore import QCoreApplication, QEventLoop, QTimer
+
+from stall_watchdog import StallWatchdog
+
+
+def spin(milliseconds):
+    loop = QEventLoop()
+    QTimer.singleShot(milliseconds, loop.quit)
+    loop.exec()
+
+
+def decrypt_everything():
+    # stands in for a synchronous hot path on the GUI thread
+    time.sleep(0.6)
+
+
+class StallWatchdogTests(unittest.TestCase):
+    def setUp(self):
+        self.app = QCoreApplication.instance() or QCoreApplication([])
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.temp_dir.name, "stalls.log")
+        self.watchdog = StallWatchdog(threshold_ms=150, log_path=self.log_path)
+
+    def tearDown(self):
+        self.watchdog.stop()
+        self.temp_dir.cleanup()
+
+    def test_blocked_event_loop_is_recorded_with_its_stack(self):
+        self.watchdog.start()
+        spin(300)
+        QTimer.singleShot(0, decrypt_everything)
+        spin(800)
+
+        self.assertEqual(len(self.watchdog.stalls), 1)
+        stall = self.watchdog.stalls[0]
+        self.assertGreater(stall.duration_ms, 400)
+        self.assertLess(stall.duration_ms, 1200)
+        self.assertIn("decrypt_everything", stall.culprit)
+        self.assertIn("time.sleep(0.6)", stall.stacks[0][1])
+        with open(self.log_path, encoding="utf-8") as f:
+            self.assertIn("decrypt_everything", f.read())
+
+    def test_turning_event_loop_is_not_a_stall(self):
+        self.watchdog.start()
+        for _ in range(6):
+            QTimer.singleShot(0, lambda: time.sleep(0.05))
+            spin(100)
+
+        self.assertEqual(list(self.watchdog.stalls), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+
+from startup_trace import StartupTracer
+
+
+class StartupTracerTests(unittest.TestCase):
+    def test_laps_follow_each_other(self):
+        trace = StartupTracer()
+        trace.lap("imports")
+        trace.lap("db open")
+        trace.mark("tray visible")
+
+        names = [name for name, _offset, _duration in trace.phases]
+        self.assertEqual(names, ["imports", "db open", "tray visible"])
+        (_, first_at, first_took), (_, second_at, _), (_, _, mark_took) = trace.phases
+        self.assertEqual(first_at, 0.0)
+        self.assertAlmostEqual(second_at, first_at + first_took)
+        self.assertEqual(mark_took, 0.0)
+
+    def test_log_keeps_recent_runs(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "startup.log")
+            for _ in range(StartupTracer.KEEP_RUNS + 2):
+                trace = StartupTracer()
+                trace.lap("imports")
+                trace.write(path)
+            with open(path, encoding="utf-8") as f:
+                runs = f.read().split("\n\n")
+
+        self.assertEqual(len(runs), StartupTracer.KEEP_RUNS)
+        self.assertTrue(all(run.startswith("startup ") for run in runs))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from tracing import Tracer
+
+
+class TracingTests(unittest.TestCase):
+    def setUp(self):
+        self.tracer = Tracer(capacity=50)
+        self.tracer.forced = False
+        self.tracer.set_enabled(True)
+
+    def test_disabled_tracer_records_nothing(self):
+        self.tracer.set_enabled(False)
+        with self.tracer.span("capture") as span:
+            span.set(kind="text")
+        self.tracer.record("queue", time.perf_counter(), 0.001)
+
+        self.assertEqual(len(self.tracer.events), 0)
+
+    def test_nested_spans_export_as_chrome_complete_events(self):
+        @self.tracer.traced("encrypt", cat="capture")
+        def encrypt(fail):
+            if fail:
+                raise ValueError("bad key")
+
+        with self.tracer.span("capture", cat="capture", kind="text") as span:
+            encrypt(False)
+            with self.assertRaises(ValueError):
+                encrypt(True)
+            span.set(chars=12)
+        worker = threading.Thread(target=lambda: self.tracer.record("persist", time.perf_counter(), 0.002),
+                                  name="clipboard-capture")
+        worker.start()
+        worker.join()
+
+        temp_dir = tempfile.TemporaryDirectory()
+        try:
+            path = os.path.join(temp_dir.name, "trace.json")
+            self.tracer.dump(path)
+            with open(path, encoding="utf-8") as f:
+                trace = json.load(f)
+        finally:
+            temp_dir.cleanup()
+
+        spans = {event["name"]: event for event in trace["traceEvents"] if event["ph"] == "X" and event["name"] != "encrypt"}
+        encrypts = [event for event in trace["traceEvents"] if event["name"] == "encrypt"]
+        outer = spans["capture"]
+        self.assertEqual(outer["args"], {"kind": "text", "chars": 12})
+        for inner in encrypts:
+            self.assertGreaterEqual(inner["ts"], outer["ts"])
+            self.assertLessEqual(inner["ts"] + inner["dur"], outer["ts"] + outer["dur"] + 0.2)
+        self.assertEqual(encrypts[1]["args"], {"error": "ValueError"})
+        self.assertNotEqual(spans["persist"]["tid"], outer["tid"])
+        thread_names = {event["args"]["name"] for event in trace["traceEvents"] if event["name"] == "thread_name"}
+        self.assertIn("clipboard-capture", thread_names)
+
+    def test_ring_buffer_keeps_the_newest_spans(self):
+        for index in range(80):
+            self.tracer.record(f"span {index}", time.perf_counter(), 0.0)
+
+        names = [event[0] for event in self.tracer.events]
+        self.assertEqual(len(names), 50)
+        self.assertEqual(names[-1], "span 79")
+        self.assertEqual(names[0], "span 30")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,23 @@
+import unittest
+
+from utils import format_relative_epoch, parse_timestamp_epoch, relative_time_granularity
+
+
+class RelativeTimeTests(unittest.TestCase):
+    def test_labels_follow_unit_boundaries(self):
+        now = parse_timestamp_epoch("2026-03-10 12:00:00")
+        self.assertEqual(format_relative_epoch(now + 5, now), "just now")
+        self.assertEqual(format_relative_epoch(now - 59, now), "59s ago")
+        self.assertEqual(format_relative_epoch(now - 60, now), "1m ago")
+        self.assertEqual(format_relative_epoch(parse_timestamp_epoch("2026-03-07 11:00:00"), now), "3d ago")
+        self.assertEqual(format_relative_epoch(now - 400 * 86400, now), "1y ago")
+
+    def test_granularity_matches_the_displayed_unit(self):
+        self.assertEqual(relative_time_granularity(30), 1)
+        self.assertEqual(relative_time_granularity(90), 60)
+        self.assertEqual(relative_time_granularity(3 * 86400), 86400)
+        self.assertEqual(parse_timestamp_epoch("not a time"), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""Seed a large history and check that tag and retention queries use indexes."""
+
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from database import DatabaseManager
+from query_log import full_scans
+
+LARGE_TABLES = ("history", "entry_tags", "h", "et")
+TAGS = 20
+BATCH = 50_000
+
+
+def seed(db, entries, tagged_every):
+    now = datetime.datetime.now()
+    with db.conn:
+        db.conn.executemany(
+            "insert into tags (name, color) values (?, ?)",
+            [(f"tag {index}", DatabaseManager.TAG_COLORS[index % len(DatabaseManager.TAG_COLORS)]) for index in range(TAGS)],
+        )
+    for start in range(0, entries, BATCH):
+        rows = []
+        for index in range(start, min(start + BATCH, entries)):
+            # about two years of history, oldest first
+            timestamp = (now - datetime.timedelta(minutes=(entries - index))).strftime("%Y-%m-%d %H:%M:%S")
+            rows.append((f"entry {index}".encode(), timestamp, index % 5 == 0, int(index % 997 == 0), f"hash{index}"))
+        with db.conn:
+            db.conn.executemany(
+                "insert into history (text, timestamp, is_code, pinned, content_hash) values (?, ?, ?, ?, ?)", rows
+            )
+            db.conn.executemany(
+                "insert into entry_tags (entry_id, tag_id, entry_type) select id, (id % ?) + 1, 'history' "
+                "from history where id = ?",
+                [(TAGS, start + offset + 1) for offset in range(0, len(rows), tagged_every)],
+            )
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return (time.perf_counter() - started) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=1_000_000, help="history rows to seed (default 1,000,000)")
+    parser.add_argument("--tagged-every", type=int, default=10, help="tag one row in this many (default 10)")
+    parser.add_argument("--keep-days", type=int, default=365, help="retention cutoff in days (default 365)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as app_dir:
+        db = DatabaseManager(os.path.join(app_dir, "clipboard_manager.db"))
+        started = time.perf_counter()
+        seed(db, args.entries, args.tagged_every)
+        db.optimize()
+        print(f"seeded {db.count_history():,} rows in {time.perf_counter() - started:.1f} s\n")
+
+        cutoff = (datetime.datetime.now() - datetime.timedelta(days=args.keep_days)).strftime("%Y-%m-%d %H:%M:%S")
+        checks = [
+            ("get_tag_counts", db.get_tag_counts, ()),
+            ("get_history_entries_by_tag", db.get_history_entries_by_tag, (1,)),
+            ("get_entries_older_than (batch)", db.get_entries_older_than, (cutoff, 200)),
+            ("delete_entries_older_than (batch)", db.delete_entries_older_than, (cutoff, 200)),
+            ("delete_entries_older_than (all)", db.delete_entries_older_than, (cutoff,)),
+        ]
+        failures = 0
+        for name, function, call_args in checks:
+            db.query_log.statements.clear()
+            elapsed, _result = timed(function, *call_args)
+            print(f"{name}: {elapsed:.1f} ms")
+            for statement in db.query_log.top():
+                plan = db.query_log.plan(db.conn, statement["sql"])
+                if not plan:
+                    continue
+                scans = full_scans(plan, LARGE_TABLES)
+                failures += bool(scans)
+                print(f"  {statement['sql']}")
+                print(f"    {statement['calls']} calls, {statement['rows']:,} rows, {statement['total_ms']:.1f} ms")
+                for line in plan.splitlines():
+                    print(f"      {line}")
+                for line in scans:
+                    print(f"    FULL SCAN: {line}")
+            print()
+        db.close()
+    print("all queries use indexes" if not failures else f"{failures} statements scan a large table")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Time main window construction and what each lazily built page would add to it."""
+
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from cryptography.fernet import Fernet
+from PySide6.QtWidgets import QApplication
+
+from database import DatabaseManager
+from encryption import DummyFernet, content_fingerprint, encrypt_text
+from metrics import registry
+from settings import DEFAULT_SETTINGS
+from ui.fluent_window import ClipboardManagerWindow
+from ui.lazy_page import LazyPage
+
+
+def seed(db, fernet, key, entries):
+    now = datetime.datetime.now()
+    for index in range(entries):
+        text = f"benchmark entry {index}\nsecond line {index * 7}"
+        timestamp = (now - datetime.timedelta(minutes=index)).strftime("%Y-%m-%d %H:%M:%S")
+        db.store_entry(encrypt_text(text, fernet), timestamp, 0, content_fingerprint(text, key))
+
+
+def run_once(entries):
+    with tempfile.TemporaryDirectory() as app_dir:
+        fernet = DummyFernet()
+        key = b"startup-benchmark-fingerprint-key"
+        db = DatabaseManager(os.path.join(app_dir, "clipboard_history.db"))
+        seed(db, fernet, key, entries)
+
+        started = time.perf_counter()
+        window = ClipboardManagerWindow(db, fernet, dict(DEFAULT_SETTINGS), app_dir, key, Fernet.generate_key())
+        startup = time.perf_counter() - started
+
+        # what eager construction used to add before the window could show
+        builds = {}
+        for page in window.findChildren(LazyPage):
+            started = time.perf_counter()
+            page.build()
+            builds[page.objectName()] = time.perf_counter() - started
+
+        # the same teardown as _exit_app, so nothing touches the database
+        # after the temporary directory is gone
+        if hasattr(window, "hotkey_manager"):
+            window.hotkey_manager.close()
+        window._stop_maintenance()
+        window.watchdog.stop()
+        window.capture.close()
+        db.unsubscribe(window.db_events.publish)
+        registry.remove_collector("db")
+        window._index_generation += 1
+        window.quick_paste.deleteLater()
+        window.deleteLater()
+        QApplication.processEvents()
+        db.close()
+    return startup, builds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=500, help="history rows to seed (default 500)")
+    parser.add_argument("--rounds", type=int, default=5, help="windows to build (default 5)")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    app.setQuitOnLastWindowClosed(False)
+    run_once(args.entries)  # warm imports, fonts and icon caches
+
+    startups = []
+    builds: dict[str, list[float]] = {}
+    for _ in range(args.rounds):
+        startup, page_builds = run_once(args.entries)
+        startups.append(startup)
+        for name, seconds in page_builds.items():
+            builds.setdefault(name, []).append(seconds)
+
+    startup_ms = statistics.median(startups) * 1000
+    deferred_ms = sum(statistics.median(times) * 1000 for times in builds.values())
+    print(f"window construction (lazy pages): {startup_ms:8.1f} ms")
+    for name, times in builds.items():
+        print(f"  deferred {name:<16}        {statistics.median(times) * 1000:8.1f} ms")
+    print(f"eager equivalent:                 {startup_ms + deferred_ms:8.1f} ms")
+    print(f"saved at startup:                 {deferred_ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
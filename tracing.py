@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+class _NullSpan:
+    # handed out while tracing is off, so a disabled span costs one check
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer._append(self.name, self.cat, self.start, time.perf_counter() - self.start, self.args)
+        return False
+
+    def set(self, **args) -> None:
+        self.args.update(args)
+
+
+class Tracer:
+    # timing spans kept in a ring buffer, dumped as chrome trace-event json.
+    #
+    # spans are complete events (name, category, start, duration, thread,
+    # attributes); viewers nest them by time on each thread, so a span
+    # opened inside another shows up as its child. Times are perf_counter()
+    # seconds, so stages measured elsewhere can be added with record().
+    # Off unless enabled in settings or by the environment variable.
+
+    CAPACITY = 20_000
+    ENV_VAR = "CLIPBOARD_MANAGER_TRACE"
+
+    def __init__(self, capacity: int = CAPACITY):
+        self.forced = os.environ.get(self.ENV_VAR, "") not in ("", "0")
+        self.enabled = self.forced
+        self.origin = time.perf_counter()
+        self.events: deque = deque(maxlen=capacity)  # name, cat, start, duration, thread id, args
+        self._threads: dict[int, str] = {}
+
+    def set_enabled(self, enabled: bool) -> None:
+        self.enabled = bool(enabled) or self.forced
+
+    def span(self, name: str, cat: str = "app", **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat, args)
+
+    def traced(self, name: str, cat: str = "app"):
+        # decorator form of span()
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with _Span(self, name, cat, {}):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def record(self, name: str, start: float, duration: float, cat: str = "app", **args) -> None:
+        if self.enabled:
+            self._append(name, cat, start, duration, args)
+
+    def _append(self, name, cat, start, duration, args):
+        thread = threading.current_thread()
+        self._threads[thread.ident] = thread.name
+        self.events.append((name, cat, start, duration, thread.ident, args))
+
+    def clear(self) -> None:
+        self.events.clear()
+
+    def to_chrome(self) -> dict:
+        pid = os.getpid()
+        events = [{"ph": "M", "name": "process_name", "pid": pid, "tid": 0, "args": {"name": "Clipboard Manager"}}]
+        for tid, name in list(self._threads.items()):
+            events.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": name}})
+        for name, cat, start, duration, tid, args in list(self.events):
+            events.append({
+                "ph": "X", "name": name, "cat": cat, "pid": pid, "tid": tid,
+                "ts": round((start - self.origin) * 1e6, 1),
+                "dur": round(duration * 1e6, 1),
+                "args": args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome(), f, default=str)
+
+
+tracer = Tracer()
@@ -1,11 +1,13 @@
-from PySide6.QtWidgets import (QWidget, QHBoxLayout, QVBoxLayout, QLabel,
-                                QSizePolicy, QDialog, QDialogButtonBox)
-from PySide6.QtCore import Qt, Signal, QSize
-from PySide6.QtGui import QFont, QColor, QFontMetrics, QIcon, QPixmap, QPainter
-from qfluentwidgets import (CardWidget, TransparentToolButton, FluentIcon,
-                             isDarkTheme, PlainTextEdit, LineEdit)
+import time
 
-from utils import get_jetbrains_font, format_relative_time
+from PySide6.QtWidgets import (QVBoxLayout, QHBoxLayout, QDialog, QDialogButtonBox,
+                                QStyledItemDelegate, QStyle, QWidget)
+from PySide6.QtCore import Qt, Signal, QSize, QRect, QRectF
+from PySide6.QtGui import QFont, QColor, QFontMetrics, QIcon, QPainter, QPen, QPixmap
+from qfluentwidgets import FluentIcon, isDarkTheme, PlainTextEdit, TransparentToolButton
+
+from ui.thumbnails import ThumbnailCache
+from utils import get_jetbrains_font, format_relative_epoch
 
 
 LANGUAGE_COLORS = {
@@ -30,55 +32,53 @@ CONTENT_TYPE_COLORS = {
     'code': '#3B82F6',
     'link': '#10B981',
     'text': '#6B7280',
+    'image': '#EC4899',
+    'files': '#F59E0B',
 }
 
+THUMBNAIL_BOX = (96, 48)  # width, height of the image preview on a card
+
+
+# process-wide render caches; entries are tiny and keyed by everything that
+# changes their pixels, so they are never invalidated
+_TINTED_ICONS: dict[tuple, QIcon] = {}
+_BADGE_PIXMAPS: dict[tuple, QPixmap] = {}
+
 
-class LanguageBadge(QLabel):
-    # small pill badge for language/content type
-
-    def __init__(self, label_text, color=None, parent=None):
-        super().__init__(label_text, parent)
-        if color is None:
-            color = LANGUAGE_COLORS.get(label_text, '#6B7280')
-        self.badge_color = color
-        self.setAlignment(Qt.AlignCenter)
-
-        font = QFont()
-        font.setPointSize(8)
-        font.setBold(True)
-        self.setFont(font)
-
-        fm = QFontMetrics(font)
-        text_width = fm.horizontalAdvance(label_text)
-        self.setFixedWidth(max(28, text_width + 14))
-        self.setFixedHeight(20)
-        self.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
-        self._apply_style()
-
-    def _apply_style(self):
-        self.setStyleSheet(f"""
-            QLabel {{
-                background-color: {self.badge_color};
-                color: white;
-                border-radius: 4px;
-                padding: 2px 5px;
-                font-weight: bold;
-                font-size: 9px;
-            }}
-        """)
-
-
-def _tinted_icon(fluent_icon, color_hex):
+def _tinted_icon(fluent_icon, color_hex, size=16):
     # tint fluent icons because default ones don't color dynamically
-    icon = fluent_icon.icon()
-    sizes = icon.availableSizes()
-    size = sizes[0] if sizes else QSize(16, 16)
-    pixmap = icon.pixmap(size)
-    painter = QPainter(pixmap)
-    painter.setCompositionMode(QPainter.CompositionMode_SourceIn)
-    painter.fillRect(pixmap.rect(), QColor(color_hex))
-    painter.end()
-    return QIcon(pixmap)
+    key = (fluent_icon, color_hex, size)
+    icon = _TINTED_ICONS.get(key)
+    if icon is None:
+        pixmap = fluent_icon.icon().pixmap(QSize(size, size))
+        painter = QPainter(pixmap)
+        painter.setCompositionMode(QPainter.CompositionMode_SourceIn)
+        painter.fillRect(pixmap.rect(), QColor(color_hex))
+        painter.end()
+        icon = _TINTED_ICONS[key] = QIcon(pixmap)
+    return icon
+
+
+def _badge_pixmap(label, color_hex, font, ratio):
+    # badges read the same on light and dark cards, so theme is not part of the key
+    key = (label, color_hex, ratio)
+    pixmap = _BADGE_PIXMAPS.get(key)
+    if pixmap is None:
+        width = max(28, QFontMetrics(font).horizontalAdvance(label) + 14)
+        pixmap = QPixmap(round(width * ratio), round(20 * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(color_hex))
+        painter.drawRoundedRect(QRectF(0, 0, width, 20), 4, 4)
+        painter.setPen(QColor('white'))
+        painter.setFont(font)
+        painter.drawText(QRect(0, 0, width, 20), Qt.AlignCenter, label)
+        painter.end()
+        pixmap = _BADGE_PIXMAPS[key] = pixmap
+    return pixmap
 
 
 class EditDialog(QDialog):
@@ -110,220 +110,185 @@ class EditDialog(QDialog):
         self.accept()
 
 
-class ClipboardCard(CardWidget):
-    # card widget for clipboard item in lists
-
-    copyClicked = Signal(int)
-    pinClicked = Signal(int)
-    editClicked = Signal(int)
-    deleteClicked = Signal(int)
-    favoriteClicked = Signal(int)
-    cardClicked = Signal(int)
-    saveAsSnippetClicked = Signal(int)
-    tagClicked = Signal(int)
-
-    def __init__(self, entry_id, title, preview_text, timestamp,
-                 language='Text', content_type='text',
-                 is_pinned=False, is_favorite=False,
-                 show_pin=True, show_favorite=True, show_edit=True,
-                 show_copy=True, show_delete=True,
-                 show_save_snippet=False, show_tag=False,
-                 show_timestamp=True,
-                 parent=None):
+
+
+CARD_HEIGHT = 96
+CARD_SPACING = 8
+ACTION_SIZE = 30
+ACTION_ICON_SIZE = 18
+
+# action name -> (icon, tooltip, shortcut on the focused list)
+CARD_ACTIONS = {
+    'copy':     (FluentIcon.COPY, 'Copy', 'Ctrl+C'),
+    'pin':      (FluentIcon.PIN, 'Pin', 'Ctrl+P'),
+    'favorite': (FluentIcon.HEART, 'Favorite', 'Ctrl+D'),
+    'edit':     (FluentIcon.EDIT, 'Edit', 'F2'),
+    'snippet':  (FluentIcon.SAVE, 'Save as Snippet', 'Ctrl+S'),
+    'tag':      (FluentIcon.TAG, 'Tag', 'Ctrl+T'),
+    'delete':   (FluentIcon.DELETE, 'Delete', 'Delete'),
+}
+
+
+def action_tooltip(action, item):
+    label = CARD_ACTIONS[action][1]
+    if action == 'pin' and item.pinned:
+        label = 'Unpin'
+    elif action == 'favorite' and item.favorite:
+        label = 'Unfavorite'
+    return f"{label} ({CARD_ACTIONS[action][2]})"
+
+
+class CardActionBar(QWidget):
+    # one set of action buttons shared by every row of a list; the view
+    # moves it onto whichever card is hovered or selected
+
+    actionTriggered = Signal(str, object)  # action, ClipboardItem
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.item = None
+        self._favorite_icon = _tinted_icon(FluentIcon.HEART, '#EF4444', ACTION_ICON_SIZE)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(1)
+        self.buttons = {}
+        for action, (icon, _tooltip, _shortcut) in CARD_ACTIONS.items():
+            button = TransparentToolButton(icon, self)
+            button.setFixedSize(ACTION_SIZE, ACTION_SIZE)
+            button.setIconSize(QSize(ACTION_ICON_SIZE, ACTION_ICON_SIZE))
+            button.clicked.connect(lambda checked=False, name=action: self._trigger(name))
+            layout.addWidget(button)
+            self.buttons[action] = button
+        self.hide()
+
+    def show_for(self, item, actions, rect):
+        self.item = item
+        for action, button in self.buttons.items():
+            button.setVisible(action in actions)
+        if 'pin' in actions:
+            self.buttons['pin'].setIcon(FluentIcon.UNPIN if item.pinned else FluentIcon.PIN)
+        if 'favorite' in actions:
+            self.buttons['favorite'].setIcon(self._favorite_icon if item.favorite else FluentIcon.HEART)
+        for action in actions:
+            self.buttons[action].setToolTip(action_tooltip(action, item))
+        self.setGeometry(rect)
+        self.show()
+        self.raise_()
+
+    def clear(self):
+        self.item = None
+        self.hide()
+
+    def _trigger(self, action):
+        if self.item is not None:
+            self.actionTriggered.emit(action, self.item)
+
+
+class ClipboardCardDelegate(QStyledItemDelegate):
+    # paints a clipboard card per row so lists hold no per-row widgets
+
+    def __init__(self, item_role, actions_for, parent=None):
         super().__init__(parent)
-        self.entry_id = entry_id
-        self._is_selected = False
-        self._is_pinned = is_pinned
-        self._is_favorite = is_favorite
-
-        self.setFixedHeight(96)
-        self.setMinimumWidth(360)
-        self.setCursor(Qt.PointingHandCursor)
-
-        main_layout = QHBoxLayout(self)
-        main_layout.setContentsMargins(12, 10, 8, 10)
-        main_layout.setSpacing(10)
-
-        badge_label = language if language != 'Text' else content_type.capitalize()
-        badge_color = LANGUAGE_COLORS.get(language, CONTENT_TYPE_COLORS.get(content_type, '#6B7280'))
-        self.badge = LanguageBadge(badge_label, badge_color, parent=self)
-        main_layout.addWidget(self.badge, 0, Qt.AlignTop)
-
-        center_layout = QVBoxLayout()
-        center_layout.setSpacing(4)
-        center_layout.setContentsMargins(0, 0, 0, 0)
-
-        self.title_label = QLabel(title, self)
-        title_font = self.title_label.font()
-        title_font.setPointSize(10)
-        title_font.setBold(True)
-        self.title_label.setFont(title_font)
-        self.title_label.setWordWrap(False)
-        self.title_label.setTextInteractionFlags(Qt.NoTextInteraction)
-        center_layout.addWidget(self.title_label)
-
-        self.preview_label = QLabel(preview_text, self)
-        mono_font = get_jetbrains_font(9)
-        self.preview_label.setFont(mono_font)
-        self.preview_label.setWordWrap(False)
-        self.preview_label.setMaximumHeight(40)
-        self.preview_label.setTextInteractionFlags(Qt.NoTextInteraction)
-        if isDarkTheme():
-            self.preview_label.setStyleSheet("color: #9CA3AF;")
+        self.item_role = item_role
+        self.actions_for = actions_for
+        self.show_timestamp = True
+        # set by the view before each repaint so a frame shares one clock reading
+        self.now = time.time()
+
+        self.title_font = QFont()
+        self.title_font.setPointSize(10)
+        self.title_font.setBold(True)
+        self.preview_font = QFont(get_jetbrains_font(9))
+        self.preview_font.setPointSize(9)
+        self.time_font = QFont()
+        self.time_font.setPointSize(8)
+        self.badge_font = QFont()
+        self.badge_font.setPointSize(8)
+        self.badge_font.setBold(True)
+        self.title_metrics = QFontMetrics(self.title_font)
+        self.preview_metrics = QFontMetrics(self.preview_font)
+
+    def sizeHint(self, option, index):
+        return QSize(max(360, option.rect.width()), CARD_HEIGHT + CARD_SPACING)
+
+    def _card_rect(self, option):
+        return option.rect.adjusted(0, 0, -1, -CARD_SPACING - 1)
+
+    def action_bar_rect(self, row_rect, actions):
+        # where the shared action bar sits on a card; paint() keeps it clear of text
+        card = row_rect.adjusted(0, 0, -1, -CARD_SPACING - 1)
+        width = len(actions) * (ACTION_SIZE + 1) - 1
+        return QRect(card.right() - 8 - width, card.top() + 30, width, ACTION_SIZE)
+
+    def paint(self, painter, option, index):
+        item = index.data(self.item_role)
+        if item is None:
+            return
+        dark = isDarkTheme()
+        selected = bool(option.state & QStyle.State_Selected)
+        hovered = bool(option.state & QStyle.State_MouseOver)
+        card = self._card_rect(option)
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        if dark:
+            background = QColor(255, 255, 255, 21 if hovered else 13)
+            border = QColor('#3D3D3D')
         else:
-            self.preview_label.setStyleSheet("color: #6B7280;")
-        center_layout.addWidget(self.preview_label)
-        center_layout.addStretch()
-
-        main_layout.addLayout(center_layout, 1)
-
-        right_widget = QWidget(self)
-        right_widget.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Preferred)
-        right_layout = QVBoxLayout(right_widget)
-        right_layout.setSpacing(4)
-        right_layout.setContentsMargins(0, 0, 0, 0)
-
-        self.time_label = QLabel(format_relative_time(timestamp) if show_timestamp else "", right_widget)
-        self.time_label.setVisible(show_timestamp)
-        time_font = self.time_label.font()
-        time_font.setPointSize(8)
-        self.time_label.setFont(time_font)
-        if isDarkTheme():
-            self.time_label.setStyleSheet("color: #6B7280;")
+            background = QColor(243, 243, 243, 170) if hovered else QColor(255, 255, 255, 170)
+            border = QColor('#E0E0E0')
+        if selected:
+            painter.setPen(QPen(QColor('#0078D4'), 2))
+            card_shape = QRectF(card).adjusted(1, 1, -1, -1)
         else:
-            self.time_label.setStyleSheet("color: #9CA3AF;")
-        self.time_label.setAlignment(Qt.AlignRight)
-        right_layout.addWidget(self.time_label)
-
-        actions_layout = QHBoxLayout()
-        actions_layout.setSpacing(1)
-        actions_layout.setContentsMargins(0, 0, 0, 0)
-        actions_layout.addStretch()
-
-        self._action_buttons = []
-
-        if show_copy:
-            self.copy_btn = TransparentToolButton(FluentIcon.COPY, right_widget)
-            self.copy_btn.setFixedSize(30, 30)
-            self.copy_btn.setIconSize(QSize(18, 18))
-            self.copy_btn.setToolTip("Copy")
-            self.copy_btn.clicked.connect(lambda: self.copyClicked.emit(self.entry_id))
-            actions_layout.addWidget(self.copy_btn)
-            self._action_buttons.append(self.copy_btn)
-
-        if show_pin:
-            self.pin_btn = TransparentToolButton(FluentIcon.PIN if not is_pinned else FluentIcon.UNPIN, right_widget)
-            self.pin_btn.setFixedSize(30, 30)
-            self.pin_btn.setIconSize(QSize(18, 18))
-            self.pin_btn.setToolTip("Unpin" if is_pinned else "Pin")
-            self.pin_btn.clicked.connect(lambda: self.pinClicked.emit(self.entry_id))
-            actions_layout.addWidget(self.pin_btn)
-            self._action_buttons.append(self.pin_btn)
-
-        if show_favorite:
-            self.fav_btn = TransparentToolButton(FluentIcon.HEART, right_widget)
-            self.fav_btn.setFixedSize(30, 30)
-            self.fav_btn.setIconSize(QSize(18, 18))
-            self.fav_btn.setToolTip("Unfavorite" if is_favorite else "Favorite")
-            if is_favorite:
-                self.fav_btn.setIcon(_tinted_icon(FluentIcon.HEART, '#EF4444'))
-            self.fav_btn.clicked.connect(lambda: self.favoriteClicked.emit(self.entry_id))
-            actions_layout.addWidget(self.fav_btn)
-            self._action_buttons.append(self.fav_btn)
-
-        if show_edit:
-            self.edit_btn = TransparentToolButton(FluentIcon.EDIT, right_widget)
-            self.edit_btn.setFixedSize(30, 30)
-            self.edit_btn.setIconSize(QSize(18, 18))
-            self.edit_btn.setToolTip("Edit")
-            self.edit_btn.clicked.connect(lambda: self.editClicked.emit(self.entry_id))
-            actions_layout.addWidget(self.edit_btn)
-            self._action_buttons.append(self.edit_btn)
-
-        if show_save_snippet:
-            self.snippet_btn = TransparentToolButton(FluentIcon.SAVE, right_widget)
-            self.snippet_btn.setFixedSize(30, 30)
-            self.snippet_btn.setIconSize(QSize(18, 18))
-            self.snippet_btn.setToolTip("Save as Snippet")
-            self.snippet_btn.clicked.connect(lambda: self.saveAsSnippetClicked.emit(self.entry_id))
-            actions_layout.addWidget(self.snippet_btn)
-            self._action_buttons.append(self.snippet_btn)
-
-        if show_tag:
-            self.tag_btn = TransparentToolButton(FluentIcon.TAG, right_widget)
-            self.tag_btn.setFixedSize(30, 30)
-            self.tag_btn.setIconSize(QSize(18, 18))
-            self.tag_btn.setToolTip("Tag")
-            self.tag_btn.clicked.connect(lambda: self.tagClicked.emit(self.entry_id))
-            actions_layout.addWidget(self.tag_btn)
-            self._action_buttons.append(self.tag_btn)
-
-        if show_delete:
-            self.delete_btn = TransparentToolButton(FluentIcon.DELETE, right_widget)
-            self.delete_btn.setFixedSize(30, 30)
-            self.delete_btn.setIconSize(QSize(18, 18))
-            self.delete_btn.setToolTip("Delete")
-            self.delete_btn.clicked.connect(lambda: self.deleteClicked.emit(self.entry_id))
-            actions_layout.addWidget(self.delete_btn)
-            self._action_buttons.append(self.delete_btn)
-
-        right_layout.addLayout(actions_layout)
-        right_layout.addStretch()
-
-        right_widget.setMinimumWidth(max(128, len(self._action_buttons) * 31 + 8))
-
-        main_layout.addWidget(right_widget, 0)
-
-        self._apply_border_style()
-
-    def setSelected(self, selected):
-        self._is_selected = selected
-        self._apply_border_style()
-
-    def _apply_border_style(self):
-        if self._is_selected:
-            self.setStyleSheet("""
-                ClipboardCard {
-                    border: 2px solid #0078D4;
-                    border-radius: 8px;
-                }
-            """)
+            painter.setPen(QPen(border, 1))
+            card_shape = QRectF(card).adjusted(0.5, 0.5, -0.5, -0.5)
+        painter.setBrush(background)
+        painter.drawRoundedRect(card_shape, 8, 8)
+
+        # badge
+        badge_label = item.language if item.language != 'Text' else item.content_type.capitalize()
+        badge_color = LANGUAGE_COLORS.get(item.language, CONTENT_TYPE_COLORS.get(item.content_type, '#6B7280'))
+        badge = _badge_pixmap(badge_label, badge_color, self.badge_font, painter.device().devicePixelRatioF())
+        badge_rect = QRect(card.left() + 12, card.top() + 10,
+                           round(badge.width() / badge.devicePixelRatio()), 20)
+        painter.drawPixmap(badge_rect.topLeft(), badge)
+
+        right_width = max(128, len(self.actions_for(item)) * (ACTION_SIZE + 1) + 8)
+        text_left = badge_rect.right() + 10
+        text_width = max(0, card.right() - right_width - 10 - text_left)
+
+        # title and preview
+        painter.setFont(self.title_font)
+        painter.setPen(QColor('white') if dark else QColor('black'))
+        title_metrics = self.title_metrics
+        painter.drawText(QRect(text_left, card.top() + 10, text_width, title_metrics.height()),
+                         Qt.AlignLeft | Qt.AlignVCenter,
+                         title_metrics.elidedText(item.title, Qt.ElideRight, text_width))
+        cache = ThumbnailCache.instance()
+        if item.kind == "image" and item.blob_hash and cache is not None:
+            # the cache loads misses off the GUI thread and repaints when ready
+            pixmap = cache.pixmap(item.blob_hash)
+            if pixmap is not None:
+                box_width, box_height = THUMBNAIL_BOX
+                size = pixmap.size().scaled(min(box_width, text_width), box_height, Qt.KeepAspectRatio)
+                painter.drawPixmap(QRect(text_left, card.top() + 16 + title_metrics.height(),
+                                         size.width(), size.height()), pixmap)
         else:
-            if isDarkTheme():
-                self.setStyleSheet("""
-                    ClipboardCard {
-                        border: 1px solid #3D3D3D;
-                        border-radius: 8px;
-                    }
-                """)
-            else:
-                self.setStyleSheet("""
-                    ClipboardCard {
-                        border: 1px solid #E0E0E0;
-                        border-radius: 8px;
-                    }
-                """)
-
-    def mousePressEvent(self, event):
-        if event.button() == Qt.LeftButton:
-            for btn in self._action_buttons:
-                if btn.underMouse():
-                    super().mousePressEvent(event)
-                    return
-            self.cardClicked.emit(self.entry_id)
-        super().mousePressEvent(event)
-
-    def update_pin_state(self, is_pinned):
-        self._is_pinned = is_pinned
-        if hasattr(self, 'pin_btn'):
-            self.pin_btn.setIcon(FluentIcon.UNPIN if is_pinned else FluentIcon.PIN)
-            self.pin_btn.setToolTip("Unpin" if is_pinned else "Pin")
-
-    def update_favorite_state(self, is_favorite):
-        self._is_favorite = is_favorite
-        if hasattr(self, 'fav_btn'):
-            if is_favorite:
-                self.fav_btn.setIcon(_tinted_icon(FluentIcon.HEART, '#EF4444'))
-            else:
-                self.fav_btn.setIcon(FluentIcon.HEART.icon())
-            self.fav_btn.setToolTip("Unfavorite" if is_favorite else "Favorite")
+            painter.setFont(self.preview_font)
+            painter.setPen(QColor('#9CA3AF') if dark else QColor('#6B7280'))
+            preview_metrics = self.preview_metrics
+            painter.drawText(QRect(text_left, card.top() + 14 + title_metrics.height(), text_width, preview_metrics.height()),
+                             Qt.AlignLeft | Qt.AlignVCenter,
+                             preview_metrics.elidedText(item.preview.replace('\n', ' '), Qt.ElideRight, text_width))
+
+        # timestamp
+        if self.show_timestamp:
+            painter.setFont(self.time_font)
+            painter.setPen(QColor('#6B7280') if dark else QColor('#9CA3AF'))
+            painter.drawText(QRect(card.right() - right_width - 8, card.top() + 10, right_width, 16),
+                             Qt.AlignRight | Qt.AlignVCenter,
+                             format_relative_epoch(item.epoch, self.now) if item.epoch else item.timestamp)
+
+        painter.restore()
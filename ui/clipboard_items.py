@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from typing import NamedTuple
+
+from content_detection import detect_content_type, detect_language
+from utils import parse_timestamp_epoch
+
+
+class ClipboardItem(NamedTuple):
+    # render-ready row shared by every list page
+    entry_type: str
+    entry_id: int
+    title: str
+    preview: str
+    timestamp: str
+    epoch: float
+    language: str
+    content_type: str
+    pinned: bool
+    favorite: bool
+    is_code: bool
+    kind: str = "text"  # text, html, image or files
+    blob_hash: str | None = None
+
+    @property
+    def key(self) -> tuple[str, int]:
+        return self.entry_type, self.entry_id
+
+
+def extract_title(text: str, content_type: str) -> str:
+    if content_type == "link":
+        first_line = text.strip().split('\n')[0]
+        return first_line[:57] + "..." if len(first_line) > 60 else first_line
+    for line in text.strip().split('\n'):
+        stripped = line.strip()
+        if stripped:
+            return stripped[:57] + "..." if len(stripped) > 60 else stripped
+    return "Empty entry"
+
+
+def extract_preview(text: str) -> str:
+    lines = text.strip().split('\n')
+    preview_lines = [line.strip() for line in lines[1:4] if line.strip()]
+    if preview_lines:
+        preview = '  '.join(preview_lines)
+        return preview[:97] + "..." if len(preview) > 100 else preview
+    text_flat = text.strip()
+    return text_flat[:97] + "..." if len(text_flat) > 100 else text_flat
+
+
+def history_item(row, text: str) -> ClipboardItem:
+    # row is (id, text, timestamp, is_code, pinned, favorite, kind, blob_hash)
+    entry_id, _encrypted, timestamp, code_flag, pinned, favorite, kind, blob_hash = row
+    content_type = detect_content_type(text) if kind in ("text", "html") else kind
+    return ClipboardItem(
+        entry_type="history",
+        entry_id=entry_id,
+        title=extract_title(text, content_type),
+        preview=extract_preview(text),
+        timestamp=timestamp,
+        epoch=parse_timestamp_epoch(timestamp),
+        language=detect_language(text) if code_flag else "Text",
+        content_type=content_type,
+        pinned=bool(pinned),
+        favorite=bool(favorite),
+        is_code=bool(code_flag),
+        kind=kind,
+        blob_hash=blob_hash,
+    )
+
+
+def snippet_item(row, text: str) -> ClipboardItem:
+    # row is (id, title, text, language, timestamp, favorite)
+    snippet_id, title, _encrypted, language, timestamp, favorite = row
+    preview = text.strip()
+    return ClipboardItem(
+        entry_type="snippet",
+        entry_id=snippet_id,
+        title=title,
+        preview=preview[:97] + "..." if len(preview) > 100 else preview,
+        timestamp=timestamp,
+        epoch=parse_timestamp_epoch(timestamp),
+        language=language,
+        content_type="code",
+        pinned=False,
+        favorite=bool(favorite),
+        is_code=True,
+    )
@@ -0,0 +1,402 @@
+from __future__ import annotations
+
+import time
+import traceback
+from collections.abc import Callable, Iterator
+
+from PySide6.QtWidgets import QListView, QAbstractItemView, QFrame
+from PySide6.QtCore import (Qt, Signal, QAbstractListModel, QModelIndex, QPersistentModelIndex,
+                            QPoint, QRunnable, QThreadPool, QTimer)
+from PySide6.QtGui import QPainter, QColor, QCursor, QKeySequence, QShortcut
+
+from ui.clipboard_card import CARD_ACTIONS, CardActionBar, ClipboardCardDelegate
+from ui.clipboard_items import ClipboardItem
+from database import release_thread_connections
+from metrics import registry
+from profiling import profiler
+from tracing import tracer
+from ui.thumbnails import ThumbnailCache
+from utils import relative_time_granularity
+
+
+ItemRole = Qt.UserRole + 1
+
+
+class _FetchTask(QRunnable):
+    # pulls one batch from the model's source on a pool thread
+
+    def __init__(self, model, generation, source, count, first):
+        super().__init__()
+        self.model = model
+        self.generation = generation
+        self.source = source
+        self.count = count
+        self.first = first
+        self.queued_at = time.perf_counter()
+
+    def _cancelled(self):
+        return self.model.generation != self.generation
+
+    def run(self):
+        # the scan and decrypt work load_entries hands off happens here
+        profiler.profiled(self.model.profile_name)(self._fetch)()
+
+    def _fetch(self):
+        batch: list[ClipboardItem] = []
+        loaded = 0
+        exhausted = False
+        try:
+            while loaded < self.count:
+                if self._cancelled():
+                    return
+                try:
+                    item = next(self.source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if item is None:
+                    continue
+                batch.append(item)
+                loaded += 1
+                # flush the first screenful early so it paints without waiting for the batch
+                if loaded == self.first:
+                    registry.observe("ui.first_rows_ms", (time.perf_counter() - self.queued_at) * 1000)
+                    self.model.batchLoaded.emit(self.generation, batch, False, False)
+                    batch = []
+        except Exception as exc:
+            # the list ends here; say why instead of just looking shorter
+            traceback.print_exc()
+            registry.inc("ui.fetch_errors")
+            self.model.fetchFailed.emit(self.generation, f"{type(exc).__name__}: {exc}")
+            exhausted = True
+        finally:
+            release_thread_connections()
+        if not self._cancelled():
+            finished = time.perf_counter()
+            registry.observe("ui.fetch_batch_ms", (finished - self.queued_at) * 1000)
+            tracer.record("list.fetch", self.queued_at, finished - self.queued_at, cat="ui",
+                          rows=loaded, first=self.first, exhausted=exhausted)
+            self.model.batchLoaded.emit(self.generation, batch, exhausted, True)
+
+
+class ClipboardListModel(QAbstractListModel):
+    # list model streamed from an iterator of ClipboardItem rows
+
+    # the source runs on the thread pool; it may yield None for scanned rows
+    # that did not match. every reset bumps the generation so batches from a
+    # superseded source are dropped and its task stops at the next row
+    FETCH_BATCH = 50
+    FIRST_BATCH = 12
+
+    fetched = Signal()
+    batchLoaded = Signal(int, object, bool, bool)  # generation, items, exhausted, done
+    fetchFailed = Signal(int, str)  # generation, error
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items: list[ClipboardItem] = []
+        self._source: Iterator[ClipboardItem | None] | None = None
+        self._fetching = False
+        self.generation = 0
+        self.error: str | None = None  # why the current source stopped early
+        self.profile_name = "list.fetch"  # entry point name for profiling fetch batches
+        self.pool = QThreadPool.globalInstance()
+        self.batchLoaded.connect(self._on_batch_loaded)
+        self.fetchFailed.connect(self._on_fetch_failed)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._items):
+            return None
+        item = self._items[index.row()]
+        if role == ItemRole:
+            return item
+        if role == Qt.DisplayRole:
+            return item.title
+        if role == Qt.AccessibleTextRole:
+            return f"{item.title} {item.preview}"
+        return None
+
+    def reset(self, source: Iterator[ClipboardItem | None] | None):
+        self.generation += 1
+        self.error = None
+        self.beginResetModel()
+        self._items = []
+        self._source = source
+        self._fetching = False
+        self.endResetModel()
+        if self._source is None:
+            self.fetched.emit()
+        else:
+            self._start_fetch(self.FIRST_BATCH)
+
+    def set_items(self, items: list[ClipboardItem]):
+        # synchronous reset for lists that are already in memory
+        self.generation += 1
+        self.error = None
+        self.beginResetModel()
+        self._items = list(items)
+        self._source = None
+        self._fetching = False
+        self.endResetModel()
+        self.fetched.emit()
+
+    def is_loading(self) -> bool:
+        return self._fetching
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._source is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._source is None or self._fetching:
+            return
+        self._start_fetch(0)
+
+    def _start_fetch(self, first):
+        self._fetching = True
+        self.pool.start(_FetchTask(self, self.generation, self._source, self.FETCH_BATCH, first))
+
+    def _on_batch_loaded(self, generation, batch, exhausted, done):
+        if generation != self.generation:
+            return
+        if batch:
+            # rows moved into the loaded range by apply_change may also arrive here
+            present = {item.key for item in self._items}
+            batch = [item for item in batch if item.key not in present]
+        if batch:
+            first = len(self._items)
+            self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+            self._items.extend(batch)
+            self.endInsertRows()
+        if done:
+            self._fetching = False
+            if exhausted:
+                self._source = None
+            self.fetched.emit()
+
+    def _on_fetch_failed(self, generation, error):
+        if generation == self.generation:
+            self.error = error
+
+    def item_at(self, row: int) -> ClipboardItem | None:
+        return self._items[row] if 0 <= row < len(self._items) else None
+
+    def find(self, key: tuple[str, int]) -> int:
+        for row, item in enumerate(self._items):
+            if item.key == key:
+                return row
+        return -1
+
+    def remove(self, key: tuple[str, int]) -> bool:
+        row = self.find(key)
+        if row < 0:
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._items[row]
+        self.endRemoveRows()
+        return True
+
+    def update(self, item: ClipboardItem) -> bool:
+        # refresh a loaded row where it stands, for lists not in sort order
+        row = self.find(item.key)
+        if row < 0:
+            return False
+        self._items[row] = item
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+        return True
+
+    def place(self, item: ClipboardItem, sort_key: Callable[[ClipboardItem], tuple]) -> bool:
+        # move or insert a single item at its sorted position (rows are kept
+        # in descending sort_key order); returns False when the row now falls
+        # past the loaded tail and is left for fetchMore to pick up
+        row = self.find(item.key)
+        if row >= 0 and self._in_place(row, item, sort_key):
+            self._items[row] = item
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+            return True
+        if row >= 0:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._items[row]
+            self.endRemoveRows()
+        target = sort_key(item)
+        low, high = 0, len(self._items)
+        while low < high:
+            mid = (low + high) // 2
+            if sort_key(self._items[mid]) > target:
+                low = mid + 1
+            else:
+                high = mid
+        if low == len(self._items) and self.canFetchMore():
+            return False
+        self.beginInsertRows(QModelIndex(), low, low)
+        self._items.insert(low, item)
+        self.endInsertRows()
+        return True
+
+    def _in_place(self, row, item, sort_key) -> bool:
+        target = sort_key(item)
+        before = self._items[row - 1] if row > 0 else None
+        after = self._items[row + 1] if row + 1 < len(self._items) else None
+        return (before is None or sort_key(before) > target) and (after is None or sort_key(after) < target)
+
+    def items(self) -> list[ClipboardItem]:
+        return list(self._items)
+
+
+class ClipboardListView(QListView):
+    # virtualized card list; only visible rows are painted
+
+    actionTriggered = Signal(str, object)  # action, ClipboardItem
+    itemActivated = Signal(object)  # ClipboardItem
+
+    def __init__(self, actions_for: Callable[[ClipboardItem], tuple[str, ...]], parent=None):
+        super().__init__(parent)
+        self._placeholder = ""
+        self.actions_for = actions_for
+        self.list_model = ClipboardListModel(self)
+        self.card_delegate = ClipboardCardDelegate(ItemRole, actions_for, self)
+        self.setModel(self.list_model)
+        self.setItemDelegate(self.card_delegate)
+        self.setUniformItemSizes(True)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.verticalScrollBar().setSingleStep(24)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.setFrameShape(QFrame.NoFrame)
+        self.setMouseTracking(True)
+        self.setCursor(Qt.PointingHandCursor)
+        self.viewport().setAttribute(Qt.WA_Hover, True)
+        self.setStyleSheet("QListView { background: transparent; border: none; }")
+        self.activated.connect(self._on_activated)
+        self.list_model.fetched.connect(self.viewport().update)
+        thumbnails = ThumbnailCache.instance()
+        if thumbnails is not None:
+            thumbnails.ready.connect(self.viewport().update)
+
+        # one action bar follows the hovered row, falling back to the current one
+        self._hover_index = QPersistentModelIndex()
+        self.action_bar = CardActionBar(self.viewport())
+        self.action_bar.actionTriggered.connect(self.actionTriggered)
+        self.verticalScrollBar().valueChanged.connect(self._place_action_bar)
+        self.selectionModel().currentChanged.connect(self._place_action_bar)
+        for signal in (self.list_model.rowsInserted, self.list_model.rowsRemoved,
+                       self.list_model.dataChanged, self.list_model.modelReset):
+            signal.connect(self._place_action_bar)
+
+        # one clock per list repaints the visible timestamps when the
+        # youngest of them would next change ("5s ago" -> "6s ago")
+        self._clock = QTimer(self)
+        self._clock.setSingleShot(True)
+        self._clock.timeout.connect(self._on_clock)
+        self.verticalScrollBar().valueChanged.connect(self._schedule_clock)
+        self.list_model.rowsInserted.connect(self._schedule_clock)
+        self.list_model.modelReset.connect(self._schedule_clock)
+
+        for action, (_icon, _tooltip, shortcut) in CARD_ACTIONS.items():
+            key = QShortcut(QKeySequence(shortcut), self, context=Qt.WidgetWithChildrenShortcut)
+            key.activated.connect(lambda name=action: self._trigger_current(name))
+
+    def setPlaceholderText(self, text: str):
+        self._placeholder = text
+        self.viewport().update()
+
+    def set_source(self, source):
+        self.list_model.reset(source)
+
+    def set_items(self, items):
+        self.list_model.set_items(items)
+
+    def current_item(self) -> ClipboardItem | None:
+        return self.list_model.item_at(self.currentIndex().row())
+
+    def _on_activated(self, index):
+        item = self.list_model.item_at(index.row())
+        if item is not None:
+            self.itemActivated.emit(item)
+
+    def _trigger_current(self, action):
+        item = self.current_item()
+        if item is not None and action in self.actions_for(item):
+            self.actionTriggered.emit(action, item)
+
+    def _place_action_bar(self, *args):
+        # rows shift under a still cursor on scrolls and inserts
+        if self.viewport().underMouse():
+            self._hover_index = QPersistentModelIndex(self.indexAt(self.viewport().mapFromGlobal(QCursor.pos())))
+        index = QModelIndex(self._hover_index) if self._hover_index.isValid() else self.currentIndex()
+        item = self.list_model.item_at(index.row()) if index.isValid() else None
+        if item is None:
+            self.action_bar.clear()
+            return
+        actions = self.actions_for(item)
+        rect = self.card_delegate.action_bar_rect(self.visualRect(index), actions)
+        if not self.viewport().rect().intersects(rect):
+            self.action_bar.clear()
+            return
+        self.action_bar.show_for(item, actions, rect)
+
+    def mouseMoveEvent(self, event):
+        index = self.indexAt(event.position().toPoint())
+        if QPersistentModelIndex(index) != self._hover_index:
+            self._hover_index = QPersistentModelIndex(index)
+            self._place_action_bar()
+        super().mouseMoveEvent(event)
+
+    def leaveEvent(self, event):
+        # moving onto the bar itself keeps the hovered row
+        if not self.action_bar.underMouse():
+            self._hover_index = QPersistentModelIndex()
+            self._place_action_bar()
+        super().leaveEvent(event)
+
+    def visible_items(self) -> list[ClipboardItem]:
+        first = self.indexAt(QPoint(1, 1))
+        if not first.isValid():
+            return []
+        last = self.indexAt(QPoint(1, self.viewport().height() - 1))
+        last_row = last.row() if last.isValid() else self.list_model.rowCount() - 1
+        return [self.list_model.item_at(row) for row in range(first.row(), last_row + 1)]
+
+    def _schedule_clock(self, *args):
+        epochs = [item.epoch for item in self.visible_items() if item.epoch]
+        if not epochs or not self.isVisible() or not self.card_delegate.show_timestamp:
+            self._clock.stop()
+            return
+        age = max(0.0, time.time() - max(epochs))
+        unit = relative_time_granularity(age)
+        # re-check at least hourly so sleeps and clock changes settle
+        wait = min(unit - age % unit, 3600)
+        self._clock.start(int(wait * 1000) + 20)
+
+    def _on_clock(self):
+        self.viewport().update()
+        self._schedule_clock()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.viewport().update()
+        self._schedule_clock()
+
+    def hideEvent(self, event):
+        self._clock.stop()
+        super().hideEvent(event)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._place_action_bar()
+
+    def paintEvent(self, event):
+        self.card_delegate.now = time.time()
+        super().paintEvent(event)
+        error = self.list_model.error
+        placeholder = f"Could not load entries ({error})" if error else self._placeholder
+        if self.list_model.rowCount() == 0 and placeholder and not self.list_model.is_loading():
+            painter = QPainter(self.viewport())
+            painter.setPen(QColor('#6B7280'))
+            painter.drawText(self.viewport().rect().adjusted(24, 60, -24, 0),
+                             Qt.AlignHCenter | Qt.AlignTop | Qt.TextWordWrap, placeholder)
+            painter.end()
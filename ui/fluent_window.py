@@ -1,27 +1,44 @@
 from PySide6.QtWidgets import (QApplication, QSystemTrayIcon, QMenu, QLabel,
                                 QHBoxLayout, QWidget)
 from PySide6.QtGui import QIcon, QAction
-from PySide6.QtCore import QTimer, Qt, Signal
+from PySide6.QtCore import QEvent, QMimeData, QObject, QThreadPool, QTimer, QUrl, Qt, Signal
 from qfluentwidgets import (MSFluentWindow, NavigationItemPosition,
                              FluentIcon, setTheme, Theme, setThemeColor,
                              isDarkTheme)
 
 from ui.history_page import HistoryPage
-from ui.snippets_page import SnippetsPage
-from ui.pinned_page import PinnedPage
-from ui.tags_page import TagsPage
-from ui.settings_page import SettingsPage
+from ui.quick_paste import QuickPastePopup
+from ui.lazy_page import LazyPage
+from ui.clipboard_items import history_item, snippet_item
+from ui.thumbnails import ThumbnailCache
+from search import SearchIndex
+from capture_pipeline import CapturePipeline
+from clipboard_media import image_from_bytes, image_label
+from maintenance import MaintenanceScheduler, MaintenanceTask
+from metrics import registry
+from profiling import profiler
+from stall_watchdog import StallWatchdog
+from tracing import tracer
 from utils import get_app_font, get_system_theme
-from content_detection import is_code
-from encryption import content_fingerprint, encrypt_text, decrypt_text
+from content_detection import entity_rows
+from encryption import (LARGE_TEXT_CHARS, content_fingerprint, decrypt_bytes, decrypt_entry_text,
+                        encrypt_payload, encrypt_text, decrypt_text)
+from database import manage_history, release_thread_connections
 from hotkeys import GlobalHotkeyManager
-from plugins.plugin_manager import PluginManager
-from notifications.notification_manager import NotificationManager
 
 import os
 import sys
 import json
-import datetime
+import time
+
+
+class DatabaseEvents(QObject):
+    # re-emits DatabaseManager change callbacks as a Qt signal
+
+    changed = Signal(str, str, int)  # action, entry_type, entry_id
+
+    def publish(self, action, entry_type, entry_id):
+        self.changed.emit(action, entry_type, entry_id)
 
 
 class ClipboardManagerWindow(MSFluentWindow):
@@ -46,17 +63,36 @@ class ClipboardManagerWindow(MSFluentWindow):
 
         setThemeColor('#0078D4')
 
-        self.plugin_manager = PluginManager(app_dir)
-        self.notification_manager = NotificationManager(app_dir)
+        # plugin discovery and notification rules are off the startup path;
+        # they load on first use or once the window has shown
+        self._plugin_manager = None
+        self._notification_manager = None
 
         self._setup_tray_icon()
 
         # monitor clipboard changes
         self.clipboard = QApplication.clipboard()
-        initial_text = self.clipboard.text()
-        self.last_clipboard_fingerprint = (
-            content_fingerprint(initial_text, self.fingerprint_key) if initial_text else None
+        self.thumbnails = ThumbnailCache(self.db_manager, self.fernet, self)
+        ThumbnailCache.install(self.thumbnails)
+        self.capture = CapturePipeline(
+            self.db_manager, self.fernet, self.fingerprint_key,
+            snapshot=self._snapshot_clipboard,
+            coalesce_ms=self._coalesce_ms(),
+            transform=self._run_plugins,
+            parent=self,
         )
+        self.capture.captured.connect(self._on_captured)
+        self.capture.failed.connect(self._on_capture_failed)
+        self._capture_failure_shown = None
+        # starts with the event loop; until then the loop is not expected to turn
+        self.watchdog = StallWatchdog(log_path=os.path.join(self.app_dir, "stalls.log"), parent=self)
+        QTimer.singleShot(0, self.watchdog.start)
+        registry.gauge("capture.pending", self.capture.pending)
+        registry.add_collector("db", self.db_manager.storage_stats)
+        initial_text = self.clipboard.text()
+        if initial_text:
+            self.capture.expect(initial_text)
+        self.capture.start()
         self.clipboard.dataChanged.connect(self._on_clipboard_change)
 
         self.sync_timer = QTimer()
@@ -69,11 +105,19 @@ class ClipboardManagerWindow(MSFluentWindow):
         self._create_pages()
         self._setup_navigation()
 
+        # queued so a capture finishes indexing before the pages react to it
+        self.db_events = DatabaseEvents(self)
+        self.db_events.changed.connect(self._on_db_changed, Qt.QueuedConnection)
+        self.db_manager.subscribe(self.db_events.publish)
+
         self.setWindowTitle("Clipboard Manager")
         self._set_initial_size()
 
         self._refresh_all_pages()
+        self._rebuild_search_index()
         self._setup_global_shortcut()
+        self._setup_maintenance()
+        QTimer.singleShot(0, self._warm_up)
 
     def _set_initial_size(self):
         screen = QApplication.primaryScreen()
@@ -103,21 +147,179 @@ class ClipboardManagerWindow(MSFluentWindow):
                 setTheme(Theme.LIGHT)
 
     def _create_pages(self):
-        self.history_page = HistoryPage(self.db_manager, self.fernet, self)
-        self.snippets_page = SnippetsPage(self.db_manager, self.fernet, self)
-        self.pinned_page = PinnedPage(self.db_manager, self.fernet, self)
-        self.tags_page = TagsPage(self.db_manager, self.fernet, self)
-        self.settings_page = SettingsPage(
+        # only history is built up front; the other pages are stack
+        # placeholders that build their page on first navigation
+        self.search_index = SearchIndex()
+        registry.gauge("search.index_items", lambda: len(self.search_index))
+        self._index_generation = 0
+        self.history_page = HistoryPage(self.db_manager, self.fernet, self, search_index=self.search_index)
+        self.snippets_page = LazyPage("snippetsPage", self._build_snippets_page, self)
+        self.pinned_page = LazyPage("pinnedPage", self._build_pinned_page, self)
+        self.tags_page = LazyPage("tagsPage", self._build_tags_page, self)
+        self.settings_page = LazyPage("settingsPage", self._build_settings_page, self)
+        self.settings_page.built.connect(self._connect_settings_page)
+        self.quick_paste = QuickPastePopup(self.db_manager, self.fernet, self.search_index, self.copy_entry, self)
+        self.quick_paste.openRequested.connect(lambda: self._show_page(self.history_page))
+
+    # page modules are imported with their page, not with the window
+
+    def _build_snippets_page(self, parent):
+        from ui.snippets_page import SnippetsPage
+        return SnippetsPage(self.db_manager, self.fernet, parent, search_index=self.search_index)
+
+    def _build_pinned_page(self, parent):
+        from ui.pinned_page import PinnedPage
+        return PinnedPage(self.db_manager, self.fernet, parent, search_index=self.search_index)
+
+    def _build_tags_page(self, parent):
+        from ui.tags_page import TagsPage
+        return TagsPage(self.db_manager, self.fernet, parent)
+
+    def _build_settings_page(self, parent):
+        from ui.settings_page import SettingsPage
+        return SettingsPage(
             self.settings, self.app_dir, self.plugin_manager,
             settings_encryption_key=self.settings_encryption_key,
-            parent=self,
+            maintenance=self.maintenance,
+            capture=self.capture,
+            notifications=self.notification_manager,
+            watchdog=self.watchdog,
+            parent=parent,
         )
 
-        self.settings_page.settingsChanged.connect(self._on_settings_changed)
-        self.settings_page.themeChanged.connect(self._on_theme_changed)
-        self.settings_page.syncRequested.connect(self._sync_with_gdrive)
-        self.settings_page.resetRequested.connect(self._reset_all_history)
-        self.settings_page.factoryResetRequested.connect(self._factory_reset)
+    @property
+    def plugin_manager(self):
+        if self._plugin_manager is None:
+            from plugins.plugin_manager import PluginManager
+            self._plugin_manager = PluginManager(self.app_dir, self._plugin_budget_ms())
+            self._plugin_manager.plugin_disabled.connect(self._on_plugin_disabled)
+        return self._plugin_manager
+
+    def _plugin_budget_ms(self):
+        try:
+            return max(1, int(self.settings.get("plugin_budget_ms", "50")))
+        except (TypeError, ValueError):
+            return 50
+
+    def _run_plugins(self, plugins, text):
+        # capture worker; plugins came from the snapshot, so the manager exists
+        return self._plugin_manager.run_clipboard_hooks(text, plugins)
+
+    def _on_plugin_disabled(self, name, reason):
+        self.tray_icon.showMessage(
+            "Clipboard Manager",
+            f"Plugin {name} was disabled: it {reason}. Re-enable it in Plugin Settings.",
+            QSystemTrayIcon.Warning,
+            5000,
+        )
+
+    @property
+    def notification_manager(self):
+        if self._notification_manager is None:
+            from notifications.notification_manager import NotificationManager
+            self._notification_manager = NotificationManager(self.app_dir)
+            self._notification_manager.set_tray_icon(self.tray_icon)
+        return self._notification_manager
+
+    def _warm_up(self):
+        # load what the first clipboard change needs before it arrives
+        self.plugin_manager
+        self.notification_manager
+
+    # Maintenance ---------------------------------------------------------
+
+    MAINTENANCE_IDLE_TICK = 1000  # ms between idle checks
+    MAINTENANCE_BUSY_TICK = 50  # ms between slices while work is due
+    MAINTENANCE_BATCH = 25  # rows per step
+    LARGE_TEXT_BATCH = 2  # each of these rows is at least LARGE_TEXT_CHARS to decrypt
+
+    def _setup_maintenance(self):
+        # startup backfills and periodic housekeeping, run in slices when idle
+        self.maintenance = MaintenanceScheduler(self.db_manager)
+        for task in (
+            MaintenanceTask("content hashes", self._reconcile_hashes_step, priority=10),
+            MaintenanceTask("entity index", self._index_entities_step, priority=20),
+            MaintenanceTask("large text", self._large_text_step, priority=25),
+            MaintenanceTask("retention", self._retention_step, priority=30, interval=3600),
+            MaintenanceTask("blob cleanup", self._blob_cleanup_step, priority=40, interval=3600),
+            MaintenanceTask("checkpoint", self._checkpoint_step, priority=80, interval=600),
+            MaintenanceTask("optimize", self._optimize_step, priority=90, interval=86400),
+        ):
+            self.maintenance.register(task)
+        # any key, click or scroll in the app postpones the next slice
+        QApplication.instance().installEventFilter(self)
+        self.maintenance_timer = QTimer(self)
+        self.maintenance_timer.timeout.connect(self._run_maintenance)
+        self.maintenance_timer.start(self.MAINTENANCE_IDLE_TICK)
+
+    def _run_maintenance(self):
+        more = self.maintenance.run_slice(hidden=not self.isVisible())
+        self.maintenance_timer.setInterval(self.MAINTENANCE_BUSY_TICK if more else self.MAINTENANCE_IDLE_TICK)
+
+    def _stop_maintenance(self):
+        if hasattr(self, "maintenance_timer"):
+            self.maintenance_timer.stop()
+            QApplication.instance().removeEventFilter(self)
+            self.maintenance.save()
+
+    def eventFilter(self, obj, event):
+        if event.type() in (QEvent.KeyPress, QEvent.MouseButtonPress, QEvent.Wheel):
+            self.maintenance.note_activity()
+        return super().eventFilter(obj, event)
+
+    def _reconcile_hashes_step(self, state):
+        cursor = self.db_manager.reconcile_content_hash_batch(
+            lambda token: decrypt_text(token, self.fernet),
+            lambda text: content_fingerprint(text, self.fingerprint_key),
+            state.get("before_id"), self.MAINTENANCE_BATCH,
+        )
+        state["before_id"] = cursor
+        return cursor is None
+
+    def _index_entities_step(self, state):
+        indexed = self.db_manager.index_entities(
+            lambda token: decrypt_text(token, self.fernet),
+            lambda text: entity_rows(
+                text,
+                lambda value: encrypt_text(value, self.fernet),
+                lambda value: content_fingerprint(value, self.fingerprint_key),
+            ),
+            self.MAINTENANCE_BATCH,
+        )
+        return indexed < self.MAINTENANCE_BATCH
+
+    def _large_text_step(self, state):
+        # history stored before out-of-row text existed; a fernet token is
+        # longer than its text, so this only skips rows that are surely small
+        rows = self.db_manager.get_inline_entries_over(LARGE_TEXT_CHARS, state.get("before_id"), self.LARGE_TEXT_BATCH)
+        for entry_id, token in rows:
+            preview, chunks = encrypt_payload(decrypt_text(token, self.fernet), self.fernet)
+            if chunks:
+                self.db_manager.move_text_out_of_row(entry_id, preview, chunks)
+        state["before_id"] = rows[-1][0] if rows else None
+        return len(rows) < self.LARGE_TEXT_BATCH
+
+    def _retention_step(self, state):
+        return manage_history(self.db_manager, self.settings, self.app_dir, self.MAINTENANCE_BATCH) < self.MAINTENANCE_BATCH
+
+    def _blob_cleanup_step(self, state):
+        # images and html no longer referenced once their rows are deleted
+        return self.db_manager.delete_orphan_blobs(self.MAINTENANCE_BATCH) < self.MAINTENANCE_BATCH
+
+    def _checkpoint_step(self, state):
+        self.db_manager.checkpoint()
+        return True
+
+    def _optimize_step(self, state):
+        self.db_manager.optimize()
+        return True
+
+    def _connect_settings_page(self, page):
+        page.settingsChanged.connect(self._on_settings_changed)
+        page.themeChanged.connect(self._on_theme_changed)
+        page.syncRequested.connect(self._sync_with_gdrive)
+        page.resetRequested.connect(self._reset_all_history)
+        page.factoryResetRequested.connect(self._factory_reset)
 
     def _setup_navigation(self):
         self.addSubInterface(
@@ -153,15 +355,70 @@ class ClipboardManagerWindow(MSFluentWindow):
 
         self.stackedWidget.currentChanged.connect(self._on_page_changed)
 
+    def _list_pages(self):
+        return (self.history_page, self.snippets_page, self.pinned_page, self.tags_page)
+
     def _on_page_changed(self, index):
         current = self.stackedWidget.currentWidget()
-        if hasattr(current, 'load_entries'):
-            QTimer.singleShot(0, current.load_entries)
+        if hasattr(current, 'ensure_loaded'):
+            QTimer.singleShot(0, current.ensure_loaded)
+
+    def _rebuild_search_index(self):
+        # pages fall back to plain scans until the background load finishes
+        self._index_generation += 1
+        self.search_index.clear()
+        QThreadPool.globalInstance().start(lambda generation=self._index_generation: self._load_search_index(generation))
+
+    def _load_search_index(self, generation):
+        # runs on the thread pool; rows written meanwhile are indexed by _update_search_index
+        try:
+            uses = self.db_manager.get_use_counts()
+            for row in self.db_manager.get_all_entries():
+                if generation != self._index_generation:
+                    return
+                item = history_item(row, decrypt_text(row[1], self.fernet))
+                self.search_index.add(item, uses.get(row[0], 0), only_if_absent=True)
+            for row in self.db_manager.get_all_snippets():
+                if generation != self._index_generation:
+                    return
+                self.search_index.add(snippet_item(row, decrypt_text(row[2], self.fernet)), only_if_absent=True)
+            if generation == self._index_generation:
+                self.search_index.mark_ready()
+        finally:
+            release_thread_connections()
+
+    def _update_search_index(self, action, entry_type, entry_id):
+        if action == "reset":
+            self._rebuild_search_index()
+            return
+        key = (entry_type, entry_id)
+        if entry_type == "history" and action != "deleted":
+            row = self.db_manager.get_history_entry(entry_id)
+            if row is not None:
+                self.search_index.add(history_item(row, decrypt_text(row[1], self.fernet)),
+                                      self.db_manager.get_use_count(entry_id))
+                return
+        elif entry_type == "snippet" and action != "deleted":
+            row = self.db_manager.get_snippet_by_id(entry_id)
+            if row is not None:
+                self.search_index.add(snippet_item(row, decrypt_text(row[2], self.fernet)))
+                return
+        self.search_index.remove(key)
+
+    def _on_db_changed(self, action, entry_type, entry_id):
+        with tracer.span("ui.refresh", cat="ui", action=action, entry_type=entry_type, entry_id=entry_id):
+            if entry_type in ("history", "snippet") and action != "tagged":
+                self._update_search_index(action, entry_type, entry_id)
+            for page in self._list_pages():
+                page.apply_change(action, entry_type, entry_id)
+            self.quick_paste.apply_change(action, entry_type, entry_id)
 
     def _refresh_all_pages(self):
         current = self.stackedWidget.currentWidget()
-        if hasattr(current, "load_entries"):
-            current.load_entries()
+        for page in self._list_pages():
+            page.invalidate()
+        if hasattr(current, "ensure_loaded"):
+            current.ensure_loaded()
 
     def _setup_tray_icon(self):
         self.tray_icon = QSystemTrayIcon(self)
@@ -181,7 +438,6 @@ class ClipboardManagerWindow(MSFluentWindow):
 
         self.tray_icon.setIcon(icon)
         self.setWindowIcon(icon)
-        self.notification_manager.set_tray_icon(self.tray_icon)
 
         tray_menu = QMenu()
 
@@ -222,7 +478,7 @@ class ClipboardManagerWindow(MSFluentWindow):
     def _setup_global_shortcut(self):
         if not hasattr(self, "hotkey_manager"):
             self.hotkey_manager = GlobalHotkeyManager(self)
-            self.hotkey_manager.activated.connect(self.showRequested.emit)
+            self.hotkey_manager.activated.connect(self._on_hotkey)
         shortcut = self.settings.get("global_shortcut", "ctrl+alt+v")
         success, error = self.hotkey_manager.bind(shortcut)
         if not success:
@@ -234,6 +490,9 @@ class ClipboardManagerWindow(MSFluentWindow):
             )
         return success
 
+    def _on_hotkey(self):
+        self.quick_paste.popup(self.hotkey_manager.activated_at)
+
     def _restore_from_tray(self):
         self.showNormal()
         self.setWindowState((self.windowState() & ~Qt.WindowMinimized) | Qt.WindowActive)
@@ -249,57 +508,124 @@ class ClipboardManagerWindow(MSFluentWindow):
         if reason == QSystemTrayIcon.DoubleClick:
             self._restore_from_tray()
 
+    @profiler.profiled("clipboard_change")
+    @tracer.traced("clipboard changed", cat="capture")
     def _on_clipboard_change(self, *args):
-        text = self.clipboard.text()
-        if text:
-            incoming_fingerprint = content_fingerprint(text, self.fingerprint_key)
-            if incoming_fingerprint == self.last_clipboard_fingerprint:
-                return
-            self.last_clipboard_fingerprint = incoming_fingerprint
-
-            transformed_text = text
-            for plugin in self.plugin_manager.get_enabled_plugins():
-                if plugin.instance and hasattr(plugin.instance, 'on_clipboard_change'):
-                    try:
-                        result = plugin.instance.on_clipboard_change(transformed_text)
-                        if isinstance(result, str) and result:
-                            transformed_text = result
-                    except Exception:
-                        pass
-
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            code_flag = is_code(transformed_text)
-            encrypted_text = encrypt_text(transformed_text, self.fernet)
-            final_fingerprint = content_fingerprint(transformed_text, self.fingerprint_key)
-            self.db_manager.store_entry(
-                encrypted_text, timestamp, code_flag, final_fingerprint
-            )
-            self.last_clipboard_fingerprint = final_fingerprint
+        # bursts are collapsed by the pipeline before anything is read
+        self.maintenance.note_activity()
+        self.capture.changed()
+
+    @tracer.traced("snapshot", cat="capture")
+    def _snapshot_clipboard(self):
+        # fingerprinting, plugins, encryption and the database write run
+        # on the capture worker; only the snapshot happens here
+        mime = self.clipboard.mimeData()
+        if mime is None:
+            return None
+        plugins, match = self.plugin_manager.get_enabled_plugins(), self.notification_manager.match
+        if mime.hasUrls():
+            paths = [url.toLocalFile() for url in mime.urls() if url.isLocalFile()]
+            if paths:
+                return "\n".join(paths), plugins, match, "files", None
+        if mime.hasImage() and not mime.hasText():
+            image = self.clipboard.image()
+            if not image.isNull():
+                return image_label(image), plugins, match, "image", image
+        text = mime.text()
+        if not text:
+            return None
+        if mime.hasHtml():
+            return text, plugins, match, "html", mime.html()
+        return text, plugins, match
+
+    def _coalesce_ms(self):
+        try:
+            return max(0, int(self.settings.get("capture_coalesce_ms", "100")))
+        except (TypeError, ValueError):
+            return 100
 
-            if self.stackedWidget.currentWidget() == self.history_page:
-                QTimer.singleShot(0, self.history_page.load_entries)
+    CAPTURE_FAILURE_QUIET_S = 60
 
-            self.notification_manager.check_text(transformed_text)
+    def _on_capture_failed(self, error):
+        # one warning per burst; the rest only count under Diagnostics
+        now = time.monotonic()
+        if self._capture_failure_shown is not None and now - self._capture_failure_shown < self.CAPTURE_FAILURE_QUIET_S:
+            return
+        self._capture_failure_shown = now
+        self.tray_icon.showMessage(
+            "Clipboard Manager",
+            f"A clipboard capture could not be saved ({error}).",
+            QSystemTrayIcon.Warning,
+            5000,
+        )
 
-            if transformed_text != text:
-                self.copy_text(transformed_text)
+    @tracer.traced("captured", cat="capture")
+    def _on_captured(self, result):
+        if result.rule is not None:
+            self.notification_manager.notify(result.rule, result.stored_text)
+        if result.stored_text != result.text:
+            self.copy_text(result.stored_text)
+
+    def index_entities(self, entry_id, text):
+        self.db_manager.set_entities(
+            entry_id,
+            entity_rows(
+                text,
+                lambda value: encrypt_text(value, self.fernet),
+                lambda value: content_fingerprint(value, self.fingerprint_key),
+            ),
+        )
 
     def copy_text(self, text):
-        self.last_clipboard_fingerprint = content_fingerprint(text, self.fingerprint_key)
+        self.capture.expect(text)
         self.clipboard.setText(text)
 
+    def copy_entry(self, entry_id):
+        # puts a stored entry back in its original formats; False when gone
+        row = self.db_manager.get_entry_by_id(entry_id)
+        if not row:
+            return False
+        text, kind, blob_hash = decrypt_entry_text(self.db_manager, entry_id, row[0], self.fernet), row[3], row[4]
+        payload = None
+        if blob_hash:
+            blob = self.db_manager.get_blob(blob_hash)
+            try:
+                payload = decrypt_bytes(blob[1], self.fernet) if blob else None
+            except Exception:
+                payload = None
+        mime = QMimeData()
+        if kind == "files":
+            mime.setUrls([QUrl.fromLocalFile(path) for path in text.splitlines() if path])
+            mime.setText(text)
+            self.capture.expect_fingerprint(self.capture.fingerprint("files", text))
+        elif kind == "image" and payload is not None:
+            mime.setImageData(image_from_bytes(payload))
+            self.capture.expect_fingerprint(blob_hash)
+        elif kind == "html" and payload is not None:
+            mime.setHtml(payload.decode("utf-8", errors="replace"))
+            mime.setText(text)
+            self.capture.expect_fingerprint(blob_hash)
+        else:
+            self.copy_text(text)
+            return True
+        self.clipboard.setMimeData(mime)
+        return True
+
     def _setup_sync_timer(self):
         if self.settings.get('gdrive_enabled', False):
             self.sync_timer.start(5 * 60 * 1000)
         else:
             self.sync_timer.stop()
 
+    @profiler.profiled("sync.download")
+    @tracer.traced("sync.download", cat="sync")
     def _sync_from_gdrive(self):
         if not self.settings.get('gdrive_enabled', False):
             return
         token_path = self.settings.get('gdrive_token', "")
         if not token_path:
             return
+        started = time.perf_counter()
         try:
             from gdrive_sync import authenticate_gdrive, get_or_create_app_folder, download_file
             service = authenticate_gdrive(token_path)
@@ -320,13 +646,16 @@ class ClipboardManagerWindow(MSFluentWindow):
                         entry['is_code'],
                         content_fingerprint(plain, self.fingerprint_key),
                     )
+                    self.index_entities(entry_id, plain)
                     self.db_manager.update_pin_state(entry_id, entry.get('pinned', 0))
                     self.db_manager.update_favorite_state(entry_id, entry.get('favorite', 0))
                 os.remove(temp_file)
-                self._refresh_all_pages()
+            registry.observe("sync.download_ms", (time.perf_counter() - started) * 1000)
         except Exception:
-            pass
+            registry.inc("sync.failures")
 
+    @profiler.profiled("sync")
+    @tracer.traced("sync", cat="sync")
     def _sync_with_gdrive(self):
         if not self.settings.get('gdrive_enabled', False):
             from qfluentwidgets import InfoBar
@@ -339,26 +668,37 @@ class ClipboardManagerWindow(MSFluentWindow):
             return
         try:
             self._sync_from_gdrive()
+            started = time.perf_counter()
             from gdrive_sync import authenticate_gdrive, get_or_create_app_folder, upload_file
-            entries = self.db_manager.get_all_entries()
-            sync_data = []
-            for entry in entries:
-                eid, enc_text, timestamp, is_code_flag, pinned, favorite = entry
-                sync_data.append({
-                    'text': enc_text.decode() if isinstance(enc_text, bytes) else enc_text,
-                    'timestamp': timestamp, 'is_code': is_code_flag,
-                    'pinned': pinned, 'favorite': favorite
-                })
-            temp_file = os.path.join(self.app_dir, 'temp_sync.json')
-            with open(temp_file, 'w') as f:
-                json.dump(sync_data, f)
-            service = authenticate_gdrive(token_path)
-            folder_id = get_or_create_app_folder(service)
-            upload_file(temp_file, service, folder_id)
+            with tracer.span("sync.export", cat="sync") as span:
+                entries = self.db_manager.get_all_entries()
+                chunked = self.db_manager.get_chunked_entry_ids()
+                sync_data = []
+                for entry in entries:
+                    eid, enc_text, timestamp, is_code_flag, pinned, favorite = entry[:6]
+                    if eid in chunked:
+                        # the export is one token per entry, so large text is joined back up
+                        enc_text = encrypt_text(decrypt_entry_text(self.db_manager, eid, enc_text, self.fernet), self.fernet)
+                    sync_data.append({
+                        'text': enc_text.decode() if isinstance(enc_text, bytes) else enc_text,
+                        'timestamp': timestamp, 'is_code': is_code_flag,
+                        'pinned': pinned, 'favorite': favorite
+                    })
+                temp_file = os.path.join(self.app_dir, 'temp_sync.json')
+                with open(temp_file, 'w') as f:
+                    json.dump(sync_data, f)
+                span.set(entries=len(sync_data), large=len(chunked))
+            with tracer.span("sync.upload", cat="sync"):
+                service = authenticate_gdrive(token_path)
+                folder_id = get_or_create_app_folder(service)
+                upload_file(temp_file, service, folder_id)
             os.remove(temp_file)
+            registry.observe("sync.upload_ms", (time.perf_counter() - started) * 1000)
+            registry.inc("sync.entries", len(sync_data))
             from qfluentwidgets import InfoBar
             InfoBar.success("Sync", "Synced with Google Drive!", parent=self)
         except Exception as e:
+            registry.inc("sync.failures")
             from qfluentwidgets import InfoBar
             InfoBar.error("Sync", f"Sync failed: {e}", parent=self)
 
@@ -368,11 +708,18 @@ class ClipboardManagerWindow(MSFluentWindow):
 
     def _reset_all_history(self):
         self.db_manager.clear_history()
-        self._refresh_all_pages()
 
     def _factory_reset(self):
         if hasattr(self, "hotkey_manager"):
             self.hotkey_manager.close()
+        self._stop_maintenance()
+        self.watchdog.stop()
+        self.capture.close()
+        if self._notification_manager is not None:
+            self._notification_manager.flush()
+        self.db_manager.unsubscribe(self.db_events.publish)
+        registry.remove_collector("db")
+        self._index_generation += 1
         self.db_manager.close()
         import shutil
         for item in os.listdir(self.app_dir):
@@ -391,8 +738,14 @@ class ClipboardManagerWindow(MSFluentWindow):
 
     def _on_settings_changed(self, new_settings):
         self.settings = new_settings
+        self.maintenance.request("retention")
+        self.capture.set_coalesce_window(self._coalesce_ms())
+        if self._plugin_manager is not None:
+            self._plugin_manager.set_budget(self._plugin_budget_ms())
         self._setup_sync_timer()
         self._setup_global_shortcut()
+        tracer.set_enabled(self.settings.get("trace_enabled", False))
+        profiler.set_mode(self.settings.get("profile_mode", "off"))
         self.app_font = get_app_font(10, self.settings)
         QApplication.instance().setFont(self.app_font)
         self._refresh_all_pages()
@@ -411,6 +764,14 @@ class ClipboardManagerWindow(MSFluentWindow):
         self._allow_exit = True
         if hasattr(self, "hotkey_manager"):
             self.hotkey_manager.close()
+        self._stop_maintenance()
+        self.watchdog.stop()
+        self.capture.close()
+        if self._notification_manager is not None:
+            self._notification_manager.flush()
+        self.db_manager.unsubscribe(self.db_events.publish)
+        registry.remove_collector("db")
+        self._index_generation += 1
         self.db_manager.close()
         self.tray_icon.hide()
         self.close()
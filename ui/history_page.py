@@ -1,28 +1,42 @@
-from PySide6.QtWidgets import (QFrame, QVBoxLayout, QHBoxLayout, QWidget,
-                                QScrollArea, QLabel, QApplication, QSizePolicy)
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtWidgets import QFrame, QVBoxLayout, QHBoxLayout, QLabel, QApplication
+from PySide6.QtCore import QTimer
 from qfluentwidgets import SearchLineEdit, SegmentedWidget, InfoBar
 
-from ui.clipboard_card import ClipboardCard, EditDialog
-from encryption import decrypt_text, encrypt_text
-from content_detection import detect_language, detect_content_type, is_code
+from ui.clipboard_card import EditDialog
+from ui.clipboard_items import extract_title, history_item
+from ui.clipboard_list import ClipboardListView
+from encryption import decrypt_entry_text, decrypt_text, encrypt_payload, encrypt_text, searchable_text
+from content_detection import detect_language, is_code
 from encryption import content_fingerprint
+from metrics import registry
+from search import SearchSession
+from profiling import profiler
+from tracing import tracer
 import re
 
 
 class HistoryPage(QFrame):
     # main clipboard history tab
 
-    MAX_SCAN_ITEMS = 2000
-    MAX_RENDERED_ITEMS = 250
+    PAGE_SIZE = 200
+    SEARCH_LIMIT = 200
+    ENTITY_FILTERS = {"Links": "url", "Emails": "email"}
 
-    def __init__(self, db_manager, fernet, parent=None):
+    def __init__(self, db_manager, fernet, parent=None, search_index=None):
         super().__init__(parent)
         self.db_manager = db_manager
         self.fernet = fernet
+        self.search_index = search_index
         self.setObjectName("historyPage")
-        self._selected_card_id = None
         self._current_filter = "All Items"
+        self._filters = (None, None, None, "")
+        self._search_session = None
+        self._ranked = False
+        self._entity_ids = set()
+        self._loaded = False
+        self._stale = False
+        self._total_entries = 0
+        self._filtered = False
         self._setup_ui()
         self.search_timer = QTimer(self)
         self.search_timer.setSingleShot(True)
@@ -67,6 +81,7 @@ class HistoryPage(QFrame):
         self.filter_segment.addItem("code", "Code")
         self.filter_segment.addItem("text", "Text")
         self.filter_segment.addItem("links", "Links")
+        self.filter_segment.addItem("emails", "Emails")
         self.filter_segment.addItem("favorites", "★ Favorites")
         self.filter_segment.setCurrentItem("all")
         self.filter_segment.currentItemChanged.connect(self._on_filter_changed)
@@ -75,32 +90,19 @@ class HistoryPage(QFrame):
 
         layout.addLayout(filter_layout)
 
-        # Scrollable card list
-        self.scroll_area = QScrollArea(self)
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.scroll_area.setFrameShape(QFrame.NoFrame)
-
-        self.card_container = QWidget()
-        self.card_layout = QVBoxLayout(self.card_container)
-        self.card_layout.setContentsMargins(0, 0, 0, 0)
-        self.card_layout.setSpacing(8)
-
-        self.empty_label = QLabel("Your clipboard history will appear here", self.card_container)
-        self.empty_label.setAlignment(Qt.AlignCenter)
-        self.empty_label.setStyleSheet("color: #6B7280; padding: 60px 24px;")
-        self.empty_label.setVisible(False)
-        self.card_layout.addWidget(self.empty_label)
-
-        self.card_layout.addStretch()
-
-        self.scroll_area.setWidget(self.card_container)
-        layout.addWidget(self.scroll_area, 1)
+        # Virtualized card list
+        self.list_view = ClipboardListView(self._actions_for, self)
+        self.list_view.list_model.profile_name = "history.fetch"
+        self.list_view.setPlaceholderText("Your clipboard history will appear here")
+        self.list_view.actionTriggered.connect(self._on_action)
+        self.list_view.itemActivated.connect(lambda item: self._on_copy(item.entry_id))
+        self.list_view.list_model.fetched.connect(self._update_count_label)
+        layout.addWidget(self.list_view, 1)
 
     def _on_filter_changed(self, key):
         filter_map = {
             "all": "All Items", "code": "Code", "text": "Text",
-            "links": "Links", "favorites": "Favorites"
+            "links": "Links", "emails": "Emails", "favorites": "Favorites"
         }
         self._current_filter = filter_map.get(key, "All Items")
         QTimer.singleShot(0, self.load_entries)
@@ -108,22 +110,34 @@ class HistoryPage(QFrame):
     def _on_search(self, text):
         self.search_timer.start()
 
+    def _actions_for(self, item):
+        if item.kind == "image":
+            return ("copy", "pin", "favorite", "tag", "delete")
+        if item.is_code:
+            return ("copy", "pin", "favorite", "edit", "snippet", "tag", "delete")
+        return ("copy", "pin", "favorite", "edit", "tag", "delete")
+
+    def _on_action(self, action, item):
+        handlers = {
+            "copy": self._on_copy,
+            "pin": self._on_pin,
+            "favorite": self._on_star,
+            "edit": self._on_edit,
+            "snippet": self._on_save_snippet,
+            "tag": self._on_tag,
+            "delete": self._on_delete,
+        }
+        handlers[action](item.entry_id)
+
+    @profiler.profiled("history.load_entries")
+    @tracer.traced("history.load_entries", cat="ui")
     def load_entries(self):
-        # Reload entries from DB and rebuild cards
-        for i in reversed(range(self.card_layout.count())):
-            item = self.card_layout.itemAt(i)
-            if item and item.widget() and isinstance(item.widget(), ClipboardCard):
-                w = item.widget()
-                self.card_layout.removeWidget(w)
-                w.deleteLater()
-
-        total_entries = self.db_manager.count_history()
-        entries = self.db_manager.get_all_entries(limit=self.MAX_SCAN_ITEMS)
+        # Reset the list onto a lazily scanned query
         search_term = self.search_bar.text().strip().lower()
-        rendered = 0
 
         date_filter = None
         type_filter = None
+        entity_filter = self.ENTITY_FILTERS.get(self._current_filter)
         clean_search = search_term
 
         date_match = re.search(r"date:\s*(\d{4}-\d{2}-\d{2})", search_term, re.IGNORECASE)
@@ -136,133 +150,209 @@ class HistoryPage(QFrame):
             type_filter = type_match.group(1).lower()
             clean_search = re.sub(r"type:\s*(code|text)", "", clean_search, flags=re.IGNORECASE)
 
-        clean_search = clean_search.strip()
-
-        for entry in entries:
-            entry_id, enc_text, timestamp, is_code, pinned, favorite = entry
-
-            if self._current_filter == "Favorites" and not favorite:
-                continue
-
-            if date_filter and not timestamp.startswith(date_filter):
-                continue
-
-            if type_filter:
-                if type_filter == "code" and not is_code:
-                    continue
-                elif type_filter == "text" and is_code:
-                    continue
-
-            decrypted_text = decrypt_text(enc_text, self.fernet)
-
-            content_type = detect_content_type(decrypted_text)
-            language = detect_language(decrypted_text) if is_code else "Text"
+        has_match = re.search(r"has:\s*(\w+)", clean_search, re.IGNORECASE)
+        if has_match:
+            kind = has_match.group(1).lower()
+            kind = "url" if kind == "link" else kind
+            # no row has an entity of an unknown kind, so a typo shows
+            # nothing rather than every entry
+            entity_filter = kind
+            clean_search = clean_search[:has_match.start()] + clean_search[has_match.end():]
 
-            if self._current_filter == "Code" and content_type != "code":
-                continue
-            elif self._current_filter == "Text" and content_type != "text":
-                continue
-            elif self._current_filter == "Links" and content_type != "link":
-                continue
-
-            if clean_search and clean_search not in decrypted_text.lower():
+        clean_search = clean_search.strip()
+        self._filters = (entity_filter, date_filter, type_filter, clean_search)
+        # ranked results come from the fuzzy index once it has loaded
+        self._ranked = bool(clean_search) and self.search_index is not None and self.search_index.ready
+        self._entity_ids = set()
+        if self._ranked and entity_filter:
+            self._entity_ids = self.db_manager.get_history_ids_with_entity(entity_filter)
+        if clean_search:
+            # extending the last query only re-checks its matches
+            scope = (entity_filter, date_filter, type_filter, self._current_filter)
+            self._search_session = SearchSession(scope, clean_search, self._search_session)
+            registry.inc("search.sessions.hits" if self._search_session.narrowed else "search.sessions.misses")
+        else:
+            self._search_session = None
+
+        # entity views come straight from the index instead of re-detecting every row
+        self._total_entries = self._count_total()
+        self._filtered = bool(search_term) or self._current_filter != "All Items"
+        self._loaded = True
+        self._stale = False
+
+        self.list_view.card_delegate.show_timestamp = getattr(self.window(), 'settings', {}).get('show_timestamps', True)
+        self.list_view.set_source(self._iter_items())
+
+    def ensure_loaded(self):
+        if not self._loaded or self._stale:
+            self.load_entries()
+
+    def invalidate(self):
+        self._stale = True
+
+    def _count_total(self):
+        entity_filter = self._filters[0]
+        if entity_filter:
+            return self.db_manager.count_history_with_entity(entity_filter)
+        return self.db_manager.count_history()
+
+    def _iter_items(self):
+        shown = set()
+        if self._ranked:
+            for _score, item in self.search_index.search(self._filters[3], self.SEARCH_LIMIT, ("history",),
+                                                         accept=self._accepts):
+                shown.add(item.entry_id)
+                yield item
+            # the index only knows titles and previews; matches further into
+            # the text follow from the scan
+        session = self._search_session
+        if session is None:
+            for entry in self._scan(None):
+                yield self._item_for(entry)
+            return
+        for item in session.matches(self._search_rows, lambda raw: history_item(*raw)):
+            if item is None or item.entry_id in shown:
+                yield None
+            else:
+                yield item if self._category_matches(item) else None
+
+    def _scan(self, after):
+        entity_filter = self._filters[0]
+        while True:
+            if entity_filter:
+                entries = self.db_manager.get_history_entries_with_entity(
+                    entity_filter, limit=self.PAGE_SIZE, after=after
+                )
+            else:
+                entries = self.db_manager.get_all_entries(limit=self.PAGE_SIZE, after=after)
+            if not entries:
+                return
+            for entry in entries:
+                after = (entry[4], entry[2], entry[0])
+                yield entry
+
+    def _search_rows(self, after):
+        for entry in self._scan(after):
+            key = (entry[4], entry[2], entry[0])
+            if not self._row_matches(entry):
+                # empty text never matches, but still lets a stale load stop here
+                yield key, "", None
                 continue
-
-            title = self._extract_title(decrypted_text, content_type)
-            preview = self._extract_preview(decrypted_text)
-
-            card = ClipboardCard(
-                entry_id=entry_id,
-                title=title,
-                preview_text=preview,
-                timestamp=timestamp,
-                language=language,
-                content_type=content_type,
-                is_pinned=bool(pinned),
-                is_favorite=bool(favorite),
-                show_pin=True,
-                show_favorite=True,
-                show_edit=True,
-                show_copy=True,
-                show_delete=True,
-                show_save_snippet=is_code,
-                show_tag=True,
-                show_timestamp=getattr(self.window(), 'settings', {}).get('show_timestamps', True),
-                parent=self.card_container
-            )
-
-            card.copyClicked.connect(self._on_copy)
-            card.pinClicked.connect(self._on_pin)
-            card.favoriteClicked.connect(self._on_star)
-            card.editClicked.connect(self._on_edit)
-            card.deleteClicked.connect(self._on_delete)
-            card.saveAsSnippetClicked.connect(self._on_save_snippet)
-            card.tagClicked.connect(self._on_tag)
-            card.cardClicked.connect(self._on_card_click)
-
-            if entry_id == self._selected_card_id:
-                card.setSelected(True)
-
-            self.card_layout.insertWidget(rendered, card)
-            rendered += 1
-            if rendered >= self.MAX_RENDERED_ITEMS:
-                break
-
-        self.empty_label.setVisible(rendered == 0)
-        if total_entries > self.MAX_SCAN_ITEMS and (search_term or self._current_filter != "All Items"):
-            self.count_label.setText(
-                f"{rendered:,} shown · searched newest {self.MAX_SCAN_ITEMS:,} of {total_entries:,}"
-            )
-        elif total_entries > self.MAX_RENDERED_ITEMS and not search_term and self._current_filter == "All Items":
-            self.count_label.setText(f"{total_entries:,} items · showing newest {rendered}")
-        elif rendered != total_entries:
-            self.count_label.setText(f"{rendered:,} shown · {total_entries:,} total")
+            text = decrypt_text(entry[1], self.fernet)
+            lowered = searchable_text(self.db_manager, entry[0], text, self.fernet).lower()
+            yield key, lowered, (entry, text)
+
+    def _row_matches(self, entry):
+        _entity_filter, date_filter, type_filter, _clean_search = self._filters
+        entry_id, enc_text, timestamp, is_code, pinned, favorite = entry[:6]
+        if self._current_filter == "Favorites" and not favorite:
+            return False
+        if date_filter and not timestamp.startswith(date_filter):
+            return False
+        if type_filter == "code" and not is_code:
+            return False
+        if type_filter == "text" and is_code:
+            return False
+        return True
+
+    def _accepts(self, item):
+        # _row_matches and _category_matches for an indexed item
+        entity_filter, date_filter, type_filter, _clean_search = self._filters
+        if self._current_filter == "Favorites" and not item.favorite:
+            return False
+        if date_filter and not item.timestamp.startswith(date_filter):
+            return False
+        if type_filter and item.is_code != (type_filter == "code"):
+            return False
+        if entity_filter and item.entry_id not in self._entity_ids:
+            return False
+        return self._category_matches(item)
+
+    def _category_matches(self, item):
+        if self._current_filter == "Code":
+            return item.content_type == "code"
+        if self._current_filter == "Text":
+            return item.content_type == "text"
+        return True
+
+    def _item_for(self, entry):
+        # returns the card item for a history row, or None when filtered out
+        if not self._row_matches(entry):
+            return None
+        clean_search = self._filters[3]
+        decrypted_text = decrypt_text(entry[1], self.fernet)
+        if clean_search and clean_search not in searchable_text(
+                self.db_manager, entry[0], decrypted_text, self.fernet).lower():
+            return None
+        item = history_item(entry, decrypted_text)
+        return item if self._category_matches(item) else None
+
+    @staticmethod
+    def _sort_key(item):
+        return item.pinned, item.timestamp, item.entry_id
+
+    def apply_change(self, action, entry_type, entry_id):
+        # patch the loaded rows for a single database change
+        if entry_type != "history" or not self._loaded or action == "tagged":
+            return
+        # cached search rows may now be out of date or out of order
+        self._search_session = None
+        if action == "reset":
+            if self.isVisible():
+                self.load_entries()
+            else:
+                self._stale = True
+            return
+
+        model = self.list_view.list_model
+        entity_filter = self._filters[0]
+        key = ("history", entry_id)
+        if action == "deleted":
+            model.remove(key)
+            self._total_entries = self._count_total() if entity_filter else max(0, self._total_entries - 1)
         else:
-            self.count_label.setText(f"{total_entries:,} item{'s' if total_entries != 1 else ''}")
-
-    def _extract_title(self, text, content_type):
-        if content_type == "link":
-            first_line = text.strip().split('\n')[0]
-            if len(first_line) > 60:
-                return first_line[:57] + "..."
-            return first_line
-        lines = text.strip().split('\n')
-        for line in lines:
-            stripped = line.strip()
-            if stripped:
-                if len(stripped) > 60:
-                    return stripped[:57] + "..."
-                return stripped
-        return "Empty entry"
-
-    def _extract_preview(self, text):
-        lines = text.strip().split('\n')
-        preview_lines = []
-        for line in lines[1:4]:
-            stripped = line.strip()
-            if stripped:
-                preview_lines.append(stripped)
-        if preview_lines:
-            preview = '  '.join(preview_lines)
-            if len(preview) > 100:
-                return preview[:97] + "..."
-            return preview
-        elif lines:
-            text_flat = text.strip()
-            if len(text_flat) > 100:
-                return text_flat[:97] + "..."
-            return text_flat
-        return ""
+            entry = self.db_manager.get_history_entry(entry_id)
+            if entry is not None and entity_filter and not self.db_manager.entry_has_entity(entry_id, entity_filter):
+                entry = None
+            if self._ranked:
+                # ranked rows keep their order; edits refresh or drop them in place
+                item = self.search_index.get(key) if entry is not None else None
+                if item is not None and entity_filter:
+                    self._entity_ids.add(entry_id)
+                if item is not None and self._accepts(item):
+                    model.update(item)
+                else:
+                    model.remove(key)
+            else:
+                item = self._item_for(entry) if entry is not None else None
+                if item is None:
+                    model.remove(key)
+                else:
+                    model.place(item, self._sort_key)
+            if action == "created" and entry is not None:
+                self._total_entries += 1
+            elif entity_filter:
+                self._total_entries = self._count_total()
+        self._update_count_label()
+
+    def _update_count_label(self, *args):
+        shown = self.list_view.list_model.rowCount()
+        more = "+" if self.list_view.list_model.canFetchMore() else ""
+        total = self._total_entries
+        if self._filtered:
+            self.count_label.setText(f"{shown:,}{more} shown · {total:,} total")
+        else:
+            self.count_label.setText(f"{total:,} item{'s' if total != 1 else ''}")
 
     def _on_copy(self, entry_id):
         row = self.db_manager.get_entry_by_id(entry_id)
         if row:
-            decrypted = decrypt_text(row[0], self.fernet)
             window = self.window()
-            if hasattr(window, "copy_text"):
-                window.copy_text(decrypted)
+            if hasattr(window, "copy_entry"):
+                # images, html and file lists go back with their own formats
+                window.copy_entry(entry_id)
             else:
-                QApplication.clipboard().setText(decrypted)
+                QApplication.clipboard().setText(decrypt_entry_text(self.db_manager, entry_id, row[0], self.fernet))
             InfoBar.success("Copied", "Copied to clipboard!", parent=self, duration=1500)
 
     def _on_pin(self, entry_id):
@@ -270,45 +360,44 @@ class HistoryPage(QFrame):
         if row:
             new_state = 0 if row[1] else 1
             self.db_manager.update_pin_state(entry_id, new_state)
-            QTimer.singleShot(0, self.load_entries)
 
     def _on_star(self, entry_id):
         row = self.db_manager.get_entry_by_id(entry_id)
         if row:
             new_state = 0 if row[2] else 1
             self.db_manager.update_favorite_state(entry_id, new_state)
-            QTimer.singleShot(0, self.load_entries)
 
     def _on_edit(self, entry_id):
         row = self.db_manager.get_entry_by_id(entry_id)
         if row:
-            decrypted = decrypt_text(row[0], self.fernet)
+            decrypted = decrypt_entry_text(self.db_manager, entry_id, row[0], self.fernet)
             dialog = EditDialog(decrypted, self)
             if dialog.exec():
                 new_text = dialog.edited_text
                 if new_text != decrypted:
-                    new_encrypted = encrypt_text(new_text, self.fernet)
+                    new_encrypted, chunks = encrypt_payload(new_text, self.fernet)
                     window = self.window()
                     fingerprint_key = getattr(window, "fingerprint_key", b"clipboard-manager")
-                    self.db_manager.update_entry_content(
+                    retained_id = self.db_manager.update_entry_content(
                         entry_id,
                         new_encrypted,
                         content_fingerprint(new_text, fingerprint_key),
                         is_code(new_text),
+                        chunks,
                     )
-                    QTimer.singleShot(0, self.load_entries)
+                    if retained_id == entry_id and hasattr(window, "index_entities"):
+                        window.index_entities(entry_id, new_text)
                     InfoBar.success("Saved", "Entry updated.", parent=self, duration=1500)
 
     def _on_delete(self, entry_id):
         self.db_manager.delete_entry_by_id(entry_id)
-        QTimer.singleShot(0, self.load_entries)
 
     def _on_save_snippet(self, entry_id):
         row = self.db_manager.get_entry_by_id(entry_id)
         if row:
-            decrypted = decrypt_text(row[0], self.fernet)
+            decrypted = decrypt_entry_text(self.db_manager, entry_id, row[0], self.fernet)
             language = detect_language(decrypted)
-            title = self._extract_title(decrypted, "code")
+            title = extract_title(decrypted, "code")
             encrypted = encrypt_text(decrypted, self.fernet)
             import datetime
             ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -321,10 +410,3 @@ class HistoryPage(QFrame):
         dialog = TagDialog(self.db_manager, entry_id, "history", self)
         if dialog.exec():
             InfoBar.success("Tags", "Tags updated.", parent=self, duration=1500)
-
-    def _on_card_click(self, entry_id):
-        self._selected_card_id = entry_id
-        for i in range(self.card_layout.count()):
-            item = self.card_layout.itemAt(i)
-            if item and item.widget() and isinstance(item.widget(), ClipboardCard):
-                item.widget().setSelected(item.widget().entry_id == entry_id)
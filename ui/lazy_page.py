@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from PySide6.QtWidgets import QVBoxLayout, QWidget
+from PySide6.QtCore import Signal
+
+
+class LazyPage(QWidget):
+    # stack entry that builds its real page the first time it is shown
+
+    built = Signal(object)  # the page
+
+    def __init__(self, object_name: str, factory: Callable[[QWidget], QWidget], parent=None):
+        super().__init__(parent)
+        self.setObjectName(object_name)
+        self.factory = factory
+        self.page = None
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+    def build(self) -> QWidget:
+        if self.page is None:
+            self.page = self.factory(self)
+            self.layout().addWidget(self.page)
+            self.built.emit(self.page)
+        return self.page
+
+    def showEvent(self, event):
+        self.build()
+        super().showEvent(event)
+
+    # list-page calls; a page that was never built has nothing loaded to patch
+
+    def ensure_loaded(self):
+        page = self.build()
+        if hasattr(page, "ensure_loaded"):
+            page.ensure_loaded()
+
+    def invalidate(self):
+        if self.page is not None and hasattr(self.page, "invalidate"):
+            self.page.invalidate()
+
+    def apply_change(self, action, entry_type, entry_id):
+        if self.page is not None and hasattr(self.page, "apply_change"):
+            self.page.apply_change(action, entry_type, entry_id)
@@ -1,22 +1,29 @@
-from PySide6.QtWidgets import (QFrame, QVBoxLayout, QWidget, QLabel,
-                                QScrollArea, QApplication)
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtWidgets import QFrame, QVBoxLayout, QLabel, QApplication
+from PySide6.QtCore import QTimer
 from qfluentwidgets import SearchLineEdit
 
-from ui.clipboard_card import ClipboardCard
-from encryption import decrypt_text
-from content_detection import detect_language, detect_content_type
+from ui.clipboard_items import history_item, snippet_item
+from ui.clipboard_list import ClipboardListView
+from encryption import decrypt_entry_text, decrypt_text, searchable_text
+from profiling import profiler
+from tracing import tracer
 
 
 class PinnedPage(QFrame):
     # pinned and favorited items view
 
-    def __init__(self, db_manager, fernet, parent=None):
+    SEARCH_LIMIT = 200
+
+    def __init__(self, db_manager, fernet, parent=None, search_index=None):
         super().__init__(parent)
         self.db_manager = db_manager
         self.fernet = fernet
+        self.search_index = search_index
         self.setObjectName("pinnedPage")
-        self._selected_card_id = None
+        self._search_term = ""
+        self._ranked = False
+        self._loaded = False
+        self._stale = False
         self._setup_ui()
         self.search_timer = QTimer(self)
         self.search_timer.setSingleShot(True)
@@ -42,159 +49,144 @@ class PinnedPage(QFrame):
         self.search_bar.textChanged.connect(self._on_search)
         layout.addWidget(self.search_bar)
 
-        # Scrollable card list
-        self.scroll_area = QScrollArea(self)
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.scroll_area.setFrameShape(QFrame.NoFrame)
-
-        self.card_container = QWidget()
-        self.card_layout = QVBoxLayout(self.card_container)
-        self.card_layout.setContentsMargins(0, 0, 0, 0)
-        self.card_layout.setSpacing(8)
-
-        self.empty_label = QLabel("Pin or favorite an item to keep it close", self.card_container)
-        self.empty_label.setAlignment(Qt.AlignCenter)
-        self.empty_label.setStyleSheet("color: #6B7280; padding: 60px 24px;")
-        self.empty_label.setVisible(False)
-        self.card_layout.addWidget(self.empty_label)
-
-        self.card_layout.addStretch()
-
-        self.scroll_area.setWidget(self.card_container)
-        layout.addWidget(self.scroll_area, 1)
+        # Virtualized card list
+        self.list_view = ClipboardListView(self._actions_for, self)
+        self.list_view.list_model.profile_name = "pinned.fetch"
+        self.list_view.setPlaceholderText("Pin or favorite an item to keep it close")
+        self.list_view.actionTriggered.connect(self._on_action)
+        self.list_view.itemActivated.connect(lambda item: self._on_action("copy", item))
+        layout.addWidget(self.list_view, 1)
 
     def _on_search(self, text):
         self.search_timer.start()
 
+    def _actions_for(self, item):
+        if item.entry_type == "snippet":
+            return ("copy", "favorite", "delete")
+        return ("copy", "pin", "favorite", "delete")
+
+    def _on_action(self, action, item):
+        if item.entry_type == "snippet":
+            handlers = {
+                "copy": self._on_copy_snippet,
+                "favorite": self._on_unstar_snippet,
+                "delete": self._on_delete_snippet,
+            }
+        else:
+            handlers = {
+                "copy": self._on_copy,
+                "pin": self._on_unpin,
+                "favorite": self._on_unstar,
+                "delete": self._on_delete,
+            }
+        handlers[action](item.entry_id)
+
+    @profiler.profiled("pinned.load_entries")
+    @tracer.traced("pinned.load_entries", cat="ui")
     def load_entries(self):
-        # Reload pinned items and favorited snippets
-        for i in reversed(range(self.card_layout.count())):
-            item = self.card_layout.itemAt(i)
-            if item and item.widget() and isinstance(item.widget(), ClipboardCard):
-                w = item.widget()
-                self.card_layout.removeWidget(w)
-                w.deleteLater()
-
-        search_term = self.search_bar.text().strip().lower()
-        rendered = 0
-
-        entries = self.db_manager.get_saved_history_entries()
-        for entry in entries:
-            entry_id, enc_text, timestamp, is_code, pinned, favorite = entry
-            if not pinned and not favorite:
-                continue
-
-            decrypted_text = decrypt_text(enc_text, self.fernet)
-            if search_term and search_term not in decrypted_text.lower():
-                continue
-
-            content_type = detect_content_type(decrypted_text)
-            language = detect_language(decrypted_text) if is_code else "Text"
-            title = self._extract_title(decrypted_text, content_type)
-            preview = self._extract_preview(decrypted_text)
-
-            card = ClipboardCard(
-                entry_id=entry_id,
-                title=title,
-                preview_text=preview,
-                timestamp=timestamp,
-                language=language,
-                content_type=content_type,
-                is_pinned=bool(pinned),
-                is_favorite=bool(favorite),
-                show_pin=True,
-                show_favorite=True,
-                show_edit=False,
-                show_copy=True,
-                show_delete=True,
-                show_timestamp=getattr(self.window(), 'settings', {}).get('show_timestamps', True),
-                parent=self.card_container
-            )
-
-            card.copyClicked.connect(self._on_copy)
-            card.pinClicked.connect(self._on_unpin)
-            card.favoriteClicked.connect(self._on_unstar)
-            card.deleteClicked.connect(self._on_delete)
-            card.cardClicked.connect(self._on_card_click)
-
-            self.card_layout.insertWidget(rendered, card)
-            rendered += 1
-
-        snippets = self.db_manager.get_favorite_snippets()
-        for snippet in snippets:
-            snippet_id, title, enc_text, language, timestamp, favorite = snippet
-            if not favorite:
-                continue
-
-            decrypted_text = decrypt_text(enc_text, self.fernet)
-            if search_term and search_term not in decrypted_text.lower():
-                continue
-
-            preview = decrypted_text.strip()
-            if len(preview) > 100:
-                preview = preview[:97] + "..."
-
-            card = ClipboardCard(
-                entry_id=-snippet_id,
-                title=title,
-                preview_text=preview,
-                timestamp=timestamp,
-                language=language,
-                content_type='code',
-                is_pinned=False,
-                is_favorite=True,
-                show_pin=False,
-                show_favorite=True,
-                show_edit=False,
-                show_copy=True,
-                show_delete=True,
-                show_timestamp=getattr(self.window(), 'settings', {}).get('show_timestamps', True),
-                parent=self.card_container
-            )
-
-            card.copyClicked.connect(self._on_copy_snippet)
-            card.favoriteClicked.connect(self._on_unstar_snippet)
-            card.deleteClicked.connect(self._on_delete_snippet)
-            card.cardClicked.connect(self._on_card_click)
-
-            self.card_layout.insertWidget(rendered, card)
-            rendered += 1
-
-        self.empty_label.setVisible(rendered == 0)
-
-    def _extract_title(self, text, content_type):
-        if content_type == "link":
-            first_line = text.strip().split('\n')[0]
-            return first_line[:57] + "..." if len(first_line) > 60 else first_line
-        lines = text.strip().split('\n')
-        for line in lines:
-            stripped = line.strip()
-            if stripped:
-                return stripped[:57] + "..." if len(stripped) > 60 else stripped
-        return "Empty entry"
-
-    def _extract_preview(self, text):
-        lines = text.strip().split('\n')
-        preview_lines = [l.strip() for l in lines[1:4] if l.strip()]
-        if preview_lines:
-            preview = '  '.join(preview_lines)
-            return preview[:97] + "..." if len(preview) > 100 else preview
-        text_flat = text.strip()
-        return text_flat[:97] + "..." if len(text_flat) > 100 else text_flat
+        # Reset the list onto pinned items and favorited snippets
+        self._search_term = self.search_bar.text().strip().lower()
+        self._ranked = bool(self._search_term) and self.search_index is not None and self.search_index.ready
+        self._loaded = True
+        self._stale = False
+        self.list_view.card_delegate.show_timestamp = getattr(self.window(), 'settings', {}).get('show_timestamps', True)
+        self.list_view.set_source(self._iter_items())
+
+    def ensure_loaded(self):
+        if not self._loaded or self._stale:
+            self.load_entries()
+
+    def invalidate(self):
+        self._stale = True
+
+    def _iter_items(self):
+        shown = set()
+        if self._ranked:
+            for _score, item in self.search_index.search(self._search_term, self.SEARCH_LIMIT,
+                                                         ("history", "snippet"), accept=self._accepts):
+                shown.add(item.key)
+                yield item
+            # the index only knows titles and previews; matches further into
+            # the text follow from the scan
+        for entry in self.db_manager.get_saved_history_entries():
+            if ("history", entry[0]) not in shown:
+                yield self._item_for("history", entry)
+        for snippet in self.db_manager.get_favorite_snippets():
+            if ("snippet", snippet[0]) not in shown:
+                yield self._item_for("snippet", snippet)
+
+    @staticmethod
+    def _accepts(item):
+        return item.favorite or (item.entry_type == "history" and item.pinned)
+
+    def _item_for(self, entry_type, row):
+        # returns the card item for a saved row, or None when filtered out
+        if entry_type == "snippet":
+            enc_text, saved = row[2], row[5]
+        else:
+            enc_text, saved = row[1], row[4] or row[5]
+        if not saved:
+            return None
+
+        decrypted_text = decrypt_text(enc_text, self.fernet)
+        if self._search_term:
+            searched = decrypted_text
+            if entry_type == "history":
+                searched = searchable_text(self.db_manager, row[0], decrypted_text, self.fernet)
+            if self._search_term not in searched.lower():
+                return None
+
+        if entry_type == "snippet":
+            return snippet_item(row, decrypted_text)
+        return history_item(row, decrypted_text)
+
+    @staticmethod
+    def _sort_key(item):
+        # saved history rows are listed ahead of favorite snippets
+        return item.entry_type == "history", item.pinned, item.timestamp, item.entry_id
+
+    def apply_change(self, action, entry_type, entry_id):
+        # patch the loaded rows for a single database change
+        if entry_type not in ("history", "snippet") or not self._loaded or action == "tagged":
+            return
+        if action == "reset":
+            if self.isVisible():
+                self.load_entries()
+            else:
+                self._stale = True
+            return
+        model = self.list_view.list_model
+        if self._ranked:
+            # ranked rows keep their order; edits refresh or drop them in place
+            item = self.search_index.get((entry_type, entry_id)) if action != "deleted" else None
+            if item is not None and self._accepts(item):
+                model.update(item)
+            else:
+                model.remove((entry_type, entry_id))
+            return
+        row = None
+        if action != "deleted":
+            if entry_type == "snippet":
+                row = self.db_manager.get_snippet_by_id(entry_id)
+            else:
+                row = self.db_manager.get_history_entry(entry_id)
+        item = self._item_for(entry_type, row) if row is not None else None
+        if item is None:
+            model.remove((entry_type, entry_id))
+        else:
+            model.place(item, self._sort_key)
 
     def _on_copy(self, entry_id):
         row = self.db_manager.get_entry_by_id(entry_id)
         if row:
-            decrypted = decrypt_text(row[0], self.fernet)
             window = self.window()
-            if hasattr(window, "copy_text"):
-                window.copy_text(decrypted)
+            if hasattr(window, "copy_entry"):
+                # images, html and file lists go back with their own formats
+                window.copy_entry(entry_id)
             else:
-                QApplication.clipboard().setText(decrypted)
+                QApplication.clipboard().setText(decrypt_entry_text(self.db_manager, entry_id, row[0], self.fernet))
 
-    def _on_copy_snippet(self, neg_snippet_id):
-        snippet_id = abs(neg_snippet_id)
+    def _on_copy_snippet(self, snippet_id):
         snippet = self.db_manager.get_snippet_by_id(snippet_id)
         if snippet:
             decrypted = decrypt_text(snippet[2], self.fernet)
@@ -206,31 +198,17 @@ class PinnedPage(QFrame):
 
     def _on_unpin(self, entry_id):
         self.db_manager.update_pin_state(entry_id, 0)
-        QTimer.singleShot(0, self.load_entries)
 
     def _on_unstar(self, entry_id):
         row = self.db_manager.get_entry_by_id(entry_id)
         if row:
             self.db_manager.update_favorite_state(entry_id, 0 if row[2] else 1)
-        QTimer.singleShot(0, self.load_entries)
 
-    def _on_unstar_snippet(self, neg_snippet_id):
-        snippet_id = abs(neg_snippet_id)
+    def _on_unstar_snippet(self, snippet_id):
         self.db_manager.update_snippet_favorite(snippet_id, 0)
-        QTimer.singleShot(0, self.load_entries)
 
     def _on_delete(self, entry_id):
         self.db_manager.delete_entry_by_id(entry_id)
-        QTimer.singleShot(0, self.load_entries)
 
-    def _on_delete_snippet(self, neg_snippet_id):
-        snippet_id = abs(neg_snippet_id)
+    def _on_delete_snippet(self, snippet_id):
         self.db_manager.delete_snippet_by_id(snippet_id)
-        QTimer.singleShot(0, self.load_entries)
-
-    def _on_card_click(self, entry_id):
-        self._selected_card_id = entry_id
-        for i in range(self.card_layout.count()):
-            item = self.card_layout.itemAt(i)
-            if item and item.widget() and isinstance(item.widget(), ClipboardCard):
-                item.widget().setSelected(item.widget().entry_id == entry_id)
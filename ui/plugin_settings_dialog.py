@@ -80,6 +80,11 @@ class PluginSettingsDialog(QDialog):
         self.description_label.setWordWrap(True)
         details_layout.addWidget(self.description_label)
 
+        self.stats_label = CaptionLabel("")
+        self.stats_label.setStyleSheet("color: #6B7280;")
+        self.stats_label.setWordWrap(True)
+        details_layout.addWidget(self.stats_label)
+
         enable_row = QHBoxLayout()
         enable_label = BodyLabel("Enabled")
         enable_row.addWidget(enable_label)
@@ -123,14 +128,29 @@ class PluginSettingsDialog(QDialog):
             self.version_label.setText(f"Version {plugin.version}")
             self.author_label.setText(f"by {plugin.author}")
             self.description_label.setText(plugin.description or "No description available.")
+            self.stats_label.setText(self._stats_text(plugin_name))
             self.enable_switch.setEnabled(True)
             self.enable_switch.setChecked(plugin.enabled)
 
+    def _stats_text(self, plugin_name):
+        stats = self.plugin_manager.get_stats(plugin_name)
+        if not stats["calls"]:
+            return "Not called since the app started."
+        text = (f"{stats['calls']} calls · p50 {stats['p50_ms']:.1f} ms · p99 {stats['p99_ms']:.1f} ms · "
+                f"{stats['overruns']} over the {self.plugin_manager.budget_ms} ms budget · {stats['errors']} errors")
+        if stats["last_error"]:
+            text += f"\nLast error: {stats['last_error']}"
+        return text
+
     def _on_toggle_plugin(self, checked):
         current = self.plugin_list.currentItem()
         if current:
             plugin_name = current.data(Qt.UserRole)
             plugin = self.plugin_manager.plugins.get(plugin_name)
-            if plugin:
-                plugin.enabled = checked
+            if plugin and plugin.enabled != checked:
+                # saved, so a plugin disabled for being slow stays re-enabled
+                if checked:
+                    self.plugin_manager.enable_plugin(plugin_name)
+                else:
+                    self.plugin_manager.disable_plugin(plugin_name)
                 self._load_plugins()
\ No newline at end of file
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import statistics
+import time
+from collections import deque
+
+from PySide6.QtWidgets import QApplication, QHBoxLayout, QLabel, QVBoxLayout, QWidget
+from PySide6.QtCore import QEvent, QPoint, QRect, Qt, Signal
+from PySide6.QtGui import QColor, QCursor, QPainter
+from qfluentwidgets import SearchLineEdit, TransparentPushButton, isDarkTheme
+
+from encryption import decrypt_entry_text, decrypt_text
+from metrics import registry
+from search import SearchIndex
+from ui.clipboard_items import history_item
+from ui.clipboard_list import ClipboardListView
+
+
+class QuickPastePopup(QWidget):
+    # frameless recent-items picker shown by the global hotkey
+
+    # the popup is built once and kept hidden; showing it only swaps the list
+    # onto the warm cache of recent items, so no query runs on the hotkey path
+    RECENT_LIMIT = 30
+    LATENCY_SAMPLES = 50
+
+    openRequested = Signal()
+    shown = Signal(float)  # hotkey-to-paint latency in ms
+
+    def __init__(self, db_manager, fernet, search_index=None, copy_entry=None, parent=None):
+        super().__init__(parent, Qt.Tool | Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
+        self.db_manager = db_manager
+        self.fernet = fernet
+        self.search_index = search_index
+        self.copy_entry = copy_entry
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setObjectName("quickPastePopup")
+        self._recent = []
+        self._requested_at = None
+        self.latencies = deque(maxlen=self.LATENCY_SAMPLES)
+        self._setup_ui()
+        self.resize(520, 460)
+        self.reload()
+        # create the native window now so the first show does not pay for it
+        self.winId()
+        self.ensurePolished()
+
+    def _setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(12, 12, 12, 8)
+        layout.setSpacing(8)
+
+        self.search_bar = SearchLineEdit(self)
+        self.search_bar.setPlaceholderText("Type to filter, Enter to copy")
+        self.search_bar.textChanged.connect(self._apply_filter)
+        self.search_bar.installEventFilter(self)
+        layout.addWidget(self.search_bar)
+
+        self.list_view = ClipboardListView(lambda item: ("copy",), self)
+        self.list_view.setPlaceholderText("Nothing copied yet")
+        self.list_view.actionTriggered.connect(lambda action, item: self._copy(item))
+        self.list_view.itemActivated.connect(self._copy)
+        layout.addWidget(self.list_view, 1)
+
+        footer = QHBoxLayout()
+        footer.setContentsMargins(4, 0, 0, 0)
+        self.latency_label = QLabel("")
+        self.latency_label.setStyleSheet("color: #6B7280;")
+        footer.addWidget(self.latency_label)
+        footer.addStretch()
+        open_button = TransparentPushButton("Open history", self)
+        open_button.clicked.connect(self._open_window)
+        footer.addWidget(open_button)
+        layout.addLayout(footer)
+
+    # Warm cache ----------------------------------------------------------
+
+    def reload(self):
+        self._recent = [history_item(row, decrypt_text(row[1], self.fernet))
+                        for row in self.db_manager.get_recent_entries(self.RECENT_LIMIT)]
+        if self.isVisible():
+            self._apply_filter(self.search_bar.text())
+
+    def apply_change(self, action, entry_type, entry_id):
+        # keep the cache current so the hotkey never waits on the database
+        if entry_type != "history" or action == "tagged":
+            return
+        if action == "reset":
+            self.reload()
+            return
+        key = ("history", entry_id)
+        self._recent = [item for item in self._recent if item.key != key]
+        if action != "deleted":
+            item = self.search_index.get(key) if self.search_index is not None else None
+            if item is None:
+                row = self.db_manager.get_history_entry(entry_id)
+                item = history_item(row, decrypt_text(row[1], self.fernet)) if row is not None else None
+            if item is not None:
+                self._recent.append(item)
+                self._recent.sort(key=lambda recent: (recent.timestamp, recent.entry_id), reverse=True)
+                del self._recent[self.RECENT_LIMIT:]
+        if self.isVisible():
+            self._apply_filter(self.search_bar.text())
+
+    def _apply_filter(self, text):
+        query = text.strip().lower()
+        if not query:
+            items = self._recent
+        elif self.search_index is not None and self.search_index.ready:
+            items = [item for _score, item in self.search_index.search(query, self.RECENT_LIMIT, ("history",))]
+        else:
+            items = [item for item in self._recent if query in SearchIndex.haystack(item)]
+        self.list_view.set_items(items)
+        self.list_view.setPlaceholderText("No matches" if query else "Nothing copied yet")
+        if items:
+            self.list_view.setCurrentIndex(self.list_view.list_model.index(0))
+
+    # Showing -------------------------------------------------------------
+
+    def popup(self, requested_at: float | None = None):
+        # requested_at is the perf_counter() reading taken when the hotkey fired
+        self._requested_at = requested_at if requested_at is not None else time.perf_counter()
+        if self.search_bar.text():
+            self.search_bar.clear()
+        else:
+            self._apply_filter("")
+        self.list_view.card_delegate.show_timestamp = getattr(self.parent(), "settings", {}).get("show_timestamps", True)
+        self.move(self._position())
+        self.show()
+        self.raise_()
+        self.activateWindow()
+        self.search_bar.setFocus()
+
+    def _position(self) -> QPoint:
+        # centred under the cursor, kept on the cursor's screen
+        cursor = QCursor.pos()
+        screen = QApplication.screenAt(cursor) or QApplication.primaryScreen()
+        area = screen.availableGeometry() if screen else QRect(0, 0, 1920, 1080)
+        x = min(max(cursor.x() - self.width() // 2, area.left()), area.right() - self.width())
+        y = min(max(cursor.y() - 24, area.top()), area.bottom() - self.height())
+        return QPoint(x, y)
+
+    def latency_summary(self) -> dict:
+        if not self.latencies:
+            return {"count": 0, "last_ms": None, "median_ms": None, "worst_ms": None}
+        return {
+            "count": len(self.latencies),
+            "last_ms": self.latencies[-1],
+            "median_ms": statistics.median(self.latencies),
+            "worst_ms": max(self.latencies),
+        }
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        dark = isDarkTheme()
+        painter.setPen(QColor(255, 255, 255, 24) if dark else QColor(0, 0, 0, 30))
+        painter.setBrush(QColor("#202020") if dark else QColor("#F9F9F9"))
+        painter.drawRoundedRect(self.rect().adjusted(0, 0, -1, -1), 10, 10)
+        painter.end()
+        if self._requested_at is not None:
+            latency = (time.perf_counter() - self._requested_at) * 1000
+            self._requested_at = None
+            self.latencies.append(latency)
+            registry.observe("ui.quick_paste_ms", latency)
+            self.latency_label.setText(f"Opened in {latency:.0f} ms")
+            self.shown.emit(latency)
+
+    # Actions -------------------------------------------------------------
+
+    def _copy(self, item):
+        row = self.db_manager.get_entry_by_id(item.entry_id)
+        self.hide()
+        if row:
+            if self.copy_entry is not None:
+                self.copy_entry(item.entry_id)
+            else:
+                QApplication.clipboard().setText(decrypt_entry_text(self.db_manager, item.entry_id, row[0], self.fernet))
+
+    def _open_window(self):
+        self.hide()
+        self.openRequested.emit()
+
+    def eventFilter(self, obj, event):
+        if obj is self.search_bar and event.type() == QEvent.KeyPress:
+            key = event.key()
+            if key in (Qt.Key_Down, Qt.Key_Up):
+                model = self.list_view.list_model
+                if model.rowCount():
+                    step = 1 if key == Qt.Key_Down else -1
+                    row = min(max(self.list_view.currentIndex().row() + step, 0), model.rowCount() - 1)
+                    self.list_view.setCurrentIndex(model.index(row))
+                return True
+            if key in (Qt.Key_Return, Qt.Key_Enter):
+                item = self.list_view.current_item()
+                if item is not None:
+                    self._copy(item)
+                return True
+            if key == Qt.Key_Escape:
+                self.hide()
+                return True
+        return super().eventFilter(obj, event)
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_Escape:
+            self.hide()
+            return
+        super().keyPressEvent(event)
+
+    def event(self, event):
+        # clicking anywhere else dismisses the popup
+        if event.type() == QEvent.WindowDeactivate and self.isVisible():
+            self.hide()
+        return super().event(event)
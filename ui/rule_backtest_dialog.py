@@ -0,0 +1,165 @@
+import re
+
+from PySide6.QtWidgets import QDialog, QHBoxLayout, QListWidget, QListWidgetItem, QVBoxLayout
+from qfluentwidgets import (BodyLabel, CaptionLabel, LineEdit, PrimaryPushButton, PushButton,
+                            StrongBodyLabel)
+
+from notifications.backtest import BacktestJob
+
+
+class RuleBacktestDialog(QDialog):
+    # add notification rules after seeing how they do on the stored history
+
+    def __init__(self, notification_manager, db_manager, fernet, parent=None):
+        super().__init__(parent)
+        self.notification_manager = notification_manager
+        self.db_manager = db_manager
+        self.fernet = fernet
+        self.job = None
+        self._tested = None  # (name, pattern) of the last clean candidate run
+        self.setWindowTitle("Notification Rules")
+        self.setMinimumSize(560, 480)
+        self._setup_ui()
+        self._load_rules()
+
+    def _setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(20, 16, 20, 16)
+        layout.setSpacing(10)
+
+        layout.addWidget(StrongBodyLabel("Rules"))
+        self.rule_list = QListWidget()
+        self.rule_list.setMaximumHeight(110)
+        layout.addWidget(self.rule_list)
+
+        form = QHBoxLayout()
+        self.name_field = LineEdit()
+        self.name_field.setPlaceholderText("Name")
+        self.name_field.textChanged.connect(self._on_candidate_changed)
+        form.addWidget(self.name_field, 1)
+        self.pattern_field = LineEdit()
+        self.pattern_field.setPlaceholderText("Regular expression")
+        self.pattern_field.textChanged.connect(self._on_candidate_changed)
+        form.addWidget(self.pattern_field, 2)
+        layout.addLayout(form)
+
+        desc = CaptionLabel("Test a rule against your whole history before saving it: hits, samples, match time and timeouts.")
+        desc.setWordWrap(True)
+        desc.setStyleSheet("color: #6B7280;")
+        layout.addWidget(desc)
+
+        self.status_label = BodyLabel("")
+        layout.addWidget(self.status_label)
+        self.results = QListWidget()
+        layout.addWidget(self.results, 1)
+
+        buttons = QHBoxLayout()
+        self.test_button = PushButton("Test Rule")
+        self.test_button.clicked.connect(self._test_candidate)
+        buttons.addWidget(self.test_button)
+        self.test_all_button = PushButton("Test All Rules")
+        self.test_all_button.clicked.connect(self._test_all)
+        buttons.addWidget(self.test_all_button)
+        buttons.addStretch()
+        self.save_button = PrimaryPushButton("Save Rule")
+        self.save_button.setEnabled(False)
+        self.save_button.clicked.connect(self._save_candidate)
+        buttons.addWidget(self.save_button)
+        close_button = PushButton("Close")
+        close_button.clicked.connect(self.reject)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+    def _load_rules(self):
+        self.rule_list.clear()
+        for rule in self.notification_manager.rules:
+            status = "✓" if rule.enabled else "✗"
+            self.rule_list.addItem(QListWidgetItem(f"{status}  {rule.name}   {rule.pattern}"))
+
+    def _candidate(self):
+        name, pattern = self.name_field.text().strip(), self.pattern_field.text().strip()
+        if not name or not pattern:
+            self.status_label.setText("Enter a name and a pattern.")
+            return None
+        try:
+            re.compile(pattern, re.IGNORECASE)
+        except re.error as exc:
+            self.status_label.setText(f"Invalid pattern: {exc}")
+            return None
+        return name, pattern
+
+    def _on_candidate_changed(self, _text):
+        self._tested = None
+        self.save_button.setEnabled(False)
+
+    def _test_candidate(self):
+        candidate = self._candidate()
+        if candidate is None:
+            return
+        # after the enabled rules, as it would be saved, so "fired" is honest
+        rules = [(rule.name, rule.pattern) for rule in self.notification_manager.rules
+                 if rule.enabled and rule.name != candidate[0]]
+        self._start(rules + [candidate], candidate)
+
+    def _test_all(self):
+        rules = [(rule.name, rule.pattern) for rule in self.notification_manager.rules if rule.enabled]
+        if rules:
+            self._start(rules, None)
+
+    def _start(self, rules, candidate):
+        if self.job is not None:
+            return
+        self._candidate_under_test = candidate
+        self.results.clear()
+        self.status_label.setText("Starting…")
+        self.test_button.setEnabled(False)
+        self.test_all_button.setEnabled(False)
+        self.job = BacktestJob(self.db_manager, self.fernet, rules, self)
+        self.job.progress.connect(self._on_progress)
+        self.job.finished.connect(self._on_finished)
+        self.job.start()
+
+    def _on_progress(self, done, total):
+        self.status_label.setText(f"Checked {done:,} of {total:,} clips…")
+
+    def _on_finished(self, result):
+        self.job = None
+        self.test_button.setEnabled(True)
+        self.test_all_button.setEnabled(True)
+        if result.error:
+            self.status_label.setText(f"Backtest failed: {result.error}")
+            return
+        status = f"Checked {result.clips:,} clips in {result.elapsed:.1f} s"
+        if result.timed_out:
+            status += f" — stopped: a rule ran over {BacktestJob.CHUNK_DEADLINE:.0f} s on one batch"
+        self.status_label.setText(status)
+        for name in result.rules:
+            summary = result.summary(name)
+            line = (f"{name}: {summary['hits']:,} hits ({summary['rate']:.1%}), would notify {summary['fired']:,}× · "
+                    f"mean {summary['mean_ms']:.2f} ms, max {summary['max_ms']:.1f} ms")
+            if summary["timeouts"]:
+                line += f" · {summary['timeouts']} slow matches"
+            self.results.addItem(QListWidgetItem(line))
+            for entry_id, sample in summary["samples"]:
+                self.results.addItem(QListWidgetItem(f"    #{entry_id}: {sample}"))
+        candidate = self._candidate_under_test
+        if candidate is not None and not result.timed_out and not result.cancelled:
+            self._tested = candidate
+            self.save_button.setEnabled(True)
+
+    def _save_candidate(self):
+        if self._tested is None:
+            return
+        name, pattern = self._tested
+        # an edited rule keeps its place, which decides what fires first
+        if self.notification_manager.update_rule(name, pattern) is None:
+            self.notification_manager.add_rule(name, pattern)
+        self._load_rules()
+        self.name_field.clear()
+        self.pattern_field.clear()
+        self.status_label.setText(f"Saved rule {name}.")
+
+    def done(self, result):
+        if self.job is not None:
+            self.job.cancel()
+        super().done(result)
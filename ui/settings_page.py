@@ -10,10 +10,14 @@ from qfluentwidgets import (SwitchButton, ComboBox, LineEdit, PushButton,
                              StrongBodyLabel, CaptionLabel, InfoBar,
                              MessageBox, PasswordLineEdit)
 
+from metrics import registry
+from profiling import MODES
+from tracing import tracer
 from utils import get_app_font, get_system_theme
 from settings import DEFAULT_SETTINGS, SettingsManager
 from ui.startup_wizard import add_to_startup, remove_from_startup
 import os
+import json
 
 
 class SettingsGroup(CardWidget):
@@ -59,11 +63,16 @@ class SettingsPage(QFrame):
     factoryResetRequested = Signal()
 
     def __init__(self, settings, app_dir, plugin_manager=None,
-                 settings_encryption_key=None, parent=None):
+                 settings_encryption_key=None, maintenance=None, capture=None, notifications=None,
+                 watchdog=None, parent=None):
         super().__init__(parent)
         self.settings = settings.copy()
         self.app_dir = app_dir
         self.plugin_manager = plugin_manager
+        self.maintenance = maintenance
+        self.capture = capture
+        self.notifications = notifications
+        self.watchdog = watchdog
         self.settings_encryption_key = settings_encryption_key
         self.setObjectName("settingsPage")
         self._setup_ui()
@@ -223,6 +232,16 @@ class SettingsPage(QFrame):
         self.startup_switch.setChecked(self.settings.get("start_at_startup", False))
         startup_group.addRow("Start at Startup", self.startup_switch)
 
+        self.coalesce_field = LineEdit()
+        self.coalesce_field.setText(str(self.settings.get("capture_coalesce_ms", "100")))
+        self.coalesce_field.setPlaceholderText("100")
+        startup_group.addRow("Capture Coalescing (ms)", self.coalesce_field)
+
+        coalesce_desc = CaptionLabel("Clipboard changes closer together than this are stored once, as the final state. 0 stores every change.")
+        coalesce_desc.setWordWrap(True)
+        coalesce_desc.setStyleSheet("color: #6B7280;")
+        startup_group.addFullRow(coalesce_desc)
+
         layout.addWidget(startup_group)
 
         # ── Google Drive Sync Section ─────────────────────────────────
@@ -289,8 +308,69 @@ class SettingsPage(QFrame):
             plugin_btn_layout.addStretch()
 
             plugins_group.addFullRow(plugin_buttons)
+
+            self.budget_field = LineEdit()
+            self.budget_field.setText(str(self.settings.get("plugin_budget_ms", "50")))
+            self.budget_field.setPlaceholderText("50")
+            plugins_group.addRow("Time Budget per Clip (ms)", self.budget_field)
+
+            budget_desc = CaptionLabel("A plugin that takes longer than this three times in a row, or stops responding, is disabled.")
+            budget_desc.setWordWrap(True)
+            budget_desc.setStyleSheet("color: #6B7280;")
+            plugins_group.addFullRow(budget_desc)
             layout.addWidget(plugins_group)
 
+        # ── Notifications Section ─────────────────────────────────────
+        if self.notifications and self.capture:
+            notifications_group = SettingsGroup("Notifications")
+
+            rules_btn = PushButton("Notification Rules")
+            rules_btn.clicked.connect(self._show_notification_rules)
+            notifications_group.addRow("Rules", rules_btn)
+            layout.addWidget(notifications_group)
+
+        # ── Diagnostics Section ───────────────────────────────────────
+        if self.maintenance or self.capture:
+            diagnostics_group = SettingsGroup("Diagnostics")
+
+            diagnostics_desc = CaptionLabel("Captures are processed in the background. Maintenance runs in short slices while you are not typing, clicking or copying.")
+            diagnostics_desc.setWordWrap(True)
+            diagnostics_desc.setStyleSheet("color: #6B7280;")
+            diagnostics_group.addFullRow(diagnostics_desc)
+
+            self.trace_switch = SwitchButton()
+            self.trace_switch.setChecked(self.settings.get("trace_enabled", False))
+            diagnostics_group.addRow("Record Traces", self.trace_switch)
+
+            # writes .prof / .tracemalloc files to <app dir>/profiles
+            self.profile_combo = ComboBox()
+            self.profile_combo.addItems(["Off", "CPU", "Memory", "CPU and Memory"])
+            current_profile = self.settings.get("profile_mode", "off")
+            self.profile_combo.setCurrentIndex(MODES.index(current_profile) if current_profile in MODES else 0)
+            diagnostics_group.addRow("Profiling", self.profile_combo)
+
+            self.diagnostics_list = QListWidget()
+            self.diagnostics_list.setMaximumHeight(280)
+            self._refresh_diagnostics()
+            diagnostics_group.addFullRow(self.diagnostics_list)
+
+            diagnostics_buttons = QWidget()
+            diagnostics_btn_layout = QHBoxLayout(diagnostics_buttons)
+            diagnostics_btn_layout.setContentsMargins(0, 0, 0, 0)
+            refresh_diagnostics_btn = PushButton("Refresh")
+            refresh_diagnostics_btn.clicked.connect(self._refresh_diagnostics)
+            diagnostics_btn_layout.addWidget(refresh_diagnostics_btn)
+            export_metrics_btn = PushButton("Export JSON")
+            export_metrics_btn.clicked.connect(self._export_metrics)
+            diagnostics_btn_layout.addWidget(export_metrics_btn)
+            export_trace_btn = PushButton("Export Trace")
+            export_trace_btn.clicked.connect(self._export_trace)
+            diagnostics_btn_layout.addWidget(export_trace_btn)
+            diagnostics_btn_layout.addStretch()
+            diagnostics_group.addFullRow(diagnostics_buttons)
+
+            layout.addWidget(diagnostics_group)
+
         # ── Danger Zone ───────────────────────────────────────────────
         danger_group = SettingsGroup("Danger Zone")
 
@@ -347,7 +427,7 @@ class SettingsPage(QFrame):
         elif theme == "light":
             setTheme(Theme.LIGHT)
         else:
-            system_theme = get_system_theme()
+            system_theme = get_system_theme(refresh=True)
             if system_theme == "dark":
                 setTheme(Theme.DARK)
             else:
@@ -448,6 +528,115 @@ class SettingsPage(QFrame):
             dialog.exec()
             self._refresh_plugins()
 
+    # ── Notifications ─────────────────────────────────────────────────
+
+    def _show_notification_rules(self):
+        from ui.rule_backtest_dialog import RuleBacktestDialog
+        dialog = RuleBacktestDialog(self.notifications, self.capture.db_manager, self.capture.fernet, self)
+        dialog.exec()
+
+    # ── Diagnostics ───────────────────────────────────────────────────
+
+    def _refresh_diagnostics(self):
+        self.diagnostics_list.clear()
+        snapshot = registry.snapshot()
+        gauges = snapshot["gauges"]
+        if "db.size_bytes" in gauges:
+            self.diagnostics_list.addItem(QListWidgetItem(
+                f"Database: {gauges['db.size_bytes'] / 1048576:.1f} MB (WAL {gauges['db.wal_bytes'] / 1048576:.1f} MB), "
+                f"{gauges['db.rows.history']:,} clips, {gauges['db.rows.snippets']:,} snippets, "
+                f"{gauges['db.rows.entities']:,} entities, {gauges['db.rows.payload_chunks']:,} large-text chunks, "
+                f"average payload {gauges['db.avg_payload_bytes']:,.0f} bytes"
+            ))
+        if self.capture:
+            stats = self.capture.stats()
+            minutes = snapshot["uptime_s"] / 60
+            self.diagnostics_list.addItem(QListWidgetItem(
+                f"Capture: {stats['events']} changes ({stats['events'] / minutes:.1f}/min), {stats['merged']} merged, "
+                f"{stats['processed']} stored, {stats['duplicates']} repeats, "
+                f"{stats['dropped']} dropped, {stats['failed']} failed, {stats['pending']} waiting"
+            ))
+            blob_count, blob_bytes = self.capture.db_manager.blob_usage()
+            self.diagnostics_list.addItem(QListWidgetItem(
+                f"Stored images and rich text: {blob_count} ({blob_bytes / 1024:.0f} KB)"
+            ))
+            query_log = self.capture.db_manager.query_log
+            if query_log.slow:
+                self.diagnostics_list.addItem(QListWidgetItem(
+                    f"Slow queries (over {query_log.slow_ms:.0f} ms): {len(query_log.slow)} recent, plans in slow_queries.log"
+                ))
+            for statement in query_log.top(5):
+                self.diagnostics_list.addItem(QListWidgetItem(
+                    f"SQL {statement['calls']:,}×, mean {statement['mean_ms']:.2f} ms, max {statement['max_ms']:.1f} ms, "
+                    f"{statement['rows']:,} rows: {statement['sql'][:100]}"
+                ))
+        if self.watchdog:
+            stalls = list(self.watchdog.stalls)
+            if stalls:
+                self.diagnostics_list.addItem(QListWidgetItem(
+                    f"Window froze {len(stalls)}× (over {self.watchdog.threshold_ms} ms), stacks in stalls.log"
+                ))
+            for stall in stalls[-5:][::-1]:
+                self.diagnostics_list.addItem(QListWidgetItem(
+                    f"  {stall.when}: {stall.duration_ms:.0f} ms in {stall.culprit}"
+                ))
+        ratios = []
+        for name, label in (("thumbnails", "thumbnails"), ("search.sessions", "search refinement"),
+                            ("capture.blobs", "image/html dedupe")):
+            ratio = registry.hit_ratio(name)
+            if ratio is not None:
+                ratios.append(f"{label} {ratio:.0%}")
+        if ratios:
+            self.diagnostics_list.addItem(QListWidgetItem("Cache hits: " + ", ".join(ratios)))
+        for name, summary in snapshot["histograms"].items():
+            unit = " ms" if name.endswith("_ms") else ""
+            self.diagnostics_list.addItem(QListWidgetItem(
+                f"{name.removesuffix('_ms')}: {summary['count']:,} ({summary['per_min']:.1f}/min), "
+                f"p50 {summary['p50']:.2f}{unit}, p99 {summary['p99']:.2f}{unit}, max {summary['max']:.2f}{unit}"
+            ))
+        if self.notifications:
+            for name, rule in self.notifications.get_stats().items():
+                self.diagnostics_list.addItem(QListWidgetItem(
+                    f"Rule {name}: {rule['hits']} hits in {rule['checks']} clips, {rule['skipped']} skipped by prefilter, "
+                    f"regex mean {rule['mean_ms']:.2f} ms, max {rule['max_ms']:.2f} ms"
+                ))
+        if self.maintenance:
+            for task in self.maintenance.status():
+                last = task["last_finished"] or "never"
+                line = f"Maintenance {task['name']}  [{task['status']}]  last run {last}, {task['last_duration_ms']:.0f} ms busy, {task['runs']} runs"
+                if task["error"]:
+                    line += f"  — {task['error']}"
+                self.diagnostics_list.addItem(QListWidgetItem(line))
+
+    def _export_metrics(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Metrics", "clipboard-metrics.json", "JSON Files (*.json)")
+        if not path:
+            return
+        try:
+            snapshot = registry.snapshot()
+            if self.watchdog:
+                snapshot["stalls"] = self.watchdog.snapshot()
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, indent=2)
+        except OSError as exc:
+            InfoBar.error("Export", f"Could not write metrics: {exc}", parent=self)
+            return
+        InfoBar.success("Export", "Metrics exported.", parent=self)
+
+    def _export_trace(self):
+        if not tracer.events:
+            InfoBar.warning("Export", "No trace recorded yet. Turn on Record Traces and save settings first.", parent=self)
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export Trace", "clipboard-trace.json", "Trace Files (*.json)")
+        if not path:
+            return
+        try:
+            tracer.dump(path)
+        except OSError as exc:
+            InfoBar.error("Export", f"Could not write trace: {exc}", parent=self)
+            return
+        InfoBar.success("Export", "Trace exported. Open it in chrome://tracing or Perfetto.", parent=self)
+
     # ── Danger Zone ───────────────────────────────────────────────────
 
     def _reset_history(self):
@@ -526,8 +715,14 @@ class SettingsPage(QFrame):
             "custom_font_path": self.font_path_field.text().strip(),
             "history_management": history_management,
             "history_threshold_days": self.threshold_field.text().strip(),
+            "capture_coalesce_ms": self.coalesce_field.text().strip() or "100",
             "gdrive_enabled": self.gdrive_switch.isChecked(),
         })
+        if self.plugin_manager:
+            self.settings["plugin_budget_ms"] = self.budget_field.text().strip() or "50"
+        if self.maintenance or self.capture:
+            self.settings["trace_enabled"] = self.trace_switch.isChecked()
+            self.settings["profile_mode"] = MODES[self.profile_combo.currentIndex()]
 
         if self.startup_switch.isChecked():
             add_to_startup()
@@ -1,23 +1,32 @@
-from PySide6.QtWidgets import (QFrame, QVBoxLayout, QHBoxLayout, QWidget,
-                                QScrollArea, QLabel, QApplication)
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtWidgets import QFrame, QVBoxLayout, QHBoxLayout, QLabel, QApplication
+from PySide6.QtCore import QTimer
 from qfluentwidgets import SearchLineEdit, SegmentedWidget
 
-from ui.clipboard_card import ClipboardCard, EditDialog
+from ui.clipboard_card import EditDialog
+from ui.clipboard_items import snippet_item
+from ui.clipboard_list import ClipboardListView
 from encryption import decrypt_text, encrypt_text
 from content_detection import detect_language
+from profiling import profiler
+from tracing import tracer
 
 
 class SnippetsPage(QFrame):
     # saved snippets tab
 
-    def __init__(self, db_manager, fernet, parent=None):
+    SEARCH_LIMIT = 200
+
+    def __init__(self, db_manager, fernet, parent=None, search_index=None):
         super().__init__(parent)
         self.db_manager = db_manager
         self.fernet = fernet
+        self.search_index = search_index
         self.setObjectName("snippetsPage")
         self._current_filter = "All Languages"
-        self._selected_card_id = None
+        self._search_term = ""
+        self._ranked = False
+        self._loaded = False
+        self._stale = False
         self._setup_ui()
         self.search_timer = QTimer(self)
         self.search_timer.setSingleShot(True)
@@ -63,27 +72,13 @@ class SnippetsPage(QFrame):
 
         layout.addLayout(filter_layout)
 
-        # Scrollable card list
-        self.scroll_area = QScrollArea(self)
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.scroll_area.setFrameShape(QFrame.NoFrame)
-
-        self.card_container = QWidget()
-        self.card_layout = QVBoxLayout(self.card_container)
-        self.card_layout.setContentsMargins(0, 0, 0, 0)
-        self.card_layout.setSpacing(8)
-
-        self.empty_label = QLabel("Save a code item from history to create a snippet", self.card_container)
-        self.empty_label.setAlignment(Qt.AlignCenter)
-        self.empty_label.setStyleSheet("color: #6B7280; padding: 60px 24px;")
-        self.empty_label.setVisible(False)
-        self.card_layout.addWidget(self.empty_label)
-
-        self.card_layout.addStretch()
-
-        self.scroll_area.setWidget(self.card_container)
-        layout.addWidget(self.scroll_area, 1)
+        # Virtualized card list
+        self.list_view = ClipboardListView(self._actions_for, self)
+        self.list_view.list_model.profile_name = "snippets.fetch"
+        self.list_view.setPlaceholderText("Save a code item from history to create a snippet")
+        self.list_view.actionTriggered.connect(self._on_action)
+        self.list_view.itemActivated.connect(lambda item: self._on_copy(item.entry_id))
+        layout.addWidget(self.list_view, 1)
 
     def _on_filter_changed(self, key):
         filter_map = {"all": "All Languages", "js": "JS", "python": "Python", "css": "CSS"}
@@ -93,71 +88,94 @@ class SnippetsPage(QFrame):
     def _on_search(self, text):
         self.search_timer.start()
 
+    def _actions_for(self, item):
+        return ("copy", "favorite", "edit", "tag", "delete")
+
+    def _on_action(self, action, item):
+        handlers = {
+            "copy": self._on_copy,
+            "favorite": self._on_star,
+            "edit": self._on_edit,
+            "tag": self._on_tag,
+            "delete": self._on_delete,
+        }
+        handlers[action](item.entry_id)
+
+    @profiler.profiled("snippets.load_entries")
+    @tracer.traced("snippets.load_entries", cat="ui")
     def load_entries(self):
-        # Reload snippets from DB
-        for i in reversed(range(self.card_layout.count())):
-            item = self.card_layout.itemAt(i)
-            if item and item.widget() and isinstance(item.widget(), ClipboardCard):
-                w = item.widget()
-                self.card_layout.removeWidget(w)
-                w.deleteLater()
-
-        snippets = self.db_manager.get_all_snippets()
-        search_term = self.search_bar.text().strip().lower()
-        rendered = 0
-
-        for snippet in snippets:
-            snippet_id, title, enc_text, language, timestamp, favorite = snippet
-
-            if self._current_filter != "All Languages":
-                if language.lower() != self._current_filter.lower():
-                    continue
-
-            decrypted_text = decrypt_text(enc_text, self.fernet)
-
-            if search_term:
-                if (search_term not in title.lower() and
-                        search_term not in decrypted_text.lower()):
-                    continue
-
-            preview = decrypted_text.strip()
-            if len(preview) > 100:
-                preview = preview[:97] + "..."
-
-            card = ClipboardCard(
-                entry_id=snippet_id,
-                title=title,
-                preview_text=preview,
-                timestamp=timestamp,
-                language=language,
-                content_type='code',
-                is_pinned=False,
-                is_favorite=bool(favorite),
-                show_pin=False,
-                show_favorite=True,
-                show_edit=True,
-                show_copy=True,
-                show_delete=True,
-                show_save_snippet=False,
-                show_tag=True,
-                show_timestamp=getattr(self.window(), 'settings', {}).get('show_timestamps', True),
-                parent=self.card_container
-            )
-
-            card.copyClicked.connect(self._on_copy)
-            card.favoriteClicked.connect(self._on_star)
-            card.editClicked.connect(self._on_edit)
-            card.deleteClicked.connect(self._on_delete)
-            card.tagClicked.connect(self._on_tag)
-            card.cardClicked.connect(self._on_card_click)
-
-            if snippet_id == self._selected_card_id:
-                card.setSelected(True)
-
-            self.card_layout.insertWidget(rendered, card)
-            rendered += 1
-
-        self.empty_label.setVisible(rendered == 0)
+        # Reset the list onto the snippet query
+        self._search_term = self.search_bar.text().strip().lower()
+        self._ranked = bool(self._search_term) and self.search_index is not None and self.search_index.ready
+        self._loaded = True
+        self._stale = False
+        self.list_view.card_delegate.show_timestamp = getattr(self.window(), 'settings', {}).get('show_timestamps', True)
+        if self._ranked:
+            self.list_view.set_source(self._ranked_items())
+        else:
+            self.list_view.set_source(self._item_for(snippet) for snippet in self.db_manager.get_all_snippets())
+
+    def ensure_loaded(self):
+        if not self._loaded or self._stale:
+            self.load_entries()
+
+    def invalidate(self):
+        self._stale = True
+
+    def _ranked_items(self):
+        for _score, item in self.search_index.search(self._search_term, self.SEARCH_LIMIT, ("snippet",),
+                                                     accept=self._accepts):
+            yield item
+
+    def _accepts(self, item):
+        return self._current_filter == "All Languages" or item.language.lower() == self._current_filter.lower()
+
+    def _item_for(self, snippet):
+        # returns the card item for a snippet row, or None when filtered out
+        snippet_id, title, enc_text, language, timestamp, favorite = snippet
+
+        if self._current_filter != "All Languages":
+            if language.lower() != self._current_filter.lower():
+                return None
+
+        decrypted_text = decrypt_text(enc_text, self.fernet)
+
+        if self._search_term:
+            if (self._search_term not in title.lower() and
+                    self._search_term not in decrypted_text.lower()):
+                return None
+
+        return snippet_item(snippet, decrypted_text)
+
+    @staticmethod
+    def _sort_key(item):
+        return item.timestamp, item.entry_id
+
+    def apply_change(self, action, entry_type, entry_id):
+        # patch the loaded rows for a single database change
+        if entry_type != "snippet" or not self._loaded or action == "tagged":
+            return
+        if action == "reset":
+            if self.isVisible():
+                self.load_entries()
+            else:
+                self._stale = True
+            return
+        model = self.list_view.list_model
+        if self._ranked:
+            # ranked rows keep their order; edits refresh or drop them in place
+            item = self.search_index.get(("snippet", entry_id)) if action != "deleted" else None
+            if item is not None and self._accepts(item):
+                model.update(item)
+            else:
+                model.remove(("snippet", entry_id))
+            return
+        snippet = self.db_manager.get_snippet_by_id(entry_id) if action != "deleted" else None
+        item = self._item_for(snippet) if snippet is not None else None
+        if item is None:
+            model.remove(("snippet", entry_id))
+        else:
+            model.place(item, self._sort_key)
 
     def _on_copy(self, snippet_id):
         snippet = self.db_manager.get_snippet_by_id(snippet_id)
@@ -174,7 +192,6 @@ class SnippetsPage(QFrame):
         if snippet:
             new_state = 0 if snippet[5] else 1
             self.db_manager.update_snippet_favorite(snippet_id, new_state)
-            QTimer.singleShot(0, self.load_entries)
 
     def _on_edit(self, snippet_id):
         snippet = self.db_manager.get_snippet_by_id(snippet_id)
@@ -193,20 +210,11 @@ class SnippetsPage(QFrame):
                 encrypted_text=encrypt_text(updated, self.fernet),
                 language=detect_language(updated),
             )
-            QTimer.singleShot(0, self.load_entries)
 
     def _on_delete(self, snippet_id):
         self.db_manager.delete_snippet_by_id(snippet_id)
-        QTimer.singleShot(0, self.load_entries)
 
     def _on_tag(self, snippet_id):
         from ui.tag_dialog import TagDialog
 
         TagDialog(self.db_manager, snippet_id, "snippet", self).exec()
-
-    def _on_card_click(self, snippet_id):
-        self._selected_card_id = snippet_id
-        for i in range(self.card_layout.count()):
-            item = self.card_layout.itemAt(i)
-            if item and item.widget() and isinstance(item.widget(), ClipboardCard):
-                item.widget().setSelected(item.widget().entry_id == snippet_id)
@@ -220,7 +220,7 @@ class StartupWizard(QDialog):
         elif index == 1:
             setTheme(Theme.LIGHT)
         else:
-            system_theme = get_system_theme()
+            system_theme = get_system_theme(refresh=True)
             setTheme(Theme.DARK if system_theme == "dark" else Theme.LIGHT)
 
     def _save_settings(self):
@@ -1,65 +1,53 @@
 from PySide6.QtWidgets import (QFrame, QVBoxLayout, QHBoxLayout, QWidget,
-                                QScrollArea, QLabel, QPushButton,
-                                QApplication)
-from PySide6.QtCore import Qt, QTimer
-from PySide6.QtGui import QFont
+                                QLabel, QPushButton, QApplication)
+from PySide6.QtCore import Qt, QTimer, QRectF, QSize
+from PySide6.QtGui import QFont, QColor, QPainter, QPen
 from qfluentwidgets import SearchLineEdit, isDarkTheme, PushButton, MessageBox, InfoBar
 
-from ui.clipboard_card import ClipboardCard
+from ui.clipboard_items import history_item, snippet_item
+from ui.clipboard_list import ClipboardListView
 from ui.flow_layout import FlowLayout
-from encryption import decrypt_text
-from content_detection import detect_language, detect_content_type
+from encryption import decrypt_entry_text, decrypt_text
+from profiling import profiler
 
 
 class TagChip(QPushButton):
-    # pill tag chip button
+    # pill tag chip button, painted directly so chips carry no stylesheet
 
     def __init__(self, tag_id, name, color, count, parent=None):
         super().__init__(f"{name} ({count})", parent)
         self.tag_id = tag_id
-        self.tag_color = color
+        self.tag_color = QColor(color)
         self._is_active = False
         self.setCursor(Qt.PointingHandCursor)
         self.setFixedHeight(32)
+        self.setAttribute(Qt.WA_Hover, True)
         font = QFont()
         font.setPointSize(9)
         font.setBold(True)
         self.setFont(font)
-        self._apply_style()
-
-    def _apply_style(self):
-        if self._is_active:
-            self.setStyleSheet(f"""
-                QPushButton {{
-                    background-color: {self.tag_color};
-                    color: white;
-                    border: 2px solid {self.tag_color};
-                    border-radius: 14px;
-                    padding: 4px 16px;
-                    font-weight: bold;
-                }}
-                QPushButton:hover {{
-                    opacity: 0.9;
-                }}
-            """)
-        else:
-            self.setStyleSheet(f"""
-                QPushButton {{
-                    background-color: {self.tag_color};
-                    color: white;
-                    border: none;
-                    border-radius: 14px;
-                    padding: 4px 16px;
-                    font-weight: bold;
-                }}
-                QPushButton:hover {{
-                    border: 2px solid white;
-                }}
-            """)
+
+    def sizeHint(self):
+        return QSize(self.fontMetrics().horizontalAdvance(self.text()) + 36, 32)
 
     def setActive(self, active):
-        self._is_active = active
-        self._apply_style()
+        if self._is_active != bool(active):
+            self._is_active = bool(active)
+            self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = QRectF(self.rect()).adjusted(1, 1, -1, -1)
+        painter.setBrush(self.tag_color)
+        if self.underMouse() and not self._is_active:
+            painter.setPen(QPen(QColor('white'), 2))
+        else:
+            painter.setPen(Qt.NoPen)
+        painter.drawRoundedRect(rect, 14, 14)
+        painter.setPen(QColor('white'))
+        painter.drawText(self.rect(), Qt.AlignCenter, self.text())
+        painter.end()
 
 
 class TagsPage(QFrame):
@@ -72,6 +60,8 @@ class TagsPage(QFrame):
         self.setObjectName("tagsPage")
         self._selected_tag_id = None
         self._selected_tag_name = None
+        self._loaded = False
+        self._stale = False
         self._setup_ui()
         self.search_timer = QTimer(self)
         self.search_timer.setSingleShot(True)
@@ -120,35 +110,67 @@ class TagsPage(QFrame):
         self.tagged_label.setVisible(False)
         layout.addWidget(self.tagged_label)
 
-        # Scrollable card list
-        self.scroll_area = QScrollArea(self)
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.scroll_area.setFrameShape(QFrame.NoFrame)
-
-        self.card_container = QWidget()
-        self.card_layout = QVBoxLayout(self.card_container)
-        self.card_layout.setContentsMargins(0, 0, 0, 0)
-        self.card_layout.setSpacing(8)
-
-        self.empty_label = QLabel("Select a tag to view its items", self.card_container)
-        self.empty_label.setAlignment(Qt.AlignCenter)
-        self.empty_label.setStyleSheet("color: #6B7280; padding: 60px 24px;")
-        self.card_layout.addWidget(self.empty_label)
-
-        self.card_layout.addStretch()
-
-        self.scroll_area.setWidget(self.card_container)
-        layout.addWidget(self.scroll_area, 1)
+        # Virtualized card list
+        self.list_view = ClipboardListView(self._actions_for, self)
+        self.list_view.list_model.profile_name = "tags.fetch"
+        self.list_view.setPlaceholderText("Select a tag to view its items")
+        self.list_view.actionTriggered.connect(self._on_action)
+        self.list_view.itemActivated.connect(lambda item: self._on_action("copy", item))
+        layout.addWidget(self.list_view, 1)
 
     def _on_search(self, text):
         self.search_timer.start()
 
+    @profiler.profiled("tags.load_entries")
     def load_entries(self):
+        self._loaded = True
+        self._stale = False
         self._load_chips()
         if self._selected_tag_id is not None:
             self._load_tagged_items()
 
+    def ensure_loaded(self):
+        if not self._loaded or self._stale:
+            self.load_entries()
+
+    def invalidate(self):
+        self._stale = True
+
+    def apply_change(self, action, entry_type, entry_id):
+        # patch chips and the tagged list for a single database change
+        if not self._loaded:
+            return
+        if action == "reset" or (entry_type == "tag" and action == "deleted" and entry_id == self._selected_tag_id):
+            if action != "reset":
+                self._clear_selection()
+            if self.isVisible():
+                self.load_entries()
+            else:
+                self._stale = True
+            return
+        # chip counts only move when assignments or tagged rows go away
+        if entry_type == "tag" or action in ("tagged", "deleted"):
+            self._load_chips()
+        if entry_type == "tag" or self._selected_tag_id is None:
+            return
+        row = None
+        if action != "deleted" and self.db_manager.entry_has_tag(entry_id, self._selected_tag_id, entry_type):
+            if entry_type == "snippet":
+                row = self.db_manager.get_snippet_by_id(entry_id)
+            else:
+                row = self.db_manager.get_history_entry(entry_id)
+        if row is None:
+            self.list_view.list_model.remove((entry_type, entry_id))
+        else:
+            self.list_view.list_model.place(self._item_for(entry_type, row), self._sort_key)
+
+    def _clear_selection(self):
+        self._selected_tag_id = None
+        self._selected_tag_name = None
+        self.tagged_label.setVisible(False)
+        self.delete_tag_button.setEnabled(False)
+        self._clear_cards()
+
     def _load_chips(self):
         self.chips_layout.clear()
 
@@ -166,13 +188,7 @@ class TagsPage(QFrame):
 
     def _on_chip_clicked(self, tag_id, tag_name):
         if self._selected_tag_id == tag_id:
-            self._selected_tag_id = None
-            self._selected_tag_name = None
-            self.tagged_label.setVisible(False)
-            self.delete_tag_button.setEnabled(False)
-            self._clear_cards()
-            self.empty_label.setText("Select a tag to view its items")
-            self.empty_label.setVisible(True)
+            self._clear_selection()
         else:
             self._selected_tag_id = tag_id
             self._selected_tag_name = tag_name
@@ -186,115 +202,62 @@ class TagsPage(QFrame):
             if item and item.widget() and isinstance(item.widget(), TagChip):
                 item.widget().setActive(item.widget().tag_id == self._selected_tag_id)
 
-    def _load_tagged_items(self):
-        self._clear_cards()
+    def _actions_for(self, item):
+        return ("copy", "favorite", "delete")
 
+    def _on_action(self, action, item):
+        if item.entry_type == "snippet":
+            handlers = {
+                "copy": self._on_copy_snippet,
+                "favorite": self._on_star_snippet,
+                "delete": self._on_delete_snippet,
+            }
+        else:
+            handlers = {
+                "copy": self._on_copy,
+                "favorite": self._on_star,
+                "delete": self._on_delete,
+            }
+        handlers[action](item.entry_id)
+
+    def _load_tagged_items(self):
         if self._selected_tag_id is None:
+            self._clear_cards()
             return
 
-        entries = self.db_manager.get_history_entries_by_tag(self._selected_tag_id)
-        rendered = 0
-
-        for entry in entries:
-            entry_id, enc_text, timestamp, is_code, pinned, favorite = entry
-
-            decrypted_text = decrypt_text(enc_text, self.fernet)
-            content_type = detect_content_type(decrypted_text)
-            language = detect_language(decrypted_text) if is_code else "Text"
-            title = self._extract_title(decrypted_text, content_type)
-            preview = self._extract_preview(decrypted_text)
-
-            card = ClipboardCard(
-                entry_id=entry_id,
-                title=title,
-                preview_text=preview,
-                timestamp=timestamp,
-                language=language,
-                content_type=content_type,
-                is_pinned=bool(pinned),
-                is_favorite=bool(favorite),
-                show_pin=False,
-                show_favorite=True,
-                show_edit=False,
-                show_copy=True,
-                show_delete=True,
-                show_timestamp=getattr(self.window(), 'settings', {}).get('show_timestamps', True),
-                parent=self.card_container
-            )
-
-            card.copyClicked.connect(self._on_copy)
-            card.deleteClicked.connect(self._on_delete)
-            card.favoriteClicked.connect(self._on_star)
-
-            self.card_layout.insertWidget(rendered, card)
-            rendered += 1
-
-        for snippet_id, title, enc_text, language, timestamp, favorite in self.db_manager.get_snippets_by_tag(self._selected_tag_id):
-            decrypted_text = decrypt_text(enc_text, self.fernet)
-            preview = self._extract_preview(decrypted_text)
-            card = ClipboardCard(
-                entry_id=-snippet_id,
-                title=title,
-                preview_text=preview,
-                timestamp=timestamp,
-                language=language,
-                content_type="code",
-                is_pinned=False,
-                is_favorite=bool(favorite),
-                show_pin=False,
-                show_favorite=True,
-                show_edit=False,
-                show_copy=True,
-                show_delete=True,
-                show_timestamp=getattr(self.window(), 'settings', {}).get('show_timestamps', True),
-                parent=self.card_container,
-            )
-            card.copyClicked.connect(self._on_copy_snippet)
-            card.deleteClicked.connect(self._on_delete_snippet)
-            card.favoriteClicked.connect(self._on_star_snippet)
-            self.card_layout.insertWidget(rendered, card)
-            rendered += 1
-
-        self.empty_label.setText("No items use this tag yet")
-        self.empty_label.setVisible(rendered == 0)
+        self.list_view.setPlaceholderText("No items use this tag yet")
+        self.list_view.card_delegate.show_timestamp = getattr(self.window(), 'settings', {}).get('show_timestamps', True)
+        self.list_view.set_source(self._iter_items(self._selected_tag_id))
+
+    def _iter_items(self, tag_id):
+        for entry in self.db_manager.get_history_entries_by_tag(tag_id):
+            yield self._item_for("history", entry)
+        for snippet in self.db_manager.get_snippets_by_tag(tag_id):
+            yield self._item_for("snippet", snippet)
+
+    def _item_for(self, entry_type, row):
+        if entry_type == "snippet":
+            return snippet_item(row, decrypt_text(row[2], self.fernet))
+        return history_item(row, decrypt_text(row[1], self.fernet))
+
+    @staticmethod
+    def _sort_key(item):
+        # tagged history rows are listed ahead of tagged snippets
+        return item.entry_type == "history", item.pinned, item.timestamp, item.entry_id
 
     def _clear_cards(self):
-        for i in reversed(range(self.card_layout.count())):
-            item = self.card_layout.itemAt(i)
-            if item and item.widget() and isinstance(item.widget(), ClipboardCard):
-                w = item.widget()
-                self.card_layout.removeWidget(w)
-                w.deleteLater()
-
-    def _extract_title(self, text, content_type):
-        if content_type == "link":
-            first_line = text.strip().split('\n')[0]
-            return first_line[:57] + "..." if len(first_line) > 60 else first_line
-        lines = text.strip().split('\n')
-        for line in lines:
-            stripped = line.strip()
-            if stripped:
-                return stripped[:57] + "..." if len(stripped) > 60 else stripped
-        return "Empty entry"
-
-    def _extract_preview(self, text):
-        lines = text.strip().split('\n')
-        preview_lines = [l.strip() for l in lines[1:4] if l.strip()]
-        if preview_lines:
-            preview = '  '.join(preview_lines)
-            return preview[:97] + "..." if len(preview) > 100 else preview
-        text_flat = text.strip()
-        return text_flat[:97] + "..." if len(text_flat) > 100 else text_flat
+        self.list_view.setPlaceholderText("Select a tag to view its items")
+        self.list_view.set_source(None)
 
     def _on_copy(self, entry_id):
         row = self.db_manager.get_entry_by_id(entry_id)
         if row:
-            decrypted = decrypt_text(row[0], self.fernet)
             window = self.window()
-            if hasattr(window, "copy_text"):
-                window.copy_text(decrypted)
+            if hasattr(window, "copy_entry"):
+                # images, html and file lists go back with their own formats
+                window.copy_entry(entry_id)
             else:
-                QApplication.clipboard().setText(decrypted)
+                QApplication.clipboard().setText(decrypt_entry_text(self.db_manager, entry_id, row[0], self.fernet))
 
     def _delete_selected_tag(self):
         if self._selected_tag_id is None:
@@ -307,22 +270,13 @@ class TagsPage(QFrame):
         if not dialog.exec():
             return
         self.db_manager.delete_tag(self._selected_tag_id)
-        self._selected_tag_id = None
-        self._selected_tag_name = None
-        self.tagged_label.setVisible(False)
-        self.delete_tag_button.setEnabled(False)
-        self._clear_cards()
-        self.empty_label.setText("Select a tag to view its items")
-        self.empty_label.setVisible(True)
-        self._load_chips()
         InfoBar.success("Tags", "Tag deleted.", parent=self, duration=1500)
 
     def _on_delete(self, entry_id):
         self.db_manager.delete_entry_by_id(entry_id)
-        QTimer.singleShot(0, self.load_entries)
 
-    def _on_copy_snippet(self, negative_snippet_id):
-        snippet = self.db_manager.get_snippet_by_id(-negative_snippet_id)
+    def _on_copy_snippet(self, snippet_id):
+        snippet = self.db_manager.get_snippet_by_id(snippet_id)
         if snippet:
             decrypted = decrypt_text(snippet[2], self.fernet)
             window = self.window()
@@ -331,22 +285,15 @@ class TagsPage(QFrame):
             else:
                 QApplication.clipboard().setText(decrypted)
 
-    def _on_delete_snippet(self, negative_snippet_id):
-        self.db_manager.delete_snippet_by_id(-negative_snippet_id)
-        QTimer.singleShot(0, self.load_entries)
+    def _on_delete_snippet(self, snippet_id):
+        self.db_manager.delete_snippet_by_id(snippet_id)
 
-    def _on_star_snippet(self, negative_snippet_id):
-        snippet_id = -negative_snippet_id
+    def _on_star_snippet(self, snippet_id):
         snippet = self.db_manager.get_snippet_by_id(snippet_id)
         if snippet:
             self.db_manager.update_snippet_favorite(snippet_id, 0 if snippet[5] else 1)
-        QTimer.singleShot(0, self.load_entries)
 
     def _on_star(self, entry_id):
-        entries = self.db_manager.get_all_entries()
-        for e in entries:
-            if e[0] == entry_id:
-                new_state = 0 if e[5] else 1
-                self.db_manager.update_favorite_state(entry_id, new_state)
-                break
-        QTimer.singleShot(0, self.load_entries)
+        row = self.db_manager.get_entry_by_id(entry_id)
+        if row:
+            self.db_manager.update_favorite_state(entry_id, 0 if row[2] else 1)
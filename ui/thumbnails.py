@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+from PySide6.QtGui import QImage, QPixmap
+
+from clipboard_media import THUMBNAIL_SIZE, image_from_bytes, thumbnail_png
+from database import release_thread_connections
+from encryption import decrypt_bytes, encrypt_bytes
+from metrics import registry
+
+
+class _ThumbnailTask(QRunnable):
+    # reads (or, for images captured before thumbnails existed, makes) one
+    # thumbnail on a pool thread; QImage only, pixmaps are GUI-thread objects
+
+    def __init__(self, cache, blob_hash):
+        super().__init__()
+        self.cache = cache
+        self.blob_hash = blob_hash
+
+    def run(self):
+        image = QImage()
+        try:
+            db_manager, fernet = self.cache.db_manager, self.cache.fernet
+            token = db_manager.get_thumbnail(self.blob_hash, THUMBNAIL_SIZE)
+            if token is not None:
+                image = image_from_bytes(decrypt_bytes(token, fernet))
+            else:
+                blob = db_manager.get_blob(self.blob_hash)
+                if blob is not None:
+                    data = thumbnail_png(image_from_bytes(decrypt_bytes(blob[1], fernet)))
+                    db_manager.put_thumbnail(self.blob_hash, THUMBNAIL_SIZE, encrypt_bytes(data, fernet))
+                    image = image_from_bytes(data)
+        except Exception:
+            image = QImage()
+        finally:
+            release_thread_connections()
+        self.cache.loaded.emit(self.blob_hash, image)
+
+
+class ThumbnailCache(QObject):
+    # decoded thumbnails for the card delegate, most recently painted first.
+    #
+    # pixmap() never touches the database: a miss returns None and queues a
+    # load, and ready fires once the thumbnail can be painted
+
+    CAPACITY = 200
+
+    ready = Signal(str)  # blob hash
+    loaded = Signal(str, object)  # blob hash, QImage (from the pool)
+
+    _instance: ThumbnailCache | None = None
+
+    def __init__(self, db_manager, fernet, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.fernet = fernet
+        self._pixmaps: OrderedDict[str, QPixmap | None] = OrderedDict()
+        self._loading: set[str] = set()
+        self.pool = QThreadPool.globalInstance()
+        self.loaded.connect(self._on_loaded)
+
+    @classmethod
+    def install(cls, cache: ThumbnailCache | None) -> None:
+        cls._instance = cache
+
+    @classmethod
+    def instance(cls) -> ThumbnailCache | None:
+        return cls._instance
+
+    def pixmap(self, blob_hash: str) -> QPixmap | None:
+        if blob_hash in self._pixmaps:
+            self._pixmaps.move_to_end(blob_hash)
+            registry.inc("thumbnails.hits")
+            return self._pixmaps[blob_hash]
+        if blob_hash not in self._loading:
+            registry.inc("thumbnails.misses")
+            self._loading.add(blob_hash)
+            self.pool.start(_ThumbnailTask(self, blob_hash))
+        return None
+
+    def clear(self) -> None:
+        self._pixmaps.clear()
+
+    def _on_loaded(self, blob_hash, image):
+        self._loading.discard(blob_hash)
+        # unreadable thumbnails are remembered as None so they are not retried every paint
+        self._pixmaps[blob_hash] = QPixmap.fromImage(image) if not image.isNull() else None
+        while len(self._pixmaps) > self.CAPACITY:
+            self._pixmaps.popitem(last=False)
+        self.ready.emit(blob_hash)
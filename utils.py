@@ -174,7 +174,19 @@ def get_app_font(size=10, settings=None):
     return get_jetbrains_font(size)
 
 
-def get_system_theme():
+# the desktop theme probe spawns a process on macOS and Linux, so startup
+# asks once and later callers reuse it; refresh=True asks again
+_system_theme = None
+
+
+def get_system_theme(refresh=False):
+    global _system_theme
+    if _system_theme is None or refresh:
+        _system_theme = _query_system_theme()
+    return _system_theme
+
+
+def _query_system_theme():
     if platform.system() == "Windows":
         try:
             import winreg
@@ -212,34 +224,50 @@ def get_system_theme():
         return "light"
 
 
-def format_relative_time(timestamp_str):
-    # format timestamp into human readable relative string
+# relative-time units as (seconds per unit, suffix, upper bound in seconds)
+RELATIVE_TIME_UNITS = (
+    (1, "s", 60),
+    (60, "m", 3600),
+    (3600, "h", 86400),
+    (86400, "d", 30 * 86400),
+    (30 * 86400, "mo", 365 * 86400),
+)
+
+
+def parse_timestamp_epoch(timestamp_str):
+    # stored timestamps are local "YYYY-MM-DD HH:MM:SS"; 0 when unparsable
     try:
         from datetime import datetime
-        ts = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
-        now = datetime.now()
-        diff = now - ts
-        seconds = int(diff.total_seconds())
-        if seconds < 0:
-            return "just now"
-        if seconds < 60:
-            return f"{seconds}s ago"
-        minutes = seconds // 60
-        if minutes < 60:
-            return f"{minutes}m ago"
-        hours = minutes // 60
-        if hours < 24:
-            return f"{hours}h ago"
-        days = hours // 24
-        if days < 30:
-            return f"{days}d ago"
-        months = days // 30
-        if months < 12:
-            return f"{months}mo ago"
-        years = days // 365
-        return f"{years}y ago"
-    except Exception:
+        return datetime.fromisoformat(timestamp_str).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def relative_time_granularity(age_seconds):
+    # seconds until a label of this age can next change
+    for unit, _suffix, limit in RELATIVE_TIME_UNITS:
+        if age_seconds < limit:
+            return unit
+    return 86400
+
+
+def format_relative_epoch(epoch, now):
+    seconds = int(now - epoch)
+    if seconds < 0:
+        return "just now"
+    for unit, suffix, limit in RELATIVE_TIME_UNITS:
+        if seconds < limit:
+            return f"{seconds // unit}{suffix} ago"
+    return f"{seconds // (365 * 86400)}y ago"
+
+
+def format_relative_time(timestamp_str):
+    # format timestamp into human readable relative string
+    import time
+    epoch = parse_timestamp_epoch(timestamp_str)
+    if not epoch:
         return timestamp_str
+    return format_relative_epoch(epoch, time.time())
 
 
 from content_detection import (